@@ -0,0 +1,135 @@
+"""
+Alignement fin des correspondances : passages communs au rapport et à la source.
+
+Graine et extension sur des n-grammes de mots : les n-grammes de la source
+sont indexés (dictionnaire), ceux du chunk sont parcourus une fois ; chaque
+graine trouvée est étendue mot à mot vers l'avant puis vers l'arrière, et le
+parcours reprend après le passage aligné. Le coût est linéaire en nombre de
+mots, sans modèle.
+
+Les passages sont stockés dans plagiat_matches.spans, en JSON compact :
+[[début, fin, début source, fin source], ...]. Début et fin sont relatifs au
+début du chunk dans le texte extrait (document.chunk_offsets), ce qui les
+garde valables quand une correspondance est reprise pour un chunk inchangé
+qui a changé de position ; les positions source sont relatives au texte
+comparé (résumé ou chunk de l'autre rapport).
+"""
+import re
+import json
+from typing import Dict, List, Optional, Tuple
+
+from ...config import Config
+
+WORD = re.compile(r"\w+")
+# Positions examinées par graine : borne le coût sur les textes très répétitifs
+MAX_SEED_POSITIONS = 8
+
+Span = Tuple[int, int, int, int]
+
+
+def tokenize(text: str, vocabulary: Dict[str, int]) -> Tuple[List[int], List[Tuple[int, int]]]:
+    ids, offsets = [], []
+    for match in WORD.finditer(text):
+        ids.append(vocabulary.setdefault(match.group().lower(), len(vocabulary)))
+        offsets.append(match.span())
+    return ids, offsets
+
+
+def align(query: str, source: str, seed_words: int = None, max_gap: int = None) -> List[Span]:
+    seed_words = seed_words or Config.PLAGIAT_ALIGN_SEED_WORDS
+    max_gap = Config.PLAGIAT_ALIGN_MAX_GAP_WORDS if max_gap is None else max_gap
+    vocabulary: Dict[str, int] = {}
+    q, q_offsets = tokenize(query, vocabulary)
+    s, s_offsets = tokenize(source, vocabulary)
+    if len(q) < seed_words or len(s) < seed_words:
+        return []
+
+    seeds: Dict[Tuple[int, ...], List[int]] = {}
+    for j in range(len(s) - seed_words + 1):
+        positions = seeds.setdefault(tuple(s[j:j + seed_words]), [])
+        if len(positions) < MAX_SEED_POSITIONS:
+            positions.append(j)
+
+    runs = []  # (début chunk, début source, longueur) en mots
+    i, q_floor = 0, 0
+    while i <= len(q) - seed_words:
+        positions = seeds.get(tuple(q[i:i + seed_words]))
+        if not positions:
+            i += 1
+            continue
+        best = None
+        for j in positions:
+            length = seed_words
+            while i + length < len(q) and j + length < len(s) and q[i + length] == s[j + length]:
+                length += 1
+            back = 0
+            while i - back > q_floor and j - back > 0 and q[i - back - 1] == s[j - back - 1]:
+                back += 1
+            if best is None or length + back > best[2]:
+                best = (i - back, j - back, length + back)
+        runs.append(best)
+        i = q_floor = best[0] + best[2]
+
+    # Passages voisins séparés de quelques mots modifiés : un seul passage
+    merged = []  # (début chunk, début source, longueur chunk, longueur source)
+    for qi, sj, length in runs:
+        if merged:
+            pq, ps, pq_len, ps_len = merged[-1]
+            q_gap, s_gap = qi - (pq + pq_len), sj - (ps + ps_len)
+            if 0 <= q_gap <= max_gap and 0 <= s_gap <= max_gap:
+                merged[-1] = (pq, ps, qi + length - pq, sj + length - ps)
+                continue
+        merged.append((qi, sj, length, length))
+
+    return [
+        (q_offsets[qi][0], q_offsets[qi + q_len - 1][1], s_offsets[sj][0], s_offsets[sj + s_len - 1][1])
+        for qi, sj, q_len, s_len in merged
+    ]
+
+
+def encode_spans(spans: List[Span]) -> Optional[str]:
+    return json.dumps([list(span) for span in spans], separators=(",", ":")) if spans else None
+
+
+def decode_spans(value: Optional[str]) -> List[Span]:
+    if not value:
+        return []
+    try:
+        return [tuple(span) for span in json.loads(value)]
+    except (ValueError, TypeError):
+        return []
+
+
+def align_matches(document, matches: List[Dict]) -> None:
+    # Renseigne match["spans"] ; source_text (texte complet de la source) ne
+    # sert qu'ici et n'est pas conservé dans le résultat
+    for match in matches:
+        source_text = match.pop("source_text", None) or match.get("matched_text") or ""
+        index = match.get("chunk_index")
+        offsets = document.chunk_offsets[index] if index is not None and index < len(document.chunk_offsets) else None
+        if not offsets:
+            match["spans"] = None
+            continue
+        start, end = offsets
+        match["spans"] = encode_spans(align(document.text[start:end], source_text))
+
+
+def coverage_ratio(spans: List[Span], chunk_length: int) -> float:
+    if not chunk_length:
+        return 0.0
+    return min(1.0, sum(end - start for start, end, _, _ in spans) / chunk_length)
+
+
+def merge_highlights(ranges: List[Tuple[int, int, int, float]]) -> List[Dict]:
+    # (début, fin, id de la correspondance, similarité) -> zones disjointes du texte
+    highlights = []
+    for start, end, match_id, similarity in sorted(ranges):
+        if highlights and start <= highlights[-1]["end"]:
+            current = highlights[-1]
+            current["end"] = max(current["end"], end)
+            if match_id not in current["match_ids"]:
+                current["match_ids"].append(match_id)
+            current["max_similarity"] = max(current["max_similarity"], similarity)
+            continue
+        highlights.append({"start": start, "end": end, "match_ids": [match_id], "max_similarity": similarity})
+    return highlights
@@ -0,0 +1,303 @@
+"""
+Découpage du texte en fenêtres chevauchantes couvrant tout le rapport.
+
+Les lignes arrivent page par page, dans le même passage que l'extraction.
+Les lignes de gabarit sont écartées avant le découpage :
+- page de garde ENSIASD, sommaire, listes (motifs connus) ;
+- en-têtes et pieds de page répétés dans le document ;
+- lignes courtes de bord de page ou des pages de garde déjà vues à la même
+  place dans PLAGIAT_BOILERPLATE_MIN_REPORTS rapports (empreintes partagées
+  entre rapports, boilerplate.sqlite3 du cache) ; dans le corps des pages,
+  ces lignes sont conservées (passage recopié entre rapports).
+Le reste est découpé en fenêtres de PLAGIAT_CHUNK_WINDOW_WORDS mots qui se
+recouvrent de PLAGIAT_CHUNK_OVERLAP_WORDS mots : chaque mot du corps du
+texte appartient à au moins un chunk, sans limite de pages.
+
+L'index interne reçoit tous les chunks ; les recherches externes, payées à
+l'appel, restent limitées à PLAGIAT_LOOKUP_BUDGET chunks choisis par
+nouveauté (select_for_lookup).
+"""
+import os
+import re
+import zlib
+import heapq
+import sqlite3
+import hashlib
+import threading
+from collections import Counter
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from ...config import Config
+
+# Au-delà, une ligne est du contenu, même si elle ressemble au gabarit
+TEMPLATE_MAX_WORDS = 15
+SHINGLE_SIZE = 4
+WORD_SPAN = re.compile(r"\S+")  # mêmes mots que str.split()
+
+TEMPLATE_PATTERNS = [re.compile(pattern) for pattern in (
+    r"^(rapport|m[ée]moire|projet) de (stage|fin d'[ée]tudes|projet)\b",
+    r"^fili[èe]re\s*:",
+    r"^(pr[ée]sent|r[ée]alis|encadr)[ée]e?s? par\b",
+    r"^soutenue? le\b",
+    r"^devant le jury\b",
+    r"^pr\s?\..*\b(pr[ée]sident|examinat(eur|rice)|encadrante?\b.*|rapporteur)$",
+    r"^ann[ée]e universitaire\b",
+    r"[ée]cole nationale sup[ée]rieure d'intelligence artificielle",
+    r"\bensiasd\b",
+    r"^universit[ée] ibn zohr\b",
+    r"^(table des mati[èe]res|sommaire|d[ée]dicaces?|remerciements"
+    r"|liste des (figures|tableaux|sch[ée]mas|abr[ée]viations|symboles))$",
+    r"^page \d+( sur \d+| ?/ ?\d+)?$",
+    r"^\d{1,3}$",
+    r"(\.\s?){4,}\s*\d+$",  # ligne de sommaire (points de suite et numéro de page)
+)]
+
+
+def normalize_line(line: str) -> str:
+    line = line.lower().replace("’", "'")
+    return " ".join(re.sub(r"\d", "0", line).split())
+
+
+def line_fingerprint(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def shingles(text: str) -> Set[int]:
+    words = re.sub(r"[^\w\sà-ÿ]", " ", text.lower()).split()
+    if len(words) < SHINGLE_SIZE:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))} if words else set()
+    return {
+        zlib.crc32(" ".join(words[i:i + SHINGLE_SIZE]).encode("utf-8"))
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+
+class BoilerplateIndex:
+    # Nombre de rapports distincts (sha256 du fichier) où chaque ligne courte apparaît
+
+    def __init__(self, path: str, min_reports: int = 3):
+        self.min_reports = min_reports
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS line_reports (
+                fingerprint TEXT NOT NULL,
+                file_hash TEXT NOT NULL,
+                PRIMARY KEY (fingerprint, file_hash)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS line_counts (
+                fingerprint TEXT PRIMARY KEY,
+                reports INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_line_counts_reports ON line_counts (reports);
+        """)
+        self._conn.commit()
+
+    def common(self) -> FrozenSet[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT fingerprint FROM line_counts WHERE reports >= ?", (self.min_reports,)
+            ).fetchall()
+        return frozenset(row[0] for row in rows)
+
+    def record(self, file_hash: str, fingerprints: Iterable[str]) -> None:
+        # Un même fichier ne compte qu'une fois, même extrait plusieurs fois
+        with self._lock:
+            for fingerprint in fingerprints:
+                inserted = self._conn.execute(
+                    "INSERT OR IGNORE INTO line_reports (fingerprint, file_hash) VALUES (?, ?)",
+                    (fingerprint, file_hash)
+                ).rowcount
+                if inserted:
+                    self._conn.execute(
+                        "INSERT INTO line_counts (fingerprint, reports) VALUES (?, 1)"
+                        " ON CONFLICT (fingerprint) DO UPDATE SET reports = reports + 1",
+                        (fingerprint,)
+                    )
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lines = self._conn.execute("SELECT COUNT(*) FROM line_counts").fetchone()[0]
+        return {"lines": lines, "common": len(self.common()), "min_reports": self.min_reports}
+
+
+_boilerplate_index: Optional[BoilerplateIndex] = None
+_boilerplate_lock = threading.Lock()
+
+
+def get_boilerplate_index() -> Optional[BoilerplateIndex]:
+    global _boilerplate_index
+    with _boilerplate_lock:
+        if _boilerplate_index is None:
+            try:
+                _boilerplate_index = BoilerplateIndex(
+                    os.path.join(Config.PLAGIAT_CACHE_DIR, "boilerplate.sqlite3"),
+                    min_reports=Config.PLAGIAT_BOILERPLATE_MIN_REPORTS
+                )
+            except Exception as e:
+                print(f"⚠️ Empreintes de gabarit partagées désactivées : {e}")
+                return None
+        return _boilerplate_index
+
+
+class WindowChunker:
+    # Même interface que Chunker (text_extraction) : add_paragraph() ligne par
+    # ligne, puis finish()
+
+    def __init__(self, window: int = None, overlap: int = None, common: FrozenSet[str] = frozenset()):
+        self.window = window or Config.PLAGIAT_CHUNK_WINDOW_WORDS
+        overlap = Config.PLAGIAT_CHUNK_OVERLAP_WORDS if overlap is None else overlap
+        self.step = max(1, self.window - overlap)
+        self.common = common
+        self.chunks: List[str] = []
+        self.pages: List[int] = []
+        # (début, fin) de chaque chunk dans le texte, si les positions des lignes sont fournies
+        self.offsets: List[Optional[Tuple[int, int]]] = []
+        self.template_lines: Set[str] = set()  # à enregistrer dans l'index partagé
+        self.total_words = 0
+        self.boilerplate_words = 0
+        self._words: List[str] = []
+        self._word_pages: List[int] = []
+        self._word_spans: List[Optional[Tuple[int, int]]] = []
+        self._emitted = 0  # mots en tête de tampon déjà inclus dans un chunk
+        self._seen_chunks: Set[str] = set()
+        self._edge_lines: Counter = Counter()
+        self._page = None
+        self._held: Optional[Tuple[str, int, Optional[int]]] = None  # dernière ligne lue : pied de page possible
+
+    def add_paragraph(self, para: str, page: int = 1, offset: Optional[int] = None) -> None:
+        # Une ligne est en bord de page si elle ouvre ou ferme sa page : il faut
+        # attendre la ligne suivante pour savoir si elle la ferme
+        if page != self._page:
+            if self._held:
+                self._consume(*self._held, edge=True)
+            self._held = None
+            self._page = page
+            self._consume(para, page, offset, edge=True)
+            return
+        if self._held:
+            self._consume(*self._held, edge=False)
+        self._held = (para, page, offset)
+
+    def _is_boilerplate(self, para: str, page: int, edge: bool, size: int) -> bool:
+        if size > TEMPLATE_MAX_WORDS:
+            return False
+        normalized = normalize_line(para)
+        fingerprint = line_fingerprint(normalized)
+        # Empreintes partagées : seulement là où elles ont été relevées (bord de
+        # page, pages de garde). Ailleurs, une ligne vue dans plusieurs rapports
+        # peut être un passage recopié d'un rapport à l'autre : elle reste.
+        if edge or page <= Config.PLAGIAT_BOILERPLATE_FRONT_PAGES:
+            self.template_lines.add(fingerprint)
+            if fingerprint in self.common:
+                return True
+        if any(pattern.search(normalized) for pattern in TEMPLATE_PATTERNS):
+            return True
+        if edge:
+            # En-tête ou pied de page répété : ignoré dès sa deuxième occurrence
+            self._edge_lines[fingerprint] += 1
+            return self._edge_lines[fingerprint] > 1
+        return False
+
+    def _consume(self, para: str, page: int, offset: Optional[int], edge: bool) -> None:
+        words = para.split()
+        self.total_words += len(words)
+        if self._is_boilerplate(para, page, edge, len(words)):
+            self.boilerplate_words += len(words)
+            return
+        self._words.extend(words)
+        self._word_pages.extend([page] * len(words))
+        if offset is None:
+            self._word_spans.extend([None] * len(words))
+        else:
+            self._word_spans.extend((offset + m.start(), offset + m.end()) for m in WORD_SPAN.finditer(para))
+        while len(self._words) >= self.window:
+            self._emit(self.window)
+            del self._words[:self.step]
+            del self._word_pages[:self.step]
+            del self._word_spans[:self.step]
+            self._emitted = self.window - self.step
+
+    def _emit(self, size: int) -> None:
+        chunk = " ".join(self._words[:size])
+        key = " ".join(chunk.lower().split())
+        # Passage répété à l'identique : ses mots sont déjà couverts
+        if key in self._seen_chunks:
+            return
+        self._seen_chunks.add(key)
+        self.chunks.append(chunk)
+        self.pages.append(self._word_pages[0])
+        first, last = self._word_spans[0], self._word_spans[size - 1]
+        self.offsets.append((first[0], last[1]) if first and last else None)
+
+    def finish(self, text: str = "", page_of_offset=None) -> Tuple[List[str], List[int]]:
+        if self._held:
+            self._consume(*self._held, edge=True)
+            self._held = None
+        if len(self._words) > self._emitted:
+            self._emit(len(self._words))
+            self._emitted = len(self._words)
+        return self.chunks, self.pages
+
+
+def chunk_coverage(text: str, chunks: List[str], boilerplate_words: int = 0) -> Dict:
+    # Part des shingles du texte présents dans au moins un chunk
+    document = shingles(text)
+    covered = set()
+    for chunk in chunks:
+        covered |= shingles(chunk)
+    words = len(text.split())
+    return {
+        "words": words,
+        "chunks": len(chunks),
+        "boilerplate_words": boilerplate_words,
+        "boilerplate_percent": round(100 * boilerplate_words / words, 1) if words else 0,
+        "coverage_percent": round(100 * len(document & covered) / len(document), 1) if document else 0,
+    }
+
+
+def _richness(chunk: str) -> float:
+    # Mots distincts et alphabétiques : faible pour les tableaux, le code, les listes de chiffres
+    tokens = chunk.lower().split()
+    if not tokens:
+        return 0.0
+    alphabetic = sum(token.isalpha() for token in tokens)
+    return (len(set(tokens)) / len(tokens)) * (alphabetic / len(tokens))
+
+
+def select_for_lookup(chunks: List[str], candidates: List[int], budget: Optional[int]) -> List[int]:
+    # Glouton paresseux : à chaque tour, le chunk qui apporte le plus de
+    # shingles encore non couverts (pondérés par leur rareté dans le document
+    # et par la richesse lexicale du chunk). Les fenêtres voisines, qui se
+    # recouvrent, et les passages répétés perdent leur priorité.
+    if budget is None or len(candidates) <= budget:
+        return list(candidates)
+    if budget <= 0:
+        return []
+
+    chunk_shingles = {i: shingles(chunks[i]) for i in candidates}
+    weights = {i: _richness(chunks[i]) for i in candidates}
+    frequency = Counter(s for i in candidates for s in chunk_shingles[i])
+    covered: Set[int] = set()
+
+    def gain(i: int) -> float:
+        values = chunk_shingles[i]
+        if not values:
+            return 0.0
+        return weights[i] * sum(1.0 / frequency[s] for s in values - covered) / len(values)
+
+    heap = [(-gain(i), i) for i in candidates]
+    heapq.heapify(heap)
+    selected = []
+    while heap and len(selected) < budget:
+        _, i = heapq.heappop(heap)
+        current = gain(i)
+        if heap and current < -heap[0][0] - 1e-12:
+            heapq.heappush(heap, (-current, i))
+            continue
+        selected.append(i)
+        covered |= chunk_shingles[i]
+    return sorted(selected)
@@ -0,0 +1,283 @@
+import os
+import re
+import zlib
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+
+# Nombre premier > 2^32 pour les permutations MinHash (a * x + b) mod P
+_MERSENNE_PRIME = np.uint64(4294967311)
+# a < 2^31 et x < P : a * x + b reste sous 2^64, sans débordement uint64
+_PERM_A_MAX = 2 ** 31
+# Version des permutations (PRAGMA user_version) : si elle change, les
+# buckets MinHash déjà stockés sont recalculés à partir du texte des chunks
+_MINHASH_VERSION = 2
+
+
+class CorpusIndex:
+    """
+    Index local des chunks de tous les rapports déjà déposés.
+
+    - MinHash/LSH sur des shingles de mots pour les quasi-doublons textuels ;
+    - LSH par hyperplans aléatoires sur les embeddings MiniLM pour les
+      voisins sémantiques (approximatifs, re-classés par cosinus exact).
+
+    Tout est stocké dans un fichier SQLite : l'index est incrémental
+    (un rapport est ajouté / remplacé à la fois) et fonctionne hors ligne.
+    """
+
+    def __init__(self, path: str, shingle_size: int = 5, num_perm: int = 64,
+                 bands: int = 16, ann_tables: int = 8, ann_bits: int = 16,
+                 seed: int = 42):
+        self.path = path
+        self.shingle_size = shingle_size
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.ann_tables = ann_tables
+        self.ann_bits = ann_bits
+        self.seed = seed
+
+        rng = np.random.default_rng(seed)
+        self._perm_a = rng.integers(1, _PERM_A_MAX, size=num_perm, dtype=np.uint64)
+        self._perm_b = rng.integers(0, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self._planes = None  # créés à la première insertion (dimension connue)
+
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                rapport_id INTEGER NOT NULL,
+                chunk_index INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                embedding BLOB
+            );
+            CREATE INDEX IF NOT EXISTS idx_chunks_rapport ON chunks (rapport_id);
+            CREATE TABLE IF NOT EXISTS minhash_buckets (
+                band INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                chunk_id INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_minhash ON minhash_buckets (band, bucket);
+            CREATE INDEX IF NOT EXISTS idx_minhash_chunk ON minhash_buckets (chunk_id);
+            CREATE TABLE IF NOT EXISTS ann_buckets (
+                tbl INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                chunk_id INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_ann ON ann_buckets (tbl, bucket);
+            CREATE INDEX IF NOT EXISTS idx_ann_chunk ON ann_buckets (chunk_id);
+        """)
+        self._conn.commit()
+        self._migrate_minhash()
+
+    def _migrate_minhash(self) -> None:
+        with self._lock:
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if version == _MINHASH_VERSION:
+                return
+            self._conn.execute("DELETE FROM minhash_buckets")
+            for chunk_id, text in self._conn.execute("SELECT id, text FROM chunks").fetchall():
+                shingles = self.shingles(text)
+                if shingles:
+                    self._conn.executemany(
+                        "INSERT INTO minhash_buckets (band, bucket, chunk_id) VALUES (?, ?, ?)",
+                        [(b, bucket, chunk_id)
+                         for b, bucket in enumerate(self._band_buckets(self._minhash(shingles)))]
+                    )
+            self._conn.execute(f"PRAGMA user_version = {_MINHASH_VERSION}")
+            self._conn.commit()
+
+    # ------------------------------------------------------------------
+    # Signatures
+    # ------------------------------------------------------------------
+    def shingles(self, text: str) -> Set[int]:
+        words = re.sub(r"[^\w\sà-ÿ]", " ", text.lower()).split()
+        n = self.shingle_size
+        if len(words) < n:
+            return {zlib.crc32(" ".join(words).encode("utf-8"))} if words else set()
+        return {
+            zlib.crc32(" ".join(words[i:i + n]).encode("utf-8"))
+            for i in range(len(words) - n + 1)
+        }
+
+    def _minhash(self, shingles: Set[int]) -> np.ndarray:
+        x = np.fromiter(shingles, dtype=np.uint64, count=len(shingles)) % _MERSENNE_PRIME
+        hashed = (np.outer(x, self._perm_a) + self._perm_b) % _MERSENNE_PRIME
+        return hashed.min(axis=0)
+
+    def _band_buckets(self, signature: np.ndarray) -> List[int]:
+        r = self.rows_per_band
+        return [
+            zlib.crc32(signature[b * r:(b + 1) * r].tobytes())
+            for b in range(self.bands)
+        ]
+
+    def _ann_buckets(self, embeddings: np.ndarray) -> np.ndarray:
+        if self._planes is None or self._planes.shape[1] != embeddings.shape[1]:
+            rng = np.random.default_rng(self.seed + 1)
+            self._planes = rng.standard_normal(
+                (self.ann_tables * self.ann_bits, embeddings.shape[1])
+            ).astype(np.float32)
+
+        bits = (embeddings @ self._planes.T) > 0
+        bits = bits.reshape(len(embeddings), self.ann_tables, self.ann_bits)
+        weights = 1 << np.arange(self.ann_bits, dtype=np.int64)
+        return (bits * weights).sum(axis=2)  # (n, ann_tables)
+
+    # ------------------------------------------------------------------
+    # Écriture
+    # ------------------------------------------------------------------
+    def add_rapport(self, rapport_id: int, chunks: List[str],
+                    embeddings: Optional[np.ndarray] = None,
+                    chunk_indices: Optional[List[int]] = None) -> int:
+        if chunk_indices is None:
+            chunk_indices = list(range(len(chunks)))
+        ann = self._ann_buckets(embeddings) if embeddings is not None and len(chunks) else None
+
+        with self._lock:
+            self._delete(rapport_id)
+
+            for row, (chunk, chunk_index) in enumerate(zip(chunks, chunk_indices)):
+                shingles = self.shingles(chunk)
+                if not shingles:
+                    continue
+
+                vector = embeddings[row].astype(np.float32).tobytes() if embeddings is not None else None
+                chunk_id = self._conn.execute(
+                    "INSERT INTO chunks (rapport_id, chunk_index, text, embedding) VALUES (?, ?, ?, ?)",
+                    (rapport_id, chunk_index, chunk, vector)
+                ).lastrowid
+
+                self._conn.executemany(
+                    "INSERT INTO minhash_buckets (band, bucket, chunk_id) VALUES (?, ?, ?)",
+                    [(b, bucket, chunk_id)
+                     for b, bucket in enumerate(self._band_buckets(self._minhash(shingles)))]
+                )
+                if ann is not None:
+                    self._conn.executemany(
+                        "INSERT INTO ann_buckets (tbl, bucket, chunk_id) VALUES (?, ?, ?)",
+                        [(t, int(bucket), chunk_id) for t, bucket in enumerate(ann[row])]
+                    )
+
+            self._conn.commit()
+
+        return len(chunks)
+
+    def remove_rapport(self, rapport_id: int) -> None:
+        with self._lock:
+            self._delete(rapport_id)
+            self._conn.commit()
+
+    def _delete(self, rapport_id: int) -> None:
+        ids = "SELECT id FROM chunks WHERE rapport_id = ?"
+        self._conn.execute(f"DELETE FROM minhash_buckets WHERE chunk_id IN ({ids})", (rapport_id,))
+        self._conn.execute(f"DELETE FROM ann_buckets WHERE chunk_id IN ({ids})", (rapport_id,))
+        self._conn.execute("DELETE FROM chunks WHERE rapport_id = ?", (rapport_id,))
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+    def _lookup(self, table: str, column: str, keys: Dict[tuple, List[int]]) -> Dict[int, Set[int]]:
+        # keys : (numéro de bande/table, bucket) -> indices des requêtes
+        by_group: Dict[int, Dict[int, List[int]]] = {}
+        for (group, bucket), queries in keys.items():
+            by_group.setdefault(group, {})[bucket] = queries
+
+        candidates: Dict[int, Set[int]] = {}
+        for group, buckets in by_group.items():
+            bucket_list = list(buckets)
+            for start in range(0, len(bucket_list), 500):
+                batch = bucket_list[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT bucket, chunk_id FROM {table} "
+                    f"WHERE {column} = ? AND bucket IN ({','.join('?' * len(batch))})",
+                    [group] + batch
+                ).fetchall()
+                for bucket, chunk_id in rows:
+                    for qi in buckets[bucket]:
+                        candidates.setdefault(qi, set()).add(chunk_id)
+        return candidates
+
+    def query(self, rapport_id: int, chunks: List[str],
+              embeddings: Optional[np.ndarray] = None,
+              min_jaccard: float = 0.5, min_cosine: float = 0.9,
+              top_k: int = 5) -> List[List[Dict]]:
+        shingle_sets = [self.shingles(c) for c in chunks]
+
+        minhash_keys: Dict[tuple, List[int]] = {}
+        for qi, shingles in enumerate(shingle_sets):
+            if not shingles:
+                continue
+            for b, bucket in enumerate(self._band_buckets(self._minhash(shingles))):
+                minhash_keys.setdefault((b, bucket), []).append(qi)
+
+        ann_keys: Dict[tuple, List[int]] = {}
+        if embeddings is not None and len(chunks):
+            for qi, buckets in enumerate(self._ann_buckets(embeddings)):
+                for t, bucket in enumerate(buckets):
+                    ann_keys.setdefault((t, int(bucket)), []).append(qi)
+
+        with self._lock:
+            candidates = self._lookup("minhash_buckets", "band", minhash_keys)
+            for qi, ids in self._lookup("ann_buckets", "tbl", ann_keys).items():
+                candidates.setdefault(qi, set()).update(ids)
+
+            all_ids = list(set().union(*candidates.values())) if candidates else []
+            rows = {}
+            for start in range(0, len(all_ids), 500):
+                batch = all_ids[start:start + 500]
+                for row in self._conn.execute(
+                        "SELECT id, rapport_id, chunk_index, text, embedding FROM chunks "
+                        f"WHERE rapport_id != ? AND id IN ({','.join('?' * len(batch))})",
+                        [rapport_id] + batch
+                ):
+                    rows[row[0]] = row
+
+        results: List[List[Dict]] = [[] for _ in chunks]
+        candidate_shingles: Dict[int, Set[int]] = {}
+
+        for qi, ids in candidates.items():
+            hits = []
+            for chunk_id in ids:
+                row = rows.get(chunk_id)
+                if row is None:
+                    continue
+                _, other_rapport, other_index, other_text, blob = row
+
+                if chunk_id not in candidate_shingles:
+                    candidate_shingles[chunk_id] = self.shingles(other_text)
+                a, b = shingle_sets[qi], candidate_shingles[chunk_id]
+                jaccard = len(a & b) / len(a | b) if a and b else 0.0
+
+                cosine = 0.0
+                if embeddings is not None and blob is not None:
+                    cosine = float(np.frombuffer(blob, dtype=np.float32) @ embeddings[qi])
+
+                if jaccard >= min_jaccard or cosine >= min_cosine:
+                    hits.append({
+                        "rapport_id": other_rapport,
+                        "chunk_index": other_index,
+                        "text": other_text,
+                        "jaccard": round(jaccard, 4),
+                        "cosine": round(cosine, 4),
+                        "similarity": round(max(jaccard, cosine), 4)
+                    })
+
+            hits.sort(key=lambda h: h["similarity"], reverse=True)
+            results[qi] = hits[:top_k]
+
+        return results
+
+    def stats(self) -> Dict:
+        with self._lock:
+            chunks, rapports = self._conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT rapport_id) FROM chunks"
+            ).fetchone()
+        return {"chunks": chunks, "rapports": rapports}
@@ -0,0 +1,142 @@
+"""
+Backends d'inférence CPU pour les modèles du détecteur.
+
+Chaque backend fournit :
+- load_semantic_model() -> objet avec encode(texts, batch_size, convert_to_numpy,
+  normalize_embeddings), comme SentenceTransformer ;
+- load_causal_lm() -> modèle appelable model(input_ids=..., attention_mask=...)
+  renvoyant un objet avec .logits (tenseur torch), comme AutoModelForCausalLM.
+
+Le reste du détecteur ne dépend que de cette interface.
+Sélection : Config.PLAGIAT_INFERENCE_BACKEND = "torch" | "torch_int8" | "onnx".
+"""
+import os
+from typing import Dict, List
+
+import numpy as np
+
+from ...config import Config
+
+
+class TorchBackend:
+    name = "torch"
+
+    def load_semantic_model(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+
+        return SentenceTransformer(model_name, device="cpu")
+
+    def load_causal_lm(self, model_name: str):
+        from transformers import AutoModelForCausalLM
+
+        model = AutoModelForCausalLM.from_pretrained(model_name)
+        model.eval()
+        return model
+
+
+def _conv1d_to_linear(model):
+    # GPT-2 utilise transformers.pytorch_utils.Conv1D (y = x @ W + b) au lieu
+    # de nn.Linear ; on les convertit pour que quantize_dynamic les prenne.
+    import torch
+    from transformers.pytorch_utils import Conv1D
+
+    for parent in list(model.modules()):
+        for child_name, child in list(parent.named_children()):
+            if isinstance(child, Conv1D):
+                in_features, out_features = child.weight.shape
+                linear = torch.nn.Linear(in_features, out_features)
+                linear.weight.data = child.weight.data.t().contiguous()
+                linear.bias.data = child.bias.data
+                setattr(parent, child_name, linear)
+    return model
+
+
+class QuantizedTorchBackend(TorchBackend):
+    name = "torch_int8"
+
+    def load_semantic_model(self, model_name: str):
+        import torch
+
+        model = super().load_semantic_model(model_name)
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    def load_causal_lm(self, model_name: str):
+        import torch
+
+        model = _conv1d_to_linear(super().load_causal_lm(model_name))
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class OnnxSentenceEncoder:
+    # Équivalent ONNX Runtime de SentenceTransformer.encode pour MiniLM
+    # (mean pooling sur le masque d'attention, puis normalisation L2).
+
+    def __init__(self, model, tokenizer, max_length: int = 256):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+
+    def encode(self, texts: List[str], batch_size: int = 32, convert_to_numpy: bool = True,
+               normalize_embeddings: bool = False, **kwargs) -> np.ndarray:
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            enc = self.tokenizer(
+                texts[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="pt"
+            )
+            hidden = self.model(**enc).last_hidden_state.detach().cpu().numpy()
+            mask = enc["attention_mask"].numpy()[..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            outputs.append(pooled)
+
+        embeddings = np.concatenate(outputs).astype(np.float32) if outputs else np.zeros((0, 0), np.float32)
+        if normalize_embeddings and len(embeddings):
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings
+
+
+class OnnxBackend:
+    name = "onnx"
+
+    def _export_dir(self, model_name: str) -> str:
+        return os.path.join(Config.PLAGIAT_CACHE_DIR, "onnx", model_name.replace("/", "__"))
+
+    def _load(self, model_cls, model_name: str, **kwargs):
+        # L'export ONNX n'est fait qu'une fois, puis relu depuis le cache
+        export_dir = self._export_dir(model_name)
+        if os.path.exists(os.path.join(export_dir, "model.onnx")):
+            return model_cls.from_pretrained(export_dir, **kwargs)
+
+        model = model_cls.from_pretrained(model_name, export=True, **kwargs)
+        model.save_pretrained(export_dir)
+        return model
+
+    def load_semantic_model(self, model_name: str):
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+        from transformers import AutoTokenizer
+
+        hub_name = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+        model = self._load(ORTModelForFeatureExtraction, hub_name)
+        return OnnxSentenceEncoder(model, AutoTokenizer.from_pretrained(hub_name))
+
+    def load_causal_lm(self, model_name: str):
+        from optimum.onnxruntime import ORTModelForCausalLM
+
+        return self._load(ORTModelForCausalLM, model_name, use_cache=False, use_io_binding=False)
+
+
+BACKENDS: Dict[str, type] = {
+    TorchBackend.name: TorchBackend,
+    QuantizedTorchBackend.name: QuantizedTorchBackend,
+    OnnxBackend.name: OnnxBackend,
+}
+
+
+def get_backend(name: str = None):
+    name = name or Config.PLAGIAT_INFERENCE_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Backend d'inférence inconnu : {name} (choix : {', '.join(BACKENDS)})")
+    return BACKENDS[name]()
@@ -0,0 +1,544 @@
+"""
+File d'attente des analyses de plagiat par lots.
+
+Les endpoints d'analyse multiple créent un PlagiatJob avec un PlagiatJobItem
+par rapport, puis confient les éléments :
+- à Celery (CELERY_BROKER_URL) si un worker répond ;
+- sinon à une file locale : threads du processus web, persistée dans un
+  fichier SQLite (PLAGIAT_CACHE_DIR/jobs.sqlite3) pour reprendre les
+  éléments en attente après un redémarrage.
+
+L'avancement se lit dans les tables plagiat_jobs / plagiat_job_items, ou en
+direct (file locale) sur /jobs/<id>/events, voir progress.py.
+
+Chaque rapport est un point de reprise : son élément passe à completed (ou
+error, skipped) dans sa propre transaction. Un job s'annule (les éléments en
+file sont abandonnés, ceux en cours s'arrêtent à leur prochaine étape) et se
+reprend là où il s'était arrêté. Les éléments et analyses en cours
+renouvellent un bail depuis un thread (ItemLease) ; à son expiration
+(processus arrêté), reclaim_stale() les remet en file.
+"""
+import os
+import time
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+
+from flask import current_app
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.orm import selectinload
+
+from ...config import Config
+from ...models import db, PlagiatAnalysis, PlagiatJob, PlagiatJobItem
+from .progress import broker, job_reporter
+
+ACTIVE_STATUSES = ("queued", "running")
+# Annulations demandées depuis ce processus : vues sans attendre le bail
+_cancelled_jobs: Set[int] = set()
+
+
+class JobCancelled(Exception):
+    # Levée à une étape d'analyse quand son job a été annulé
+    pass
+
+
+def lease_cutoff() -> datetime:
+    return datetime.utcnow() - timedelta(seconds=Config.PLAGIAT_JOB_LEASE_SECONDS)
+
+
+class LocalJobQueue:
+    # Un élément réclamé depuis plus longtemps que le bail est considéré comme
+    # abandonné (processus arrêté en cours d'analyse) et remis en file.
+
+    def __init__(self, app, path: str, workers: int = 2):
+        self.app = app
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._swept_at = 0.0
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS queue ("
+            " item_id INTEGER PRIMARY KEY,"
+            " enqueued_at REAL NOT NULL,"
+            " claimed_at REAL)"
+        )
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(
+                    target=self._run, name=f"plagiat-job-worker-{i}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+        print(f"🧵 File locale des analyses démarrée ({self.workers} workers)")
+
+    def put(self, item_ids: List[int]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO queue (item_id, enqueued_at) VALUES (?, ?)",
+                [(item_id, now) for item_id in item_ids]
+            )
+        self.start()
+        self._wakeup.set()
+
+    def _claim(self) -> Optional[int]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT item_id FROM queue"
+                    " WHERE claimed_at IS NULL OR claimed_at < ?"
+                    " ORDER BY enqueued_at, item_id LIMIT 1",
+                    (now - Config.PLAGIAT_JOB_LEASE_SECONDS,)
+                ).fetchone()
+                if row:
+                    self._conn.execute(
+                        "UPDATE queue SET claimed_at = ? WHERE item_id = ?", (now, row[0])
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return row[0] if row else None
+
+    def _done(self, item_id: int) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM queue WHERE item_id = ?", (item_id,))
+
+    def _run(self):
+        while True:
+            try:
+                item_id = self._claim()
+            except Exception as e:
+                print(f"⚠️ File locale indisponible : {e}")
+                item_id = None
+
+            if item_id is None:
+                self._sweep()
+                self._wakeup.wait(timeout=2)
+                self._wakeup.clear()
+                continue
+
+            with self.app.app_context():
+                try:
+                    process_job_item(item_id)
+                except Exception as e:
+                    self.app.logger.error(f"Élément de job {item_id} en échec : {e}")
+                finally:
+                    db.session.remove()
+            self._done(item_id)
+
+    def _sweep(self) -> None:
+        # File vide : de temps en temps, reprise des analyses dont le bail a
+        # expiré (par un seul worker à la fois)
+        with self._lock:
+            if time.time() - self._swept_at < Config.PLAGIAT_JOB_RECLAIM_INTERVAL_SECONDS:
+                return
+            self._swept_at = time.time()
+        with self.app.app_context():
+            try:
+                reclaimed = reclaim_stale()
+                if reclaimed["items"] or reclaimed["analyses"]:
+                    print(f"♻️ Analyses interrompues reprises : {reclaimed}")
+            except Exception as e:
+                self.app.logger.error(f"Reprise des analyses interrompues échouée : {e}")
+            finally:
+                db.session.remove()
+
+    def pending(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM queue").fetchone()[0]
+
+
+_local_queue: Optional[LocalJobQueue] = None
+_local_queue_lock = threading.Lock()
+_celery_check = {"ok": None, "checked_at": 0.0}
+
+
+def _local_workers() -> int:
+    # En mode processus, un thread par processus du pool pour les occuper tous
+    if Config.PLAGIAT_ANALYSIS_EXECUTOR == "process":
+        from .process_pool import pool_size
+
+        return max(Config.PLAGIAT_JOB_WORKERS, pool_size())
+    return Config.PLAGIAT_JOB_WORKERS
+
+
+def get_local_queue() -> LocalJobQueue:
+    global _local_queue
+    with _local_queue_lock:
+        if _local_queue is None:
+            _local_queue = LocalJobQueue(
+                current_app._get_current_object(),
+                os.path.join(Config.PLAGIAT_CACHE_DIR, "jobs.sqlite3"),
+                workers=_local_workers()
+            )
+            # Reprise des éléments laissés par un processus précédent
+            if _local_queue.pending():
+                _local_queue.start()
+        return _local_queue
+
+
+def _celery_available() -> bool:
+    from ...tasks import celery
+
+    if celery is None:
+        return False
+    if Config.PLAGIAT_JOB_BACKEND == "celery":
+        return True
+
+    # Mode auto : broker joignable et au moins un worker, vérifié au plus
+    # une fois par minute
+    if time.time() - _celery_check["checked_at"] > 60:
+        try:
+            _celery_check["ok"] = bool(celery.control.ping(timeout=1.0))
+        except Exception:
+            _celery_check["ok"] = False
+        _celery_check["checked_at"] = time.time()
+    return _celery_check["ok"]
+
+
+def resolve_backend() -> str:
+    if Config.PLAGIAT_JOB_BACKEND == "local":
+        return "local"
+    return "celery" if _celery_available() else "local"
+
+
+def enqueue_job(kind: str, rapport_ids: List[int]) -> PlagiatJob:
+    job = PlagiatJob(kind=kind, backend=resolve_backend(), total=len(rapport_ids))
+    db.session.add(job)
+    db.session.flush()
+
+    items = [PlagiatJobItem(job_id=job.id, rapport_id=rapport_id) for rapport_id in rapport_ids]
+    db.session.add_all(items)
+    if not items:
+        job.finished_at = datetime.utcnow()
+    db.session.commit()
+
+    return dispatch(job, [item.id for item in items])
+
+
+def dispatch(job: PlagiatJob, item_ids: List[int]) -> PlagiatJob:
+    if not item_ids:
+        return job
+    if job.backend == "celery":
+        from ...tasks import analyze_rapport_task
+
+        try:
+            for item_id in item_ids:
+                analyze_rapport_task.delay(item_id)
+            return job
+        except Exception as e:
+            print(f"⚠️ Envoi à Celery impossible, file locale utilisée : {e}")
+            _celery_check.update(ok=False, checked_at=time.time())
+            job.backend = "local"
+            db.session.commit()
+
+    get_local_queue().put(item_ids)
+    return job
+
+
+class ItemLease:
+    # Bail d'un élément en cours et de son analyse, renouvelé toutes les
+    # PLAGIAT_JOB_HEARTBEAT_SECONDS par un thread pendant toute la vie de
+    # l'élément : une étape longue sans événement (score IA, gros PDF,
+    # attente dans le pool) ne le laisse pas expirer. Le même passage relit
+    # l'annulation en base (job annulé depuis un autre processus) ; check(),
+    # appelé à chaque étape de l'analyse, lève alors JobCancelled.
+    # Connexion à part : la session, et sa transaction, restent fermées
+    # pendant le calcul. Sans job (analyse lancée directement par la route
+    # /analyze/<id>), seul le bail de l'analyse est renouvelé.
+
+    def __init__(self, job_id: Optional[int], item_id: Optional[int], rapport_id: int):
+        self.job_id = job_id
+        self.item_id = item_id
+        self.rapport_id = rapport_id
+        self.cancelled = threading.Event()
+        self._engine = db.engine
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "ItemLease":
+        self._thread = threading.Thread(
+            target=self._run, name=f"plagiat-lease-{self.rapport_id}", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while not self._stop.wait(Config.PLAGIAT_JOB_HEARTBEAT_SECONDS):
+            try:
+                self.renew()
+            except Exception as e:
+                print(f"⚠️ Renouvellement du bail du rapport {self.rapport_id} échoué : {e}")
+
+    def renew(self) -> None:
+        now = datetime.utcnow()
+        cancelled_at = None
+        with self._engine.begin() as conn:
+            if self.job_id is not None:
+                cancelled_at = conn.execute(
+                    select(PlagiatJob.cancelled_at).where(PlagiatJob.id == self.job_id)
+                ).scalar()
+            if self.item_id is not None:
+                conn.execute(
+                    update(PlagiatJobItem).where(PlagiatJobItem.id == self.item_id).values(heartbeat_at=now)
+                )
+            conn.execute(
+                update(PlagiatAnalysis)
+                .where(PlagiatAnalysis.rapport_id == self.rapport_id, PlagiatAnalysis.status == "processing")
+                .values(heartbeat_at=now)
+            )
+        if cancelled_at is not None:
+            self.cancelled.set()
+
+    def check(self) -> None:
+        if self.job_id in _cancelled_jobs or self.cancelled.is_set():
+            raise JobCancelled()
+
+
+def release_analysis(analysis: PlagiatAnalysis) -> None:
+    # Analyse interrompue (job annulé, bail expiré) : retour à l'état d'avant.
+    # persist_analysis étant tout ou rien, les résultats d'une analyse
+    # précédente sont intacts ; sans analyse précédente, la ligne est
+    # supprimée et le rapport redevient « en attente ».
+    _restore(analysis)
+    db.session.commit()
+
+
+def _restore(analysis: PlagiatAnalysis) -> None:
+    # Par l'ORM, pas de mise à jour en masse : les compteurs du tableau de
+    # bord suivent les changements de statut (overview_stats)
+    if analysis.analyzed_at is None:
+        db.session.delete(analysis)
+    else:
+        analysis.status = "error" if analysis.error_message else "completed"
+
+
+def _finish_job(job_id: int) -> None:
+    # Un seul worker marque la fin du job, et publie l'état final
+    finished = PlagiatJob.query.filter_by(id=job_id, finished_at=None).update(
+        {"finished_at": datetime.utcnow()}
+    )
+    db.session.commit()
+    if finished:
+        broker.publish(job_id, "job_finished", job=job_status(PlagiatJob.query.get(job_id)))
+
+
+def process_job_item(item_id: int) -> Optional[Dict]:
+    from .plagiat_analysis import run_rapport_analysis
+
+    item = PlagiatJobItem.query.get(item_id)
+    if item is None or item.status not in ACTIVE_STATUSES:
+        return None
+    # Élément en cours ailleurs, bail valide (file locale qui le redistribue,
+    # tâche Celery relivrée) : pas de seconde analyse en parallèle
+    if item.status == "running" and item.heartbeat_at and item.heartbeat_at >= lease_cutoff():
+        return None
+
+    item.status = "running"
+    item.started_at = item.heartbeat_at = datetime.utcnow()
+    db.session.commit()
+    lease = ItemLease(item.job_id, item.id, item.rapport_id)
+    reporter = job_reporter(item.job_id, item_id=item.id, rapport_id=item.rapport_id)
+
+    def progress(event: str, **data) -> None:
+        lease.check()
+        reporter(event, **data)
+
+    started = time.perf_counter()
+
+    try:
+        with lease:
+            progress("report_started")
+            result = run_rapport_analysis(item.rapport_id, progress=progress)
+        item.analysis_id = result.get("analysis_id")
+        if result.get("error"):
+            item.status = "error"
+        else:
+            item.status = "skipped" if result.get("skipped") else "completed"
+        item.error_message = result.get("error")
+    except JobCancelled:
+        db.session.rollback()
+        item = PlagiatJobItem.query.get(item_id)
+        item.status = "cancelled"
+        result = {"rapport_id": item.rapport_id, "cancelled": True}
+    except Exception as e:
+        db.session.rollback()
+        item = PlagiatJobItem.query.get(item_id)
+        item.status = "error"
+        item.error_message = str(e)
+        result = {"rapport_id": item.rapport_id, "error": str(e)}
+
+    item.finished_at = datetime.utcnow()
+    db.session.commit()
+
+    remaining = PlagiatJobItem.query.filter(
+        PlagiatJobItem.job_id == item.job_id,
+        PlagiatJobItem.status.in_(ACTIVE_STATUSES)
+    ).count()
+    reporter(
+        "report_finished", status=item.status, analysis_id=item.analysis_id,
+        similarity=result.get("similarity"), risk=result.get("risk"), error=item.error_message,
+        duration=round(time.perf_counter() - started, 3), remaining=remaining
+    )
+    if remaining == 0:
+        _finish_job(item.job_id)
+
+    return result
+
+
+def cancel_job(job: PlagiatJob) -> None:
+    # Éléments en file abandonnés tout de suite ; ceux en cours s'arrêtent à
+    # leur prochaine étape (ItemLease.check) et rétablissent leur analyse
+    now = datetime.utcnow()
+    job.cancelled_at = now
+    PlagiatJobItem.query.filter_by(job_id=job.id, status="queued").update(
+        {"status": "cancelled", "finished_at": now}, synchronize_session=False
+    )
+    db.session.commit()
+    _cancelled_jobs.add(job.id)
+
+    running = PlagiatJobItem.query.filter_by(job_id=job.id, status="running").count()
+    if not running:
+        _finish_job(job.id)
+
+
+def resume_job(job: PlagiatJob, retry_errors: bool = False) -> int:
+    # Reprise au dernier point de reprise : les rapports terminés ne sont pas
+    # refaits ; annulés, en file et en cours au bail expiré repartent
+    statuses = ["queued", "cancelled"] + (["error"] if retry_errors else [])
+    items = PlagiatJobItem.query.filter(
+        PlagiatJobItem.job_id == job.id,
+        or_(
+            PlagiatJobItem.status.in_(statuses),
+            (PlagiatJobItem.status == "running")
+            & or_(PlagiatJobItem.heartbeat_at.is_(None), PlagiatJobItem.heartbeat_at < lease_cutoff())
+        )
+    ).all()
+    for item in items:
+        item.status = "queued"
+        item.error_message = None
+        item.started_at = item.finished_at = item.heartbeat_at = None
+
+    _cancelled_jobs.discard(job.id)
+    job.cancelled_at = None
+    if items:
+        job.finished_at = None
+        job.backend = resolve_backend()
+    db.session.commit()
+
+    dispatch(job, [item.id for item in items])
+    return len(items)
+
+
+def reclaim_stale() -> Dict:
+    # Bail expiré : processus arrêté en pleine analyse. Les analyses restées
+    # "processing" retrouvent leur état d'avant, les éléments "running"
+    # retournent en file (ou sont annulés si leur job l'a été entre-temps).
+    cutoff = lease_cutoff()
+    analyses = PlagiatAnalysis.query.filter(
+        PlagiatAnalysis.status == "processing",
+        or_(PlagiatAnalysis.heartbeat_at.is_(None), PlagiatAnalysis.heartbeat_at < cutoff)
+    ).options(selectinload(PlagiatAnalysis.matches)).all()
+    for analysis in analyses:
+        _restore(analysis)
+
+    # Éléments : hors statistiques, mis à jour en masse, un job à la fois
+    stale_items = (PlagiatJobItem.status == "running") & or_(
+        PlagiatJobItem.heartbeat_at.is_(None), PlagiatJobItem.heartbeat_at < cutoff
+    )
+    rows = db.session.query(PlagiatJobItem.id, PlagiatJobItem.job_id, PlagiatJob.cancelled_at) \
+        .join(PlagiatJob, PlagiatJob.id == PlagiatJobItem.job_id).filter(stale_items).all()
+    by_job: Dict[int, List[int]] = {}
+    cancelled_jobs = set()
+    for item_id, job_id, cancelled_at in rows:
+        by_job.setdefault(job_id, []).append(item_id)
+        if cancelled_at is not None:
+            cancelled_jobs.add(job_id)
+
+    now = datetime.utcnow()
+    for job_id, item_ids in by_job.items():
+        if job_id in cancelled_jobs:
+            values = {"status": "cancelled", "finished_at": now}
+        else:
+            values = {"status": "queued", "started_at": None, "heartbeat_at": None}
+        PlagiatJobItem.query.filter(PlagiatJobItem.job_id == job_id, stale_items).update(
+            values, synchronize_session=False
+        )
+    db.session.commit()
+
+    requeued = {job_id: item_ids for job_id, item_ids in by_job.items() if job_id not in cancelled_jobs}
+    for job_id, item_ids in requeued.items():
+        dispatch(PlagiatJob.query.get(job_id), item_ids)
+    for job_id in cancelled_jobs:
+        if not PlagiatJobItem.query.filter(
+                PlagiatJobItem.job_id == job_id, PlagiatJobItem.status.in_(ACTIVE_STATUSES)).count():
+            _finish_job(job_id)
+
+    return {"analyses": len(analyses), "items": len(rows)}
+
+
+def job_status(job: PlagiatJob, with_items: bool = False) -> Dict:
+    counts = dict(
+        db.session.query(PlagiatJobItem.status, func.count(PlagiatJobItem.id))
+        .filter(PlagiatJobItem.job_id == job.id)
+        .group_by(PlagiatJobItem.status)
+        .all()
+    )
+    done = counts.get("completed", 0) + counts.get("skipped", 0) + counts.get("error", 0)
+
+    if job.cancelled_at:
+        status = "cancelled" if job.finished_at else "cancelling"
+    elif job.finished_at or done == job.total:
+        status = "completed"
+    elif counts.get("running") or done:
+        status = "running"
+    else:
+        status = "queued"
+
+    data = {
+        "job_id": job.id,
+        "kind": job.kind,
+        "backend": job.backend,
+        "status": status,
+        "total": job.total,
+        "queued": counts.get("queued", 0),
+        "running": counts.get("running", 0),
+        "completed": counts.get("completed", 0),
+        "skipped": counts.get("skipped", 0),
+        "failed": counts.get("error", 0),
+        "cancelled": counts.get("cancelled", 0),
+        "progress": round(100 * done / job.total, 1) if job.total else 100.0,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "cancelled_at": job.cancelled_at.isoformat() if job.cancelled_at else None
+    }
+
+    if with_items:
+        data["items"] = [
+            {
+                "rapport_id": item.rapport_id,
+                "analysis_id": item.analysis_id,
+                "status": item.status,
+                "error": item.error_message
+            }
+            for item in job.items.order_by(PlagiatJobItem.id)
+        ]
+
+    return data
@@ -0,0 +1,195 @@
+import os
+import sqlite3
+import threading
+from typing import Iterable, List, Optional
+
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+
+class IncrementalTfidf:
+    """
+    Modèle TF-IDF au niveau du corpus de rapports.
+
+    Le vocabulaire est haché (pas de fit), seules les fréquences documentaires
+    sont accumulées : le modèle se met à jour rapport par rapport, sans jamais
+    être ré-ajusté, et `transform` renvoie des vecteurs creux normalisés (L2)
+    dont le produit scalaire est directement la similarité cosinus.
+
+    Les fréquences sont tenues dans un fichier SQLite et modifiées par
+    incréments, dans une transaction : plusieurs processus (pool d'analyse,
+    workers) peuvent indexer en même temps sans écraser les ajouts des
+    autres. La contribution de chaque rapport est conservée, pour être
+    retirée quand le rapport est ré-indexé avec un autre texte.
+    """
+
+    def __init__(self, path: str, n_features: int = 2 ** 18, import_path: Optional[str] = None):
+        self.path = path
+        self.n_features = n_features
+        self.vectorizer = HashingVectorizer(
+            ngram_range=(1, 3),
+            n_features=n_features,
+            stop_words="english",
+            alternate_sign=False,
+            norm=None
+        )
+        self._df = np.zeros(n_features, dtype=np.float32)
+        self._n_docs = 0
+        self._idf = None
+        self._loaded_version = None
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS df (feature INTEGER PRIMARY KEY, count REAL NOT NULL)")
+        # Contribution de chaque rapport : NULL pour un rapport repris de
+        # l'ancien fichier .npz (rien à retirer)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rapports ("
+            " rapport_id INTEGER PRIMARY KEY,"
+            " n_docs INTEGER NOT NULL,"
+            " features BLOB,"
+            " counts BLOB)"
+        )
+        self._init_meta(import_path)
+
+    def _init_meta(self, import_path: Optional[str]) -> None:
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'n_features'").fetchone()
+            if row is None or row[0] != self.n_features:
+                # Fichier neuf, ou autre taille de hachage : repart de zéro
+                for table in ("meta", "df", "rapports"):
+                    self._conn.execute(f"DELETE FROM {table}")
+                self._conn.executemany(
+                    "INSERT INTO meta (key, value) VALUES (?, ?)",
+                    [("n_features", self.n_features), ("n_docs", 0)]
+                )
+                if import_path and os.path.exists(import_path):
+                    self._import_npz(import_path)
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _import_npz(self, import_path: str) -> None:
+        # Ancien format (un .npz réécrit en entier par chaque processus)
+        try:
+            data = np.load(import_path)
+            if data["df"].shape != self._df.shape:
+                return
+            df = data["df"]
+            features = np.flatnonzero(df)
+            self._conn.executemany(
+                "INSERT INTO df (feature, count) VALUES (?, ?)",
+                zip(features.tolist(), df[features].astype(float).tolist())
+            )
+            self._conn.execute("UPDATE meta SET value = ? WHERE key = 'n_docs'", (int(data["n_docs"]),))
+            self._conn.executemany(
+                "INSERT INTO rapports (rapport_id, n_docs) VALUES (?, 0)",
+                [(int(r),) for r in data["rapports"]]
+            )
+        except Exception as e:
+            print(f"⚠️ Ancien modèle TF-IDF illisible, ignoré : {e}")
+
+    def _refresh(self) -> None:
+        # data_version change quand une autre connexion a validé une écriture ;
+        # nos propres écritures remettent _loaded_version à None
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._loaded_version:
+            return
+
+        df = np.zeros(self.n_features, dtype=np.float32)
+        rows = self._conn.execute("SELECT feature, count FROM df").fetchall()
+        if rows:
+            features, counts = zip(*rows)
+            df[np.asarray(features, dtype=np.int64)] = counts
+        self._df = df
+        self._n_docs = self._conn.execute("SELECT value FROM meta WHERE key = 'n_docs'").fetchone()[0]
+        self._idf = None
+        self._loaded_version = version
+
+    def partial_fit(self, documents: Iterable[str], rapport_id: int = None) -> None:
+        # Ré-indexation d'un rapport : son ancienne contribution est retirée,
+        # la nouvelle ajoutée ; rien ne change si le texte est le même
+        documents = [d for d in documents if d]
+        features = np.zeros(0, dtype=np.int32)
+        counts = np.zeros(0, dtype=np.float32)
+        if documents:
+            matrix = self.vectorizer.transform(documents)
+            matrix.data[:] = 1
+            doc_freq = np.asarray(matrix.sum(axis=0)).ravel()
+            features = np.flatnonzero(doc_freq).astype(np.int32)
+            counts = doc_freq[features].astype(np.float32)
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                n_delta = len(documents)
+                delta_features, delta_counts = [features], [counts]
+                if rapport_id is not None:
+                    row = self._conn.execute(
+                        "SELECT n_docs, features, counts FROM rapports WHERE rapport_id = ?", (rapport_id,)
+                    ).fetchone()
+                    if row is not None:
+                        old_features = np.frombuffer(row[1], dtype=np.int32) if row[1] is not None else None
+                        old_counts = np.frombuffer(row[2], dtype=np.float32) if row[2] is not None else None
+                        if (old_features is not None and row[0] == len(documents)
+                                and np.array_equal(old_features, features) and np.array_equal(old_counts, counts)):
+                            self._conn.execute("COMMIT")
+                            return
+                        n_delta -= row[0]
+                        if old_features is not None:
+                            delta_features.append(old_features)
+                            delta_counts.append(-old_counts)
+                    elif not documents:
+                        self._conn.execute("COMMIT")
+                        return
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO rapports (rapport_id, n_docs, features, counts) VALUES (?, ?, ?, ?)",
+                        (rapport_id, len(documents), features.tobytes(), counts.tobytes())
+                    )
+
+                merged, inverse = np.unique(np.concatenate(delta_features), return_inverse=True)
+                sums = np.bincount(inverse, weights=np.concatenate(delta_counts), minlength=len(merged))
+                changed = sums != 0
+                self._conn.executemany(
+                    "INSERT INTO df (feature, count) VALUES (?, ?)"
+                    " ON CONFLICT(feature) DO UPDATE SET count = count + excluded.count",
+                    zip(merged[changed].tolist(), sums[changed].tolist())
+                )
+                self._conn.execute("UPDATE meta SET value = value + ? WHERE key = 'n_docs'", (n_delta,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._loaded_version = None
+
+    @property
+    def df(self) -> np.ndarray:
+        with self._lock:
+            self._refresh()
+            return self._df
+
+    @property
+    def n_docs(self) -> int:
+        with self._lock:
+            self._refresh()
+            return self._n_docs
+
+    @property
+    def idf(self) -> np.ndarray:
+        with self._lock:
+            self._refresh()
+            if self._idf is None:
+                # Même lissage que TfidfVectorizer(smooth_idf=True)
+                self._idf = (np.log((1 + self._n_docs) / (1 + self._df)) + 1).astype(np.float32)
+            return self._idf
+
+    def transform(self, texts: List[str]):
+        counts = self.vectorizer.transform(texts)
+        weighted = counts.multiply(self.idf).tocsr()
+        return normalize(weighted, norm="l2", copy=False)
@@ -0,0 +1,165 @@
+"""
+Listes paginées des analyses et des rapports en attente.
+
+Chaque page est lue en une requête : jointures rapport / auteur / profil
+étudiant, nombre de correspondances en sous-requête corrélée (limitée aux
+lignes de la page). Pagination par curseur (?after=&limit=) : le curseur
+encode la clé de tri de la dernière ligne, il reste valable quand des
+analyses sont ajoutées entre deux pages, contrairement à un offset.
+"""
+import base64
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, func, or_, select
+
+from ...config import Config
+from ...models import db, Rapport, PlagiatAnalysis, PlagiatMatch, Student, User
+
+
+class ListingError(ValueError):
+    pass
+
+
+def encode_cursor(*values) -> str:
+    raw = "|".join("" if value is None else str(value) for value in values)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+    except Exception:
+        raise ListingError("Curseur invalide")
+    # Seule la première valeur peut contenir "|" (texte libre), les suivantes sont des ids
+    values = raw.rsplit("|", size - 1)
+    if len(values) != size:
+        raise ListingError("Curseur invalide")
+    return values
+
+
+def parse_limit(value: Optional[str]) -> int:
+    if not value:
+        return Config.PLAGIAT_LIST_DEFAULT_LIMIT
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ListingError("limit doit être un entier")
+    return max(1, min(limit, Config.PLAGIAT_LIST_MAX_LIMIT))
+
+
+def split_param(value: Optional[str]) -> List[str]:
+    # Paramètre de requête à valeurs multiples : "high,medium" -> ["high", "medium"]
+    return [v.strip() for v in (value or "").split(",") if v.strip()]
+
+
+def list_analyses(after: Optional[str] = None, limit: int = None, risk: Optional[str] = None,
+                  status: Optional[str] = None, filiere: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+    # Tri : analyzed_at décroissant (analyses jamais terminées en dernier), puis id décroissant
+    limit = limit or Config.PLAGIAT_LIST_DEFAULT_LIMIT
+    matches_count = (
+        select(func.count(PlagiatMatch.id))
+        .where(PlagiatMatch.analysis_id == PlagiatAnalysis.id)
+        .correlate(PlagiatAnalysis)
+        .scalar_subquery()
+    )
+    query = (
+        db.session.query(PlagiatAnalysis, Rapport, User, Student.filiere, matches_count.label("matches_count"))
+        .outerjoin(Rapport, Rapport.id == PlagiatAnalysis.rapport_id)
+        .outerjoin(User, User.id == Rapport.auteur_id)
+        .outerjoin(Student, Student.user_id == User.id)
+    )
+
+    if split_param(risk):
+        query = query.filter(PlagiatAnalysis.risk_level.in_(split_param(risk)))
+    if split_param(status):
+        query = query.filter(PlagiatAnalysis.status.in_(split_param(status)))
+    if split_param(filiere):
+        query = query.filter(Student.filiere.in_(split_param(filiere)))
+
+    if after:
+        analyzed_at, last_id = decode_cursor(after, 2)
+        try:
+            last_id = int(last_id)
+            analyzed_at = datetime.fromisoformat(analyzed_at) if analyzed_at else None
+        except ValueError:
+            raise ListingError("Curseur invalide")
+        if analyzed_at is None:
+            query = query.filter(PlagiatAnalysis.analyzed_at.is_(None), PlagiatAnalysis.id < last_id)
+        else:
+            query = query.filter(or_(
+                PlagiatAnalysis.analyzed_at < analyzed_at,
+                and_(PlagiatAnalysis.analyzed_at == analyzed_at, PlagiatAnalysis.id < last_id),
+                PlagiatAnalysis.analyzed_at.is_(None)
+            ))
+
+    rows = (
+        # MySQL et SQLite placent les NULL en fin de tri décroissant
+        query.order_by(PlagiatAnalysis.analyzed_at.desc(), PlagiatAnalysis.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+
+    results = []
+    for analysis, rapport, student, student_filiere, count in rows[:limit]:
+        results.append({
+            'id': analysis.id,
+            'rapport_id': analysis.rapport_id,
+            'rapport_name': rapport.filename if rapport else 'Document inconnu',
+            'student_name': student.name if student else 'Étudiant inconnu',
+            'student_id': student.id if student else None,
+            'filiere': student_filiere,
+            'similarity': analysis.similarity_score or 0,
+            'originality': analysis.originality_score or 100,
+            'risk': analysis.risk_level or 'none',
+            'ai_score': analysis.ai_score or 0,
+            'status': analysis.status or 'unknown',
+            'analyzed_at': analysis.analyzed_at.isoformat() if analysis.analyzed_at else None,
+            'total_matches': count or 0,
+            'chunks_analyzed': analysis.chunks_analyzed or 0,
+            'chunks_with_matches': analysis.chunks_with_matches or 0
+        })
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1][0]
+        next_cursor = encode_cursor(last.analyzed_at.isoformat() if last.analyzed_at else None, last.id)
+    return results, next_cursor
+
+
+def list_pending(after: Optional[str] = None, limit: int = None,
+                 filiere: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+    # Rapports sans analyse, dont l'auteur existe, par id croissant
+    limit = limit or Config.PLAGIAT_LIST_DEFAULT_LIMIT
+    query = (
+        db.session.query(Rapport, User, Student.filiere)
+        .join(User, User.id == Rapport.auteur_id)
+        .outerjoin(Student, Student.user_id == User.id)
+        .outerjoin(PlagiatAnalysis, PlagiatAnalysis.rapport_id == Rapport.id)
+        .filter(PlagiatAnalysis.id.is_(None))
+    )
+    if split_param(filiere):
+        query = query.filter(Student.filiere.in_(split_param(filiere)))
+    if after:
+        (last_id,) = decode_cursor(after, 1)
+        try:
+            query = query.filter(Rapport.id > int(last_id))
+        except ValueError:
+            raise ListingError("Curseur invalide")
+
+    rows = query.order_by(Rapport.id).limit(limit + 1).all()
+
+    results = [
+        {
+            'rapport_id': rapport.id,
+            'filename': rapport.filename,
+            'student_id': student.id,
+            'student_name': student.name,
+            'filiere': student_filiere,
+            'storage_path': rapport.storage_path,
+            'created_at': rapport.created_at.isoformat() if rapport.created_at else None
+        }
+        for rapport, student, student_filiere in rows[:limit]
+    ]
+    next_cursor = encode_cursor(rows[limit - 1][0].id) if len(rows) > limit else None
+    return results, next_cursor
@@ -0,0 +1,197 @@
+"""
+Serveur de modèles partagé pour le détecteur de plagiat.
+
+Un seul processus par machine charge MiniLM et distilgpt2 ; les workers
+Flask/gunicorn lui envoient leurs demandes d'embeddings et de perplexité via
+un socket Unix. Les demandes concurrentes arrivant dans une courte fenêtre
+(PLAGIAT_MODEL_SERVER_BATCH_WINDOW_MS) sont regroupées en un seul batch.
+
+    python -m app.api.plagiat.model_server
+"""
+import os
+import time
+import queue
+import threading
+from multiprocessing.connection import Listener, Client
+from typing import Any, Dict, List
+
+import numpy as np
+
+from ...config import Config
+
+
+class _Request:
+    __slots__ = ("items", "done", "result", "error")
+
+    def __init__(self, items: List):
+        self.items = items
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class ModelServer:
+    def __init__(self, address: str, authkey: bytes, batch_window_ms: int = 10,
+                 max_batch_items: int = 256):
+        from .plagiarism_detector import PlagiarismDetector
+
+        self.address = address
+        self.authkey = authkey
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch_items = max_batch_items
+        self.detector = PlagiarismDetector(use_model_server=False)
+        self.stats = {"requests": 0, "batches": 0, "items": 0}
+
+        self._queues = {
+            "encode": queue.Queue(),
+            "perplexity": queue.Queue(),
+            "window_nll": queue.Queue(),
+        }
+        self._handlers = {
+            "encode": self.detector.embed,
+            "perplexity": self.detector.perplexities,
+            "window_nll": self._window_nll,
+        }
+
+    def _window_nll(self, items: List) -> List[List[float]]:
+        windows, targets = zip(*items)
+        return self.detector.window_token_losses(list(windows), list(targets))
+
+    def _batch_loop(self, op: str) -> None:
+        pending = self._queues[op]
+        handler = self._handlers[op]
+
+        while True:
+            batch = [pending.get()]
+            size = len(batch[0].items)
+            deadline = time.monotonic() + self.batch_window
+
+            while size < self.max_batch_items:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = pending.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(request)
+                size += len(request.items)
+
+            items = [item for request in batch for item in request.items]
+            try:
+                results = handler(items)
+                error = None
+            except Exception as e:
+                results, error = None, f"{type(e).__name__}: {e}"
+
+            self.stats["batches"] += 1
+            self.stats["items"] += len(items)
+
+            offset = 0
+            for request in batch:
+                if error is None:
+                    request.result = results[offset:offset + len(request.items)]
+                request.error = error
+                offset += len(request.items)
+                request.done.set()
+
+    def _serve_connection(self, conn) -> None:
+        with conn:
+            while True:
+                try:
+                    op, payload = conn.recv()
+                except (EOFError, OSError):
+                    return
+
+                if op == "capabilities":
+                    conn.send(("ok", {
+                        "semantic_model": self.detector.model is not None,
+                        "ai_detector": self.detector.has_ai_detector,
+                        "stats": dict(self.stats),
+                    }))
+                    continue
+
+                if op not in self._queues:
+                    conn.send(("error", f"Opération inconnue : {op}"))
+                    continue
+
+                self.stats["requests"] += 1
+                request = _Request(payload)
+                self._queues[op].put(request)
+                request.done.wait()
+
+                if request.error:
+                    conn.send(("error", request.error))
+                else:
+                    conn.send(("ok", request.result))
+
+    def serve_forever(self) -> None:
+        self.detector.warmup()
+        for op in self._queues:
+            threading.Thread(target=self._batch_loop, args=(op,), daemon=True).start()
+
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+
+        with Listener(self.address, family="AF_UNIX", authkey=self.authkey) as listener:
+            print(f"✅ Serveur de modèles à l'écoute sur {self.address}")
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    print(f"⚠️ Connexion refusée : {e}")
+                    continue
+                threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+
+class ModelServerClient:
+    """Client utilisé par PlagiarismDetector ; une connexion par thread."""
+
+    def __init__(self, address: str, authkey: bytes):
+        self.address = address
+        self.authkey = authkey
+        self._local = threading.local()
+        self._capabilities = None
+
+    def _call(self, op: str, payload: Any = None) -> Any:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = Client(self.address, family="AF_UNIX", authkey=self.authkey)
+            self._local.conn = conn
+
+        try:
+            conn.send((op, payload))
+            status, result = conn.recv()
+        except (EOFError, OSError):
+            self._local.conn = None
+            raise
+
+        if status != "ok":
+            raise RuntimeError(f"Serveur de modèles : {result}")
+        return result
+
+    def capabilities(self, refresh: bool = False) -> Dict[str, Any]:
+        if self._capabilities is None or refresh:
+            self._capabilities = self._call("capabilities")
+        return self._capabilities
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(self._call("encode", list(texts)), dtype=np.float32)
+
+    def perplexities(self, texts: List[str]) -> List[float]:
+        return list(self._call("perplexity", list(texts)))
+
+    def window_token_losses(self, windows: List[List[int]], targets: List[int]) -> List[List[float]]:
+        return list(self._call("window_nll", list(zip(windows, targets))))
+
+
+def main():
+    ModelServer(
+        Config.PLAGIAT_MODEL_SERVER_ADDRESS or os.path.join(Config.PLAGIAT_CACHE_DIR, "model_server.sock"),
+        Config.PLAGIAT_MODEL_SERVER_AUTHKEY.encode("utf-8"),
+        batch_window_ms=Config.PLAGIAT_MODEL_SERVER_BATCH_WINDOW_MS,
+    ).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+Statistiques matérialisées de la vue d'ensemble du plagiat.
+
+La table plagiat_overview_stats garde, par (portée, statut, niveau de
+risque), le nombre d'analyses et la somme de leurs taux d'originalité ; la
+portée est "all" ou le jour d'analyse. Chaque flush qui crée, modifie ou
+supprime une PlagiatAnalysis y reporte l'écart dans la même transaction :
+/overview lit quelques lignes au lieu d'agréger plagiat_analyses.
+
+Les écritures hors ORM (scripts SQL, update() en masse) échappent au
+suivi : `flask plagiat overview-check` compare la table à un recalcul
+complet, et la reconstruit avec --rebuild.
+"""
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event, func, insert, inspect, select, update
+from sqlalchemy.exc import IntegrityError
+
+from ...models import db, PlagiatAnalysis, PlagiatOverviewStat, Rapport
+
+ALL = "all"
+TRACKED = ("status", "risk_level", "originality_score", "analyzed_at")
+
+stats_table = PlagiatOverviewStat.__table__
+
+
+def _keys(values) -> Tuple[List[Tuple[str, str, str]], float]:
+    status, risk_level, originality, analyzed_at = values
+    # Valeurs par défaut des colonnes, appliquées seulement à l'INSERT
+    status = status or "pending"
+    risk_level = risk_level or "none"
+    originality = 100.0 if originality is None else float(originality)
+    scopes = [ALL]
+    if analyzed_at is not None:
+        scopes.append(analyzed_at.date().isoformat())
+    return [(scope, status, risk_level) for scope in scopes], originality
+
+
+def _add(deltas: Dict, values, sign: int) -> None:
+    keys, originality = _keys(values)
+    for key in keys:
+        deltas[key][0] += sign
+        deltas[key][1] += sign * originality
+
+
+def _current_values(obj: PlagiatAnalysis):
+    return tuple(getattr(obj, name) for name in TRACKED)
+
+
+def _previous_values(obj: PlagiatAnalysis):
+    # Valeurs au dernier flush ; les attributs suivis chargent leur ancienne
+    # valeur à l'affectation (active_history), même sur un objet expiré
+    state = inspect(obj)
+    values = []
+    for name in TRACKED:
+        history = state.attrs[name].history
+        if history.added or history.deleted:
+            values.append(history.deleted[0] if history.deleted else None)
+        else:
+            values.append(getattr(obj, name))
+    return tuple(values)
+
+
+def _apply(connection, deltas: Dict) -> None:
+    c = stats_table.c
+    for (scope, status, risk_level), (count, total) in deltas.items():
+        if not count and abs(total) < 1e-9:
+            continue
+        increment = (
+            update(stats_table)
+            .where(c.scope == scope, c.status == status, c.risk_level == risk_level)
+            .values(analyses_count=c.analyses_count + count, originality_sum=c.originality_sum + total)
+        )
+        if connection.execute(increment).rowcount:
+            continue
+        try:
+            with connection.begin_nested():
+                connection.execute(insert(stats_table).values(
+                    scope=scope, status=status, risk_level=risk_level,
+                    analyses_count=count, originality_sum=total
+                ))
+        except IntegrityError:
+            # Ligne créée entre-temps par une autre transaction
+            connection.execute(increment)
+
+
+def _before_flush(session, flush_context, instances) -> None:
+    deltas = defaultdict(lambda: [0, 0.0])
+    for obj in session.new:
+        if isinstance(obj, PlagiatAnalysis):
+            _add(deltas, _current_values(obj), 1)
+    for obj in session.dirty:
+        if isinstance(obj, PlagiatAnalysis) and session.is_modified(obj):
+            previous, current = _previous_values(obj), _current_values(obj)
+            if previous != current:
+                _add(deltas, previous, -1)
+                _add(deltas, current, 1)
+    for obj in session.deleted:
+        if isinstance(obj, PlagiatAnalysis) and inspect(obj).persistent:
+            _add(deltas, _previous_values(obj), -1)
+    if deltas:
+        _apply(session.connection(), deltas)
+
+
+def _keep_history(target, value, oldvalue, initiator):
+    pass
+
+
+for _name in TRACKED:
+    if not event.contains(getattr(PlagiatAnalysis, _name), "set", _keep_history):
+        event.listen(getattr(PlagiatAnalysis, _name), "set", _keep_history, active_history=True)
+if not event.contains(db.session, "before_flush", _before_flush):
+    event.listen(db.session, "before_flush", _before_flush)
+
+
+class OverviewTotals:
+    def __init__(self, rows: Dict[Tuple[str, str, str], Tuple[int, float]], total_rapports: int, today: str):
+        self.rows = rows
+        self.total_rapports = total_rapports
+        self.today = today
+
+    def _select(self, today: bool, status: Optional[str], risks):
+        scope = self.today if today else ALL
+        for (row_scope, row_status, row_risk), values in self.rows.items():
+            if row_scope != scope or (status and row_status != status) or (risks and row_risk not in risks):
+                continue
+            yield values
+
+    def count(self, status: str = None, risks=None, today: bool = False) -> int:
+        return sum(count for count, _ in self._select(today, status, risks))
+
+    def originality_avg(self, status: str = None) -> float:
+        selected = list(self._select(False, status, None))
+        count = sum(c for c, _ in selected)
+        return sum(total for _, total in selected) / count if count else 0
+
+
+def compute_overview_rows() -> Dict[Tuple[str, str, str], Tuple[int, float]]:
+    # Recalcul complet depuis plagiat_analyses, mêmes conventions que le suivi
+    status = func.coalesce(PlagiatAnalysis.status, "pending")
+    risk_level = func.coalesce(PlagiatAnalysis.risk_level, "none")
+    originality = func.sum(func.coalesce(PlagiatAnalysis.originality_score, 100.0))
+    day = func.date(PlagiatAnalysis.analyzed_at)
+
+    rows = {}
+    for row_status, row_risk, count, total in (
+        db.session.query(status, risk_level, func.count(PlagiatAnalysis.id), originality)
+        .group_by(status, risk_level)
+    ):
+        rows[(ALL, row_status, row_risk)] = (count, float(total or 0))
+    for row_day, row_status, row_risk, count, total in (
+        db.session.query(day, status, risk_level, func.count(PlagiatAnalysis.id), originality)
+        .filter(PlagiatAnalysis.analyzed_at.isnot(None))
+        .group_by(day, status, risk_level)
+    ):
+        scope = row_day.isoformat() if isinstance(row_day, date) else str(row_day)[:10]
+        rows[(scope, row_status, row_risk)] = (count, float(total or 0))
+    return rows
+
+
+def stored_overview_rows() -> Dict[Tuple[str, str, str], Tuple[int, float]]:
+    c = stats_table.c
+    return {
+        (scope, status, risk_level): (count, total)
+        for scope, status, risk_level, count, total in db.session.execute(
+            select(c.scope, c.status, c.risk_level, c.analyses_count, c.originality_sum)
+        )
+    }
+
+
+def check_overview_stats() -> List[Dict]:
+    expected, stored = compute_overview_rows(), stored_overview_rows()
+    differences = []
+    for key in sorted(set(expected) | set(stored)):
+        want, have = expected.get(key, (0, 0.0)), stored.get(key, (0, 0.0))
+        if want[0] != have[0] or abs(want[1] - have[1]) > 0.01:
+            differences.append({
+                "scope": key[0], "status": key[1], "risk_level": key[2],
+                "expected": {"count": want[0], "originality_sum": round(want[1], 2)},
+                "stored": {"count": have[0], "originality_sum": round(have[1], 2)},
+            })
+    return differences
+
+
+def rebuild_overview_stats() -> int:
+    rows = compute_overview_rows()
+    db.session.execute(stats_table.delete())
+    if rows:
+        db.session.execute(insert(stats_table), [
+            {"scope": scope, "status": status, "risk_level": risk_level,
+             "analyses_count": count, "originality_sum": total}
+            for (scope, status, risk_level), (count, total) in rows.items()
+        ])
+    db.session.commit()
+    return len(rows)
+
+
+def read_overview(today: date = None) -> OverviewTotals:
+    # Une requête : lignes "all" et du jour, plus le nombre de rapports
+    today = (today or datetime.utcnow().date()).isoformat()
+    c = stats_table.c
+    total_rapports = select(func.count(Rapport.id)).scalar_subquery()
+    result = db.session.execute(
+        select(c.scope, c.status, c.risk_level, c.analyses_count, c.originality_sum,
+               total_rapports.label("total_rapports"))
+        .where(c.scope.in_([ALL, today]))
+    ).all()
+
+    if not result:
+        # Table vide (première lecture après sa création) : reconstruction
+        if db.session.query(PlagiatAnalysis.id).first() is not None:
+            rebuild_overview_stats()
+            return read_overview(date.fromisoformat(today))
+        return OverviewTotals({}, db.session.query(func.count(Rapport.id)).scalar() or 0, today)
+
+    rows = {(scope, status, risk): (count, total) for scope, status, risk, count, total, _ in result}
+    return OverviewTotals(rows, result[0].total_rapports or 0, today)
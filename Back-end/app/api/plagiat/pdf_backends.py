@@ -0,0 +1,211 @@
+"""
+Moteurs d'extraction du texte des PDF.
+
+- pdfplumber : analyse de mise en page, le plus fidèle mais lent ;
+- pypdf : extraction texte seule, rapide (déjà dans requirements.txt) ;
+- pymupdf : le plus rapide, optionnel (pip install pymupdf).
+
+PLAGIAT_PDF_BACKENDS donne l'ordre de préférence. Un moteur absent ou qui
+ne sait pas ouvrir le fichier est ignoré ; une page qui échoue avec le
+premier moteur est relue avec les suivants. Au-delà de
+PLAGIAT_PDF_PARALLEL_MIN_PAGES pages, les pages sont réparties par plages
+sur un pool de processus et restituées dans l'ordre.
+"""
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+from ...config import Config
+
+
+class PdfPlumberBackend:
+    name = "pdfplumber"
+
+    def __init__(self, path: str):
+        import pdfplumber
+
+        self._pdf = pdfplumber.open(path)
+
+    def __len__(self) -> int:
+        return len(self._pdf.pages)
+
+    def page_text(self, index: int) -> str:
+        page = self._pdf.pages[index]
+        try:
+            return page.extract_text() or ""
+        finally:
+            # Libère les objets de la page : mémoire bornée sur les longs rapports
+            page.close()
+
+    def close(self) -> None:
+        self._pdf.close()
+
+
+class PyPdfBackend:
+    name = "pypdf"
+
+    def __init__(self, path: str):
+        from pypdf import PdfReader
+
+        self._reader = PdfReader(path)
+
+    def __len__(self) -> int:
+        return len(self._reader.pages)
+
+    def page_text(self, index: int) -> str:
+        return self._reader.pages[index].extract_text() or ""
+
+    def close(self) -> None:
+        self._reader.close()
+
+
+class PyMuPdfBackend:
+    name = "pymupdf"
+
+    def __init__(self, path: str):
+        import fitz
+
+        self._doc = fitz.open(path)
+
+    def __len__(self) -> int:
+        return self._doc.page_count
+
+    def page_text(self, index: int) -> str:
+        return self._doc.load_page(index).get_text() or ""
+
+    def close(self) -> None:
+        self._doc.close()
+
+
+PDF_BACKENDS = {
+    "pdfplumber": PdfPlumberBackend,
+    "pypdf": PyPdfBackend,
+    "pymupdf": PyMuPdfBackend,
+}
+
+
+def configured_backends() -> List[str]:
+    names = [name for name in Config.PLAGIAT_PDF_BACKENDS if name in PDF_BACKENDS]
+    return names or ["pdfplumber"]
+
+
+class PdfReaderChain:
+    # Premier moteur disponible, les suivants ouverts seulement en cas d'échec
+
+    def __init__(self, path: str, names: List[str]):
+        self.path = path
+        self._pending = list(names)
+        self._opened = []
+        self.primary = self._open_next()
+        if self.primary is None:
+            raise RuntimeError(f"Aucun moteur PDF ne sait lire ce fichier ({', '.join(names)})")
+
+    def _open_next(self):
+        while self._pending:
+            name = self._pending.pop(0)
+            try:
+                backend = PDF_BACKENDS[name](self.path)
+            except Exception as e:
+                print(f"⚠️ Moteur PDF {name} indisponible : {e}")
+                continue
+            self._opened.append(backend)
+            return backend
+        return None
+
+    def __len__(self) -> int:
+        return len(self.primary)
+
+    def page_text(self, index: int) -> str:
+        position = 0
+        while True:
+            if position >= len(self._opened) and self._open_next() is None:
+                return ""
+            backend = self._opened[position]
+            try:
+                return backend.page_text(index)
+            except Exception as e:
+                print(f"⚠️ Page {index + 1} illisible avec {backend.name} : {e}")
+                position += 1
+
+    def close(self) -> None:
+        for backend in self._opened:
+            try:
+                backend.close()
+            except Exception:
+                pass
+
+
+def _extract_page_range(path: str, names: List[str], start: int, stop: int) -> List[Tuple[int, str]]:
+    chain = PdfReaderChain(path, names)
+    try:
+        return [(index + 1, chain.page_text(index)) for index in range(start, stop)]
+    finally:
+        chain.close()
+
+
+_page_pool: Optional[ProcessPoolExecutor] = None
+_page_pool_lock = threading.Lock()
+
+
+def page_workers() -> int:
+    if Config.PLAGIAT_PDF_WORKERS:
+        return Config.PLAGIAT_PDF_WORKERS
+    from .process_pool import physical_cores
+
+    return min(4, physical_cores())
+
+
+def get_page_pool() -> ProcessPoolExecutor:
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is None:
+            _page_pool = ProcessPoolExecutor(
+                max_workers=page_workers(),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _page_pool
+
+
+def shutdown_page_pool() -> None:
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is not None:
+            _page_pool.shutdown(wait=True, cancel_futures=True)
+            _page_pool = None
+
+
+def iter_pdf_pages(path: str, names: List[str] = None) -> Iterator[Tuple[int, str]]:
+    # (numéro de page, texte) dans l'ordre du document
+    names = names or configured_backends()
+    chain = PdfReaderChain(path, names)
+    try:
+        page_count = len(chain)
+        # Les processus démons (workers Celery) ne peuvent pas avoir d'enfants
+        sequential = (
+            page_workers() <= 1
+            or page_count < Config.PLAGIAT_PDF_PARALLEL_MIN_PAGES
+            or multiprocessing.current_process().daemon
+        )
+        if sequential:
+            for index in range(page_count):
+                yield index + 1, chain.page_text(index)
+            return
+        # Les processus repartent du moteur qui a su ouvrir le fichier
+        names = names[names.index(chain.primary.name):]
+    finally:
+        chain.close()
+
+    # Plages contiguës, deux par processus pour lisser les pages lourdes
+    batch = max(1, -(-page_count // (page_workers() * 2)))
+    pool = get_page_pool()
+    futures = [
+        pool.submit(_extract_page_range, path, names, start, min(start + batch, page_count))
+        for start in range(0, page_count, batch)
+    ]
+    try:
+        for future in futures:
+            yield from future.result()
+    finally:
+        for future in futures:
+            future.cancel()
@@ -0,0 +1,161 @@
+"""
+Enregistrement des résultats d'analyse de plagiat.
+
+Une analyse s'écrit en une seule transaction et en un nombre fixe de
+requêtes, quel que soit le nombre de correspondances :
+- lecture des correspondances réutilisables (chunks inchangés) ;
+- une suppression de toutes les autres ;
+- une mise à jour groupée (executemany) de la position des correspondances reprises ;
+- une insertion groupée des nouvelles (executemany), par paquets de INSERT_BATCH_SIZE ;
+- la mise à jour de la ligne plagiat_analyses au commit.
+"""
+import json
+from datetime import datetime
+from typing import Dict, List
+
+from sqlalchemy import bindparam, delete, insert, select, update
+
+from ...models import db, PlagiatAnalysis, PlagiatMatch
+from . import overview_stats  # noqa: F401  (suivi de plagiat_overview_stats à chaque flush)
+
+# Reste loin de max_allowed_packet de MySQL, même avec des textes de 1000 caractères
+INSERT_BATCH_SIZE = 500
+
+matches_table = PlagiatMatch.__table__
+
+
+def match_row(analysis_id: int, match_data: Dict) -> Dict:
+    return {
+        "analysis_id": analysis_id,
+        "text": (match_data.get('text') or '')[:1000],
+        "source_url": (match_data.get('source_url') or '')[:500],
+        "source": (match_data.get('source') or 'Web')[:100],
+        "score": match_data.get('score', 0),
+        "similarity": match_data.get('similarity', 0),
+        "matched_text": (match_data.get('matched_text') or '')[:1000],
+        "original_text": (match_data.get('original_text') or '')[:1000],
+        "page": match_data.get('page'),
+        "chunk_index": match_data.get('chunk_index'),
+        "chunk_hash": match_data.get('chunk_hash'),
+        "spans": match_data.get('spans'),
+    }
+
+
+def _kept_matches(analysis_id: int, result: Dict) -> List[Dict]:
+    # Correspondances des chunks inchangés, replacées à leur nouvelle position
+    chunk_hashes = result.get("chunk_hashes") or []
+    chunk_pages = result.get("chunk_pages") or []
+    reused = set(result.get("reused_chunk_hashes") or [])
+    if not reused:
+        return []
+
+    positions = {h: i for i, h in enumerate(chunk_hashes)}
+    c = matches_table.c
+    rows = db.session.execute(
+        select(c.id, c.text, c.source_url, c.source, c.score, c.similarity,
+               c.matched_text, c.original_text, c.page, c.chunk_hash, c.spans)
+        .where(c.analysis_id == analysis_id, c.chunk_hash.in_(reused))
+    ).all()
+
+    kept = []
+    for row in rows:
+        if row.chunk_hash not in positions:
+            continue
+        index = positions[row.chunk_hash]
+        kept.append({
+            'id': row.id,
+            'text': row.text or '',
+            'source_url': row.source_url or '',
+            'similarity': row.similarity or 0,
+            'score': row.score or 0,
+            'source': row.source or 'Web',
+            'matched_text': row.matched_text or '',
+            'original_text': row.original_text or '',
+            'page': chunk_pages[index] if index < len(chunk_pages) else row.page,
+            'chunk_index': index,
+            'chunk_hash': row.chunk_hash,
+            # Positions relatives au début du chunk : valables à sa nouvelle place
+            'spans': row.spans,
+        })
+    return kept
+
+
+def save_matches(analysis: PlagiatAnalysis, result: Dict) -> int:
+    # Conserve les correspondances des chunks inchangés, remplace les autres.
+    # Pas de commit : voir persist_analysis.
+    from .plagiat_analysis import summarize_matches
+
+    c = matches_table.c
+    kept = _kept_matches(analysis.id, result)
+
+    stale = delete(matches_table).where(c.analysis_id == analysis.id)
+    if kept:
+        stale = stale.where(c.id.notin_([match['id'] for match in kept]))
+    db.session.execute(stale)
+
+    if kept:
+        db.session.execute(
+            update(matches_table)
+            .where(c.id == bindparam("match_id"))
+            .values(chunk_index=bindparam("new_chunk_index"), page=bindparam("new_page")),
+            [
+                {"match_id": m['id'], "new_chunk_index": m['chunk_index'], "new_page": m['page']}
+                for m in kept
+            ]
+        )
+
+    # executemany sur une requête compilée une fois : SQLAlchemy (insertmanyvalues)
+    # et le pilote MySQL la regroupent en INSERT multi-lignes
+    rows = [match_row(analysis.id, match_data) for match_data in result.get("sources", [])]
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        db.session.execute(insert(matches_table), rows[start:start + INSERT_BATCH_SIZE])
+
+    # Les scores globaux portent sur l'ensemble, chunks repris compris
+    if kept:
+        for match in kept:
+            del match['id']
+        result["sources"] = kept + result.get("sources", [])
+        summarize_matches(result)
+
+    return len(rows) + len(kept)
+
+
+def apply_result(analysis: PlagiatAnalysis, result: Dict) -> None:
+    matches_count = len(result.get("sources", []))
+
+    analysis.similarity_score = result.get("similarity", 0)
+    analysis.originality_score = result.get("originality", 100)
+    analysis.risk_level = result.get("risk", "none")
+    analysis.total_matches = matches_count
+    analysis.sources_count = matches_count
+    analysis.status = "error" if result.get("error") else "completed"
+    analysis.error_message = result.get("error")
+    analysis.analyzed_at = datetime.utcnow()
+    analysis.ai_score = result.get("ai_score", 0)
+    analysis.ai_sections = json.dumps(result.get("ai_sections", []))
+    analysis.chunks_analyzed = result.get("chunks_analyzed", 0)
+    analysis.chunks_with_matches = result.get("chunks_with_matches", 0)
+    # Save detailed stats
+    analysis.word_count = result.get("word_count", 0)
+    analysis.unique_words = result.get("unique_words", 0)
+    analysis.character_count = result.get("character_count", 0)
+    analysis.paragraph_count = result.get("paragraph_count", 0)
+    analysis.readability_score = result.get("readability_score", 0)
+    # Empreintes pour la prochaine analyse incrémentale
+    if not result.get("error"):
+        analysis.file_hash = result.get("file_hash")
+        analysis.chunk_hashes = json.dumps(result.get("chunk_hashes", []))
+
+
+def persist_analysis(analysis: PlagiatAnalysis, result: Dict) -> int:
+    # Correspondances et ligne d'analyse : tout ou rien
+    try:
+        if analysis.id is None:
+            db.session.flush()
+        result["matches_saved"] = save_matches(analysis, result)
+        apply_result(analysis, result)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return result["matches_saved"]
@@ -1,47 +1,316 @@
+import os
 import re
+import time
+import asyncio
+import threading
 import aiohttp
-import torch
-from typing import List, Dict, Any
-
-from sentence_transformers import SentenceTransformer, util
-from sklearn.feature_extraction.text import TfidfVectorizer
-from transformers import AutoTokenizer, AutoModelForCausalLM
+import numpy as np
+from typing import List, Dict, Any, Optional
+
+from ...config import Config
+from .embedding_cache import EmbeddingCache
+from .corpus_index import CorpusIndex
+from .report_vectors import ReportVectorStore
+from .model_server import ModelServerClient
+from .inference_backends import get_backend
+from .source_client import SourceClient, ResponseCache, SourceTimeout
+from .providers import build_providers, LocalCorpusProvider
+
+SEMANTIC_MODEL_NAME = "all-MiniLM-L6-v2"
+AI_MODEL_NAME = "distilgpt2"
+
+
+SECTION_HEADING = re.compile(
+    r"^\s*(?:"
+    r"(?:chapitre|chapter|partie|part)\s+[\divxlc]+\b.*"
+    r"|[IVX]+\s*[.\-–]\s+\S.*"
+    r"|\d{1,2}\s*[.\-–]?\s+[A-ZÀ-Ý][^\n]{2,80}"
+    r"|(?:introduction|conclusion|résumé|resume|abstract|remerciements"
+    r"|bibliographie|références|references|annexes?)\b[^\n]{0,60}"
+    r")\s*$",
+    re.IGNORECASE | re.MULTILINE
+)
+
+
+def split_sections(text: str, fallback_size: int = 4000) -> List[tuple]:
+    # Découpe le texte en chapitres à partir des titres détectés ; à défaut,
+    # en blocs de taille fixe (« Partie n »).
+    headings = [(m.start(), m.group(0).strip()) for m in SECTION_HEADING.finditer(text)]
+    if len(headings) >= 2:
+        sections = []
+        if headings[0][0] > 0:
+            sections.append(("Début du document", 0, headings[0][0]))
+        for (start, title), nxt in zip(headings, headings[1:] + [(len(text), None)]):
+            sections.append((title[:100], start, nxt[0]))
+        return sections
+
+    return [
+        (f"Partie {i + 1}", start, min(start + fallback_size, len(text)))
+        for i, start in enumerate(range(0, len(text), fallback_size))
+    ]
 
 
 class PlagiarismDetector:
-    def __init__(self):
-        print("🔧 Initialisation du Détecteur de Plagiat")
+    def __init__(self, use_model_server: bool = True, backend: str = None):
+        # Les modèles (SentenceTransformer, distilgpt2) et torch ne sont chargés
+        # qu'à la première utilisation : un worker Flask qui ne sert jamais de
+        # requête de plagiat ne paie ni le temps de chargement ni la mémoire.
+        self._load_lock = threading.Lock()
+        self._model = None
+        self._model_loaded = False
+        self._ai_tokenizer = None
+        self._ai_tokenizer_loaded = False
+        self._ai_model = None
+        self._ai_loaded = False
+        self._lexical = None
 
         try:
-            self.model = SentenceTransformer("all-MiniLM-L6-v2")
-            print("✅ SentenceTransformer chargé")
+            response_cache = ResponseCache(
+                os.path.join(Config.PLAGIAT_CACHE_DIR, "source_responses.sqlite3"),
+                ttl=Config.PLAGIAT_SOURCE_CACHE_TTL
+            )
         except Exception as e:
-            print(f"❌ Erreur modèle sémantique : {e}")
-            self.model = None
-
-        self.vectorizer = TfidfVectorizer(
-            ngram_range=(1, 3),
-            max_features=5000,
-            stop_words="english"
+            print(f"⚠️ Cache des sources externes désactivé : {e}")
+            response_cache = None
+
+        self.sources = SourceClient(
+            rate_limits=Config.PLAGIAT_SOURCE_RATE_LIMITS,
+            default_rate=Config.PLAGIAT_SOURCE_DEFAULT_RATE,
+            max_concurrency=Config.PLAGIAT_SOURCE_MAX_CONCURRENCY,
+            max_retries=Config.PLAGIAT_SOURCE_MAX_RETRIES,
+            timeout=Config.PLAGIAT_SOURCE_TIMEOUT,
+            cache=response_cache
         )
+        self.providers = build_providers(self.sources, encoder=self.embed)
 
         try:
-            self.ai_tokenizer = AutoTokenizer.from_pretrained("distilgpt2")
-            self.ai_model = AutoModelForCausalLM.from_pretrained("distilgpt2")
-            self.has_ai_detector = True
-            print("✅ Détecteur IA chargé")
-        except Exception:
-            self.has_ai_detector = False
-            print("⚠️ Détection IA désactivée")
+            self.backend = get_backend(backend)
+        except ValueError as e:
+            print(f"⚠️ {e} ; utilisation du backend torch")
+            self.backend = get_backend("torch")
+
+        # Serveur de modèles partagé (optionnel) : une seule copie des modèles
+        # par machine au lieu d'une par worker.
+        self.remote = None
+        if use_model_server and Config.PLAGIAT_MODEL_SERVER_ADDRESS:
+            self.remote = ModelServerClient(
+                Config.PLAGIAT_MODEL_SERVER_ADDRESS,
+                Config.PLAGIAT_MODEL_SERVER_AUTHKEY.encode("utf-8")
+            )
+
+        try:
+            self.embedding_cache = EmbeddingCache(
+                os.path.join(Config.PLAGIAT_CACHE_DIR, "embeddings.sqlite3"),
+                # Vecteurs fp32, int8 et ONNX légèrement différents : un espace par backend
+                namespace=f"{SEMANTIC_MODEL_NAME}:{self.backend.name}",
+                max_entries=Config.PLAGIAT_EMBEDDING_CACHE_MAX_ENTRIES
+            )
+        except Exception as e:
+            print(f"⚠️ Cache d'embeddings désactivé : {e}")
+            self.embedding_cache = None
+
+        try:
+            self.corpus_index = CorpusIndex(
+                os.path.join(Config.PLAGIAT_CACHE_DIR, "corpus_index.sqlite3")
+            )
+        except Exception as e:
+            print(f"⚠️ Index interne des rapports désactivé : {e}")
+            self.corpus_index = None
+
+        try:
+            self.report_vectors = ReportVectorStore(
+                os.path.join(Config.PLAGIAT_CACHE_DIR, "report_vectors.sqlite3"),
+                sections=Config.PLAGIAT_SIMILAR_SECTIONS
+            )
+        except Exception as e:
+            print(f"⚠️ Recherche de rapports similaires désactivée : {e}")
+            self.report_vectors = None
 
         self.stats = {
             "semantic_checks": 0,
             "web_checks": 0,
+            "provider_timeouts": 0,
             "matches_found": 0,
-            "errors": 0
+            "errors": 0,
+            "embeddings_computed": 0,
+            "internal_matches_found": 0
         }
 
-        print("✅ Détecteur prêt")
+    @property
+    def model(self):
+        if not self._model_loaded:
+            with self._load_lock:
+                if not self._model_loaded:
+                    try:
+                        self._apply_torch_threads()
+                        self._model = self.backend.load_semantic_model(SEMANTIC_MODEL_NAME)
+                        print(f"✅ Modèle sémantique chargé ({self.backend.name})")
+                    except Exception as e:
+                        print(f"❌ Erreur modèle sémantique : {e}")
+                        self._model = None
+                    self._model_loaded = True
+        return self._model
+
+    def _apply_torch_threads(self) -> None:
+        if Config.PLAGIAT_TORCH_THREADS:
+            import torch
+
+            torch.set_num_threads(Config.PLAGIAT_TORCH_THREADS)
+
+    def _load_ai_tokenizer(self) -> None:
+        if self._ai_tokenizer_loaded:
+            return
+        with self._load_lock:
+            if self._ai_tokenizer_loaded:
+                return
+            try:
+                from transformers import AutoTokenizer
+
+                self._ai_tokenizer = AutoTokenizer.from_pretrained(AI_MODEL_NAME)
+                if self._ai_tokenizer.pad_token is None:
+                    self._ai_tokenizer.pad_token = self._ai_tokenizer.eos_token
+            except Exception:
+                self._ai_tokenizer = None
+            self._ai_tokenizer_loaded = True
+
+    def _load_ai_detector(self) -> None:
+        if self._ai_loaded:
+            return
+        self._load_ai_tokenizer()
+        with self._load_lock:
+            if self._ai_loaded:
+                return
+            try:
+                self._apply_torch_threads()
+                if self._ai_tokenizer is None:
+                    raise RuntimeError("tokenizer indisponible")
+                self._ai_model = self.backend.load_causal_lm(AI_MODEL_NAME)
+                print(f"✅ Détecteur IA chargé ({self.backend.name})")
+            except Exception:
+                self._ai_model = None
+                print("⚠️ Détection IA désactivée")
+            self._ai_loaded = True
+
+    @property
+    def ai_tokenizer(self):
+        # Le tokenizer reste local même avec le serveur de modèles
+        self._load_ai_tokenizer()
+        return self._ai_tokenizer
+
+    @property
+    def ai_model(self):
+        self._load_ai_detector()
+        return self._ai_model
+
+    def _remote_capabilities(self, refresh: bool = False) -> Dict[str, Any]:
+        if not self.remote:
+            return {}
+        try:
+            return self.remote.capabilities(refresh)
+        except Exception as e:
+            self._disable_remote(e)
+            return {}
+
+    def _disable_remote(self, error: Exception) -> None:
+        # Serveur injoignable : on retombe sur les modèles locaux
+        print(f"⚠️ Serveur de modèles indisponible, chargement local : {error}")
+        self.remote = None
+
+    @property
+    def semantic_available(self) -> bool:
+        if self.remote:
+            capabilities = self._remote_capabilities()
+            if self.remote:
+                return bool(capabilities.get("semantic_model"))
+        return self.model is not None
+
+    @property
+    def has_ai_detector(self) -> bool:
+        if self.remote:
+            capabilities = self._remote_capabilities()
+            if self.remote:
+                return bool(capabilities.get("ai_detector"))
+        return self.ai_model is not None
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        if self.remote:
+            try:
+                return self.remote.embed(texts)
+            except Exception as e:
+                self._disable_remote(e)
+
+        return self.model.encode(
+            texts,
+            batch_size=64,
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        ).astype(np.float32)
+
+    def perplexities(self, texts: List[str]) -> List[float]:
+        if self.remote:
+            try:
+                return self.remote.perplexities(texts)
+            except Exception as e:
+                self._disable_remote(e)
+
+        import torch
+
+        tokenizer, model = self.ai_tokenizer, self.ai_model
+        enc = tokenizer(texts, return_tensors="pt", truncation=True, padding=True)
+        with torch.no_grad():
+            logits = model(**enc).logits
+
+        # Perte moyenne par texte (même calcul que labels=input_ids, hors padding)
+        labels = enc["input_ids"].masked_fill(enc["attention_mask"] == 0, -100)
+        shift_logits, shift_labels = logits[:, :-1], labels[:, 1:]
+        token_loss = torch.nn.functional.cross_entropy(
+            shift_logits.transpose(1, 2), shift_labels, ignore_index=-100, reduction="none"
+        )
+        mask = (shift_labels != -100).float()
+        mean_loss = (token_loss * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+        return torch.exp(mean_loss).tolist()
+
+    @property
+    def lexical(self):
+        if self._lexical is None:
+            with self._load_lock:
+                if self._lexical is None:
+                    from .lexical_model import IncrementalTfidf
+
+                    self._lexical = IncrementalTfidf(
+                        os.path.join(Config.PLAGIAT_CACHE_DIR, "tfidf.sqlite3"),
+                        import_path=os.path.join(Config.PLAGIAT_CACHE_DIR, "tfidf_df.npz")
+                    )
+        return self._lexical
+
+    def warmup(self) -> Dict[str, Any]:
+        timings = {}
+
+        start = time.perf_counter()
+        semantic_ready = self.semantic_available
+        if semantic_ready:
+            self.embed(["warm-up"])
+        timings["semantic_model"] = round(time.perf_counter() - start, 3)
+
+        start = time.perf_counter()
+        ai_ready = self.has_ai_detector
+        timings["ai_detector"] = round(time.perf_counter() - start, 3)
+
+        start = time.perf_counter()
+        self.lexical
+        timings["lexical_model"] = round(time.perf_counter() - start, 3)
+
+        for provider in self.providers:
+            if isinstance(provider, LocalCorpusProvider):
+                start = time.perf_counter()
+                provider.load()
+                timings["local_corpus"] = round(time.perf_counter() - start, 3)
+
+        return {
+            "semantic_model": semantic_ready,
+            "ai_detector": ai_ready,
+            "load_seconds": timings
+        }
 
     def preprocess(self, text: str) -> str:
         text = text.lower()
@@ -49,167 +318,371 @@ class PlagiarismDetector:
         text = re.sub(r"\s+", " ", text)
         return text.strip()
 
+    def encode(self, texts: List[str]) -> np.ndarray:
+        # Embeddings normalisés (float32), servis depuis le cache disque
+        # quand le même texte a déjà été encodé.
+        cached = self.embedding_cache.get_many(texts) if self.embedding_cache else {}
+        missing = [t for t in dict.fromkeys(texts) if t not in cached]
+
+        if missing:
+            computed = self.embed(missing)
+            self.stats["embeddings_computed"] += len(missing)
+            if self.embedding_cache:
+                self.embedding_cache.put_many(missing, computed)
+            cached.update(zip(missing, computed))
+
+        return np.stack([cached[t] for t in texts])
+
     def calculate_similarity(self, text1: str, text2: str) -> float:
-        if not self.model:
-            return 0.0
+        return self.calculate_similarity_many([text1], [[text2]])[0][0]
+
+    def calculate_similarity_many(
+            self, query_chunks: List[str], candidates: List[List[str]]
+    ) -> List[List[float]]:
+        # Chaque chunk est scoré contre sa propre liste de candidats : tous les
+        # textes sont encodés en un seul appel batché, puis les cosinus de
+        # toutes les paires sont calculés en une seule opération vectorisée.
+        if not self.semantic_available:
+            return [[0.0] * len(group) for group in candidates]
 
-        self.stats["semantic_checks"] += 1
+        queries = [self.preprocess(q[:800]) for q in query_chunks]
+        groups = [[self.preprocess(c[:800]) for c in group] for group in candidates]
 
-        t1 = self.preprocess(text1[:800])
-        t2 = self.preprocess(text2[:800])
+        pairs = [(qi, t) for qi, group in enumerate(groups) for t in group]
+        if not pairs:
+            return [[] for _ in groups]
+
+        self.stats["semantic_checks"] += len(pairs)
+
+        texts = list(dict.fromkeys(queries + [t for _, t in pairs]))
+        position = {t: i for i, t in enumerate(texts)}
+
+        q_idx = [position[queries[qi]] for qi, _ in pairs]
+        c_idx = [position[t] for _, t in pairs]
 
         try:
-            tfidf = self.vectorizer.fit_transform([t1, t2])
-            tfidf_sim = (tfidf[0] @ tfidf[1].T).toarray()[0][0]
+            emb = self.encode(texts)
+            semantic = np.einsum("ij,ij->i", emb[q_idx], emb[c_idx])
         except Exception:
-            tfidf_sim = 0
+            semantic = np.zeros(len(pairs))
 
+        # TF-IDF du corpus : une seule transformation creuse pour tous les
+        # textes, puis le produit scalaire ligne à ligne de toutes les paires.
         try:
-            emb = self.model.encode([t1, t2], convert_to_tensor=True)
-            semantic_sim = util.cos_sim(emb[0], emb[1]).item()
+            tfidf = self.lexical.transform(texts)
+            lexical = np.asarray(tfidf[q_idx].multiply(tfidf[c_idx]).sum(axis=1)).ravel()
         except Exception:
-            semantic_sim = 0
+            lexical = np.zeros(len(pairs))
 
-        words1, words2 = set(t1.split()), set(t2.split())
-        jaccard = len(words1 & words2) / len(words1 | words2) if words1 else 0
+        scores = [[] for _ in groups]
+        for (qi, t), semantic_sim, tfidf_sim in zip(pairs, semantic, lexical):
+            q = queries[qi]
 
-        return round(0.6 * semantic_sim + 0.3 * tfidf_sim + 0.1 * jaccard, 4)
+            words1, words2 = set(q.split()), set(t.split())
+            jaccard = len(words1 & words2) / len(words1 | words2) if words1 else 0
+
+            scores[qi].append(
+                round(float(0.6 * semantic_sim + 0.3 * tfidf_sim + 0.1 * jaccard), 4)
+            )
+
+        return scores
+
+    def window_token_losses(self, windows: List[List[int]], targets: List[int]) -> List[List[float]]:
+        # Perte (NLL) de chaque token cible : pour la fenêtre i, seuls les
+        # targets[i] derniers tokens sont scorés, les précédents servent de
+        # contexte. Les fenêtres sont traitées par lots de PLAGIAT_AI_BATCH_SIZE
+        # pour borner la mémoire.
+        if self.remote:
+            try:
+                return self.remote.window_token_losses(windows, targets)
+            except Exception as e:
+                self._disable_remote(e)
+
+        import torch
+
+        model = self.ai_model
+        pad_id = self.ai_tokenizer.pad_token_id
+        batch_size = max(1, Config.PLAGIAT_AI_BATCH_SIZE)
+        losses = []
+
+        for start in range(0, len(windows), batch_size):
+            batch = windows[start:start + batch_size]
+            batch_targets = targets[start:start + batch_size]
+            width = max(len(w) for w in batch)
+
+            input_ids = torch.full((len(batch), width), pad_id, dtype=torch.long)
+            attention = torch.zeros((len(batch), width), dtype=torch.long)
+            for row, window in enumerate(batch):
+                input_ids[row, :len(window)] = torch.tensor(window, dtype=torch.long)
+                attention[row, :len(window)] = 1
+
+            with torch.no_grad():
+                logits = model(input_ids=input_ids, attention_mask=attention).logits
+
+            token_loss = torch.nn.functional.cross_entropy(
+                logits[:, :-1].transpose(1, 2), input_ids[:, 1:], reduction="none"
+            )
+
+            for row, (window, n_target) in enumerate(zip(batch, batch_targets)):
+                # Le token 0 d'une fenêtre n'a pas de prédiction
+                n_target = min(n_target, len(window) - 1)
+                end = len(window) - 1
+                losses.append(token_loss[row, end - n_target:end].tolist())
+
+        return losses
+
+    @staticmethod
+    def _perplexity_to_score(perplexity: float) -> Dict[str, Any]:
+        score = 100 if perplexity < 30 else max(0, 100 - perplexity)
+        risk = "high" if score > 70 else "medium" if score > 40 else "low"
+        return {"ai_score": round(score, 2), "perplexity": round(perplexity, 2), "risk": risk}
 
     def calculate_ai_score(self, text: str) -> Dict[str, Any]:
         if not self.has_ai_detector or len(text.split()) < 100:
             return {"ai_score": 0, "risk": "none"}
 
+        if Config.PLAGIAT_AI_MODE != "sliding":
+            try:
+                perplexity = self.perplexities([text[:1024]])[0]
+            except Exception:
+                return {"ai_score": 0, "risk": "unknown"}
+            return self._perplexity_to_score(perplexity)
+
         try:
-            enc = self.ai_tokenizer(
-                text[:1024], return_tensors="pt", truncation=True
-            )
-            with torch.no_grad():
-                loss = self.ai_model(**enc, labels=enc["input_ids"]).loss
-            perplexity = torch.exp(loss).item()
+            return self._sliding_ai_score(text)
         except Exception:
             return {"ai_score": 0, "risk": "unknown"}
 
-        score = 100 if perplexity < 30 else max(0, 100 - perplexity)
-        risk = "high" if score > 70 else "medium" if score > 40 else "low"
-
-        return {
-            "ai_score": round(score, 2),
-            "perplexity": round(perplexity, 2),
-            "risk": risk
-        }
+    def _sliding_ai_score(self, text: str) -> Dict[str, Any]:
+        enc = self.ai_tokenizer(
+            text,
+            return_offsets_mapping=True,
+            add_special_tokens=False,
+            truncation=True,
+            max_length=Config.PLAGIAT_AI_MAX_TOKENS
+        )
+        ids, offsets = enc["input_ids"], enc["offset_mapping"]
+        if len(ids) < 2:
+            return {"ai_score": 0, "risk": "none"}
 
-    async def _search_semantic_scholar(
-            self, query: str, session: aiohttp.ClientSession
+        window = min(Config.PLAGIAT_AI_WINDOW_TOKENS, self._ai_context_size())
+        stride = max(1, min(Config.PLAGIAT_AI_STRIDE_TOKENS, window))
+
+        # Fenêtres glissantes : chaque token n'est scoré qu'une fois, avec
+        # jusqu'à (window - stride) tokens de contexte déjà vus.
+        windows, targets = [], []
+        prev_end = 0
+        for begin in range(0, len(ids), stride):
+            end = min(begin + window, len(ids))
+            windows.append(ids[begin:end])
+            targets.append(end - prev_end if prev_end else end - begin)
+            prev_end = end
+            if end == len(ids):
+                break
+
+        token_losses = np.zeros(len(ids), dtype=np.float64)
+        scored = np.zeros(len(ids), dtype=bool)
+        window_ends = np.cumsum([0] + [t for t in targets])
+        for (w_end, losses) in zip(window_ends[1:], self.window_token_losses(windows, targets)):
+            token_losses[w_end - len(losses):w_end] = losses
+            scored[w_end - len(losses):w_end] = True
+
+        overall = self._perplexity_to_score(float(np.exp(token_losses[scored].mean())))
+
+        token_starts = np.array([start for start, _ in offsets])
+        sections = []
+        for title, start, end in split_sections(text[:offsets[-1][1]]):
+            mask = scored & (token_starts >= start) & (token_starts < end)
+            if mask.sum() < 20:
+                continue
+            section = self._perplexity_to_score(float(np.exp(token_losses[mask].mean())))
+            section.update({"title": title, "start": start, "end": end, "tokens": int(mask.sum())})
+            sections.append(section)
+
+        overall.update({
+            "sections": sections,
+            "tokens_scored": int(scored.sum()),
+            "coverage": round(offsets[-1][1] / len(text), 4) if text else 0
+        })
+        return overall
+
+    def _ai_context_size(self) -> int:
+        if self.remote:
+            return 1024
+        return getattr(self.ai_model.config, "n_positions", 1024)
+
+    async def fetch_web_candidates(
+            self, text_chunk: str, session: aiohttp.ClientSession = None,
+            failures: List[str] = None
     ) -> List[Dict]:
-        self.stats["web_checks"] += 1
-        url = "https://api.semanticscholar.org/graph/v1/paper/search"
-
-        params = {
-            "query": query[:200],
-            "limit": 5,
-            "fields": "title,abstract,url"
-        }
-
-        results = []
+        # `session` est conservé pour compatibilité : les requêtes passent
+        # désormais par le client partagé self.sources. Les fournisseurs en
+        # échec (délai, erreur) sont ajoutés à `failures` si la liste est fournie.
+        if len(text_chunk.strip()) < 50:
+            return []
 
+        self.stats["web_checks"] += 1
+        results = await asyncio.gather(*[
+            self._search_provider(provider, text_chunk) for provider in self.providers
+        ])
+
+        # Fusion des fournisseurs : une seule entrée par URL avant le scoring
+        merged = {}
+        for provider, group in zip(self.providers, results):
+            if group is None:
+                if failures is not None:
+                    failures.append(provider.name)
+                continue
+            for candidate in group:
+                merged.setdefault(candidate.get("url") or id(candidate), candidate)
+
+        return list(merged.values())
+
+    async def _search_provider(self, provider, query: str) -> Optional[List[Dict]]:
+        # None : le fournisseur n'a pas répondu (à distinguer d'une réponse vide)
         try:
-            async with session.get(url, params=params, timeout=15) as r:
-                if r.status != 200:
-                    return results
-
-                data = await r.json()
-
-                for paper in data.get("data", []):
-                    abstract = paper.get("abstract")
-                    if not abstract:
-                        continue
-
-                    sim = self.calculate_similarity(query, abstract)
-                    if sim > 0.25:
-                        results.append({
-                            "title": paper.get("title"),
-                            "url": paper.get("url"),
-                            "similarity": sim,
-                            "source": "Semantic Scholar"
-                        })
-                        self.stats["matches_found"] += 1
-
-        except Exception:
+            # Chargement (corpus local) attendu hors délai : seule la requête est bornée
+            await provider.prepare()
+            if provider.per_request_timeout:
+                # Délai par requête HTTP : une recherche qui attend son tour
+                # (débit de l'hôte) n'est pas abandonnée pour autant
+                return await provider.search(query)
+            return await asyncio.wait_for(provider.search(query), timeout=provider.timeout)
+        except (asyncio.TimeoutError, SourceTimeout):
+            self.stats["provider_timeouts"] += 1
+            print(f"⏱️ Délai dépassé pour le fournisseur {provider.name}")
+        except Exception as e:
             self.stats["errors"] += 1
+            print(f"⚠️ Erreur du fournisseur {provider.name} : {e}")
+        return None
+
+    def score_web_candidates(
+            self, chunks: List[str], candidates: List[List[Dict]], chunk_indices: List[int]
+    ) -> List[List[Dict]]:
+        scores = self.calculate_similarity_many(
+            chunks, [[c["text"] for c in group] for group in candidates]
+        )
 
-        return results
+        all_results = []
+        for text_chunk, group, group_scores, chunk_index in zip(
+                chunks, candidates, scores, chunk_indices
+        ):
+            unique = {}
+            for candidate, sim in zip(group, group_scores):
+                if sim <= 0.25:
+                    continue
+                self.stats["matches_found"] += 1
+
+                res = {
+                    "title": candidate.get("title"),
+                    "url": candidate.get("url"),
+                    "similarity": sim,
+                    "source": candidate.get("source"),
+                    "chunk_index": chunk_index,
+                    "query_text": text_chunk[:500],
+                    "matched_text": (candidate.get("title") or "")[:200],
+                    "original_text": text_chunk[:200],
+                    "source_text": candidate.get("text") or "",
+                    "score": round(sim * 100, 2)
+                }
+
+                if res["url"]:
+                    if res["url"] not in unique or sim > unique[res["url"]]["similarity"]:
+                        unique[res["url"]] = res
+
+            all_results.append(sorted(
+                unique.values(),
+                key=lambda x: x["similarity"],
+                reverse=True
+            )[:5])
+
+        return all_results
 
-    async def _search_crossref(
-            self, query: str, session: aiohttp.ClientSession
+    async def check_web_source(
+            self, text_chunk: str, session: aiohttp.ClientSession = None, chunk_index: int = -1
     ) -> List[Dict]:
-        url = "https://api.crossref.org/works"
-        params = {"query": query[:200], "rows": 5}
-        results = []
+        candidates = await self.fetch_web_candidates(text_chunk, session)
+        if not candidates:
+            return []
 
+        # Le scoring (CPU) est exécuté hors de la boucle d'événements
+        scored = await asyncio.get_running_loop().run_in_executor(
+            None, self.score_web_candidates, [text_chunk], [candidates], [chunk_index]
+        )
+        return scored[0]
+
+    def _chunk_embeddings(self, chunks: List[str]):
+        if not chunks or not self.semantic_available:
+            return None
         try:
-            async with session.get(url, params=params, timeout=15) as r:
-                if r.status != 200:
-                    return results
+            return self.encode([self.preprocess(c[:800]) for c in chunks])
+        except Exception:
+            return None
 
-                items = (await r.json()).get("message", {}).get("items", [])
+    def index_rapport(self, rapport_id: int, chunks: List[str], chunk_pages: List = None) -> int:
+        self.lexical.partial_fit(
+            [self.preprocess(c[:800]) for c in chunks], rapport_id=rapport_id
+        )
 
-                for item in items:
-                    title = " ".join(item.get("title", []))
-                    sim = self.calculate_similarity(query, title)
+        embeddings = self._chunk_embeddings(chunks)
+        if self.report_vectors is not None and embeddings is not None:
+            self.report_vectors.put(rapport_id, embeddings, chunk_pages)
 
-                    if sim > 0.25:
-                        results.append({
-                            "title": title,
-                            "url": item.get("URL"),
-                            "similarity": sim,
-                            "source": "CrossRef"
-                        })
-                        self.stats["matches_found"] += 1
+        if not self.corpus_index:
+            return 0
+        return self.corpus_index.add_rapport(rapport_id, chunks, embeddings)
 
-        except Exception:
-            self.stats["errors"] += 1
+    def check_internal_corpus(self, rapport_id: int, chunks: List[str]) -> List[List[Dict]]:
+        if not self.corpus_index or not chunks:
+            return [[] for _ in chunks]
 
-        return results
-
-    async def check_web_source(
-            self, text_chunk: str, session: aiohttp.ClientSession, chunk_index: int = -1
-    ) -> List[Dict]:
-        if len(text_chunk.strip()) < 50:
-            return []
+        hits_per_chunk = self.corpus_index.query(
+            rapport_id,
+            chunks,
+            self._chunk_embeddings(chunks),
+            min_jaccard=Config.PLAGIAT_INTERNAL_MIN_JACCARD,
+            min_cosine=Config.PLAGIAT_INTERNAL_MIN_COSINE
+        )
 
         results = []
-        semantic_results = await self._search_semantic_scholar(text_chunk, session)
-        crossref_results = await self._search_crossref(text_chunk, session)
-
-        for res in semantic_results:
-            res['chunk_index'] = chunk_index
-            res['query_text'] = text_chunk[:500]
-            res['matched_text'] = res.get('title', '')[:200]
-            res['original_text'] = text_chunk[:200]
-            res['score'] = round(res.get('similarity', 0) * 100, 2)
-
-        for res in crossref_results:
-            res['chunk_index'] = chunk_index
-            res['query_text'] = text_chunk[:500]
-            res['matched_text'] = res.get('title', '')[:200]
-            res['original_text'] = text_chunk[:200]
-            res['score'] = round(res.get('similarity', 0) * 100, 2)
-
-        results = semantic_results + crossref_results
-
-        unique = {}
-        for r in results:
-            if r.get("url"):
-                if r["url"] not in unique or r["similarity"] > unique[r["url"]]["similarity"]:
-                    unique[r["url"]] = r
-
-        sorted_results = sorted(
-            unique.values(),
-            key=lambda x: x["similarity"],
-            reverse=True
-        )[:5]
-
-        return sorted_results
+        for chunk_index, (text_chunk, hits) in enumerate(zip(chunks, hits_per_chunk)):
+            chunk_results = []
+            for hit in hits:
+                self.stats["internal_matches_found"] += 1
+                chunk_results.append({
+                    "title": f"Rapport #{hit['rapport_id']}",
+                    "url": f"rapport://{hit['rapport_id']}#chunk-{hit['chunk_index']}",
+                    "similarity": hit["similarity"],
+                    "source": "database",
+                    "chunk_index": chunk_index,
+                    "query_text": text_chunk[:500],
+                    "matched_text": hit["text"][:200],
+                    "original_text": text_chunk[:200],
+                    "source_text": hit["text"],
+                    "score": round(hit["similarity"] * 100, 2),
+                    "matched_rapport_id": hit["rapport_id"]
+                })
+            results.append(chunk_results)
+
+        return results
 
     def get_stats(self) -> Dict:
-        return self.stats.copy()
\ No newline at end of file
+        stats = self.stats.copy()
+        stats["inference_backend"] = self.backend.name
+        stats["models_loaded"] = {
+            "semantic_model": self._model_loaded and self._model is not None,
+            "ai_detector": self._ai_loaded and self._ai_model is not None
+        }
+        if self.remote:
+            stats["model_server"] = self._remote_capabilities(refresh=True)
+        stats["sources"] = self.sources.get_stats()
+        stats["providers"] = {p.name: p.get_stats() for p in self.providers}
+        if self.embedding_cache:
+            stats["embedding_cache"] = self.embedding_cache.stats()
+        if self.corpus_index:
+            stats["corpus_index"] = self.corpus_index.stats()
+        if self.report_vectors:
+            stats["report_vectors"] = self.report_vectors.stats()
+        if self._lexical is not None:
+            stats["tfidf_documents"] = self._lexical.n_docs
+        return stats
\ No newline at end of file
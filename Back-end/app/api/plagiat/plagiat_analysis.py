@@ -1,25 +1,34 @@
 import os
-import re
+import json
 import sys
 import asyncio
+import time
+import threading
+import click
 import numpy as np
-import aiohttp
 from datetime import datetime
-from typing import List, Dict
-import pdfplumber
+from typing import Callable, List, Dict, Optional, Tuple
 from sqlalchemy.exc import SQLAlchemyError
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 root_dir = os.path.dirname(os.path.dirname(current_dir))
 sys.path.insert(0, root_dir)
 
-from flask import Blueprint, jsonify, request
-from ...models import db, Rapport, PlagiatAnalysis, PlagiatMatch, User
-
-try:
-    import docx
-except ImportError:
-    docx = None
+from flask import Blueprint, Response, jsonify, request, current_app
+from ...models import db, Rapport, PlagiatAnalysis, PlagiatMatch, PlagiatJob, PlagiatJobItem, User, Student
+from ...config import Config
+from .jobs import (
+    enqueue_job, job_status, cancel_job, resume_job, reclaim_stale, release_analysis,
+    ItemLease, JobCancelled, ACTIVE_STATUSES
+)
+from .process_pool import run_in_pool, analyze_rapports_parallel
+from .persistence import persist_analysis
+from .listing import ListingError, split_param, list_analyses, list_pending, parse_limit
+from .overview_stats import read_overview, check_overview_stats, rebuild_overview_stats
+from .progress import broker, stream_events
+from .chunking import chunk_coverage, select_for_lookup
+from .alignment import align_matches, coverage_ratio, decode_spans, merge_highlights
+from .text_extraction import load_document, file_fingerprint, chunk_fingerprint, calculate_text_stats  # noqa: F401
 
 try:
     from .plagiarism_detector import PlagiarismDetector
@@ -28,135 +37,88 @@ try:
 except ImportError as e:
     detector = None
 
-plagiat_analysis_bp = Blueprint("plagiat_analysis", __name__, url_prefix="/api/plagiat")
+plagiat_analysis_bp = Blueprint(
+    "plagiat_analysis", __name__, url_prefix="/api/plagiat", cli_group="plagiat"
+)
 
 
 def extract_text_from_file(filepath: str) -> str:
-    global root_dir
+    return load_document(filepath).text
 
-    if os.path.isabs(filepath) or ':' in filepath:
-        match = re.search(r'(uploads[/\\][\s\S]+)', filepath, re.IGNORECASE)
-        if match:
-            relative_path = match.group(1)
-            relative_path = relative_path.replace('/', os.path.sep).replace('\\', os.path.sep)
-        else:
-            relative_path = filepath
-    else:
-        relative_path = filepath.lstrip(os.path.sep)
 
-    absolute_filepath = os.path.join(root_dir, relative_path)
-    absolute_filepath = absolute_filepath.replace('/', os.path.sep).replace('\\', os.path.sep)
+def index_rapport(rapport) -> int:
+    if detector is None:
+        return 0
 
-    if not os.path.exists(absolute_filepath):
-        return ""
+    document = load_document(rapport.storage_path)
+    if not document.text or len(document.text) < 50:
+        return 0
 
-    try:
-        if absolute_filepath.endswith('.pdf'):
-            full_text = ""
-            with pdfplumber.open(absolute_filepath) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        full_text += page_text + "\n"
-            return full_text.strip()
-        elif absolute_filepath.endswith('.docx'):
-            if docx is None:
-                raise ImportError("python-docx est requis pour les fichiers .docx")
-            doc = docx.Document(absolute_filepath)
-            paragraphs = [p.text.strip() for p in doc.paragraphs if p.text.strip()]
-            return '\n'.join(paragraphs)
-        elif absolute_filepath.endswith('.txt'):
-            with open(absolute_filepath, 'r', encoding='utf-8') as f:
-                return f.read().strip()
-        else:
-            return ""
-    except Exception as e:
-        import traceback
-        return ""
-
-
-def count_syllables(word: str) -> int:
-    word = word.lower()
-    vowels = "aeiouyàâéèêëîïôùûüÿ"
-    count = 0
-    prev_char_vowel = False
-    for char in word:
-        is_vowel = char in vowels
-        if is_vowel and not prev_char_vowel:
-            count += 1
-        prev_char_vowel = is_vowel
-    return max(1, count)
-
-
-def calculate_text_stats(text: str) -> Dict:
-    words = text.split()
-    sentences = [s.strip() for s in re.split(r'[.!?]', text) if s.strip()]
-    paragraphs = [p.strip() for p in text.split('\n') if p.strip()]
-    unique_words = len(set(words))
-
-    syllables = sum(count_syllables(word) for word in words) or 1
-    words_count = len(words) or 1
-    sentences_count = len(sentences) or 1
-    readability = 206.835 - 1.015 * (words_count / sentences_count) - 84.6 * (syllables / words_count)
-    readability = max(0, min(100, readability))
+    return detector.index_rapport(rapport.id, document.chunks, document.chunk_pages)
 
-    return {
-        "total_words": words_count,
-        "total_characters": len(text),
-        "total_sentences": sentences_count,
-        "total_paragraphs": len(paragraphs),
-        "unique_words": unique_words,
-        "readability_score": round(readability, 2)
-    }
 
+def index_rapport_async(rapport_id: int) -> None:
+    # Indexation incrémentale au dépôt, sans bloquer la requête d'upload
+    app = current_app._get_current_object()
 
-def chunk_text_intelligently(text: str, max_chunks: int = 25) -> List[str]:
-    chunks = []
-    paragraphs = [p.strip() for p in text.split('\n') if p.strip()]
+    def run():
+        with app.app_context():
+            try:
+                rapport = Rapport.query.get(rapport_id)
+                if rapport:
+                    index_rapport(rapport)
+            except Exception as e:
+                app.logger.warning(f"Indexation du rapport {rapport_id} échouée : {e}")
 
-    for para in paragraphs:
-        words = para.split()
-        if len(words) <= 150:
-            chunks.append(para)
-        else:
-            sentences = re.split(r'(?<=[.!?])\s+', para)
-            current_chunk = []
-            current_words = 0
-            for sentence in sentences:
-                sentence_words = sentence.split()
-                if len(sentence_words) < 3:
-                    continue
-                if current_words + len(sentence_words) <= 100 and len(current_chunk) < 5:
-                    current_chunk.append(sentence)
-                    current_words += len(sentence_words)
-                else:
-                    if current_chunk:
-                        chunks.append(' '.join(current_chunk))
-                    current_chunk = [sentence]
-                    current_words = len(sentence_words)
-                if len(chunks) >= max_chunks:
-                    break
-            if current_chunk and len(chunks) < max_chunks:
-                chunks.append(' '.join(current_chunk))
-        if len(chunks) >= max_chunks:
-            break
-
-    if len(chunks) < 10:
-        sentences = [s.strip() for s in re.split(r'(?<=[.!?])\s+', text) if s.strip() and len(s.split()) >= 5]
-        for sentence in sentences:
-            if len(chunks) >= max_chunks:
-                break
-            chunks.append(sentence)
-
-    return chunks[:max_chunks]
-
-
-async def analyze_single_rapport(rapport, student, analysis_obj: PlagiatAnalysis = None) -> Dict:
+    threading.Thread(target=run, daemon=True).start()
+
+
+def summarize_matches(result: Dict) -> Dict:
+    matches = result.get("sources", [])
+    ai_score = result.get("ai_score", 0)
+
+    if matches:
+        similarity_score = max(m['similarity'] for m in matches)
+        avg_similarity = round(float(np.mean([m['similarity'] for m in matches])), 2)
+    else:
+        similarity_score = 0
+        avg_similarity = 0
+
+    if similarity_score > 60 or ai_score > 70:
+        risk = "high"
+    elif similarity_score > 30 or ai_score > 40:
+        risk = "medium"
+    elif similarity_score > 15 or ai_score > 20:
+        risk = "low"
+    else:
+        risk = "none"
+
+    result.update({
+        "similarity": similarity_score,
+        "originality": round(100 - similarity_score, 2),
+        "risk": risk,
+        "avg_similarity": avg_similarity,
+        "chunks_with_matches": len({m['chunk_index'] for m in matches})
+    })
+    return result
+
+
+async def compute_rapport_result(
+        rapport_id: int, storage_path: str, student_name: str, filename: str,
+        known_chunk_hashes: List[str] = None, progress: Callable = None
+) -> Dict:
+    # Analyse sans accès à la base : exécutable dans un processus du pool.
+    # Les chunks dont l'empreinte figure dans known_chunk_hashes ne sont ni
+    # recherchés ni rescorés : leurs correspondances précédentes sont reprises.
+    # progress(event, **data) est appelé à chaque étape (voir progress.py).
     if detector is None:
         raise RuntimeError("Le détecteur de plagiat n'a pas été initialisé.")
+    progress = progress or (lambda event, **data: None)
 
     try:
-        text_content = extract_text_from_file(rapport.storage_path)
+        document = load_document(storage_path)
+        file_hash = document.file_hash
+        text_content = document.text
 
         if not text_content or len(text_content) < 50:
             return {
@@ -167,132 +129,138 @@ async def analyze_single_rapport(rapport, student, analysis_obj: PlagiatAnalysis
                 "sources": [],
                 "note": "Document vide ou trop court (<50 caractères)",
                 "chunks_analyzed": 0,
-                "chunks_with_matches": 0
+                "chunks_with_matches": 0,
+                "file_hash": file_hash,
+                "chunk_hashes": []
             }
 
-        chunks = chunk_text_intelligently(text_content)
+        chunks = document.chunks
+        chunk_pages = document.chunk_pages
+        chunk_hashes = [chunk_fingerprint(chunk) for chunk in chunks]
+        known = set(known_chunk_hashes or [])
+        changed = [i for i, h in enumerate(chunk_hashes) if h not in known]
         all_matches_data = []
-
-        if analysis_obj:
-            try:
-                PlagiatMatch.query.filter_by(analysis_id=analysis_obj.id).delete()
-                db.session.flush()
-            except Exception as e:
-                pass
-
-        async with aiohttp.ClientSession() as session:
-            tasks = []
-            for i, chunk in enumerate(chunks):
-                if len(chunk.split()) >= 5:
-                    tasks.append(detector.check_web_source(chunk, session, i))
-
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-
-            matches_found_count = 0
-            matches_saved_count = 0
-
-            for i, sources in enumerate(results):
-                if isinstance(sources, Exception):
-                    continue
-
-                if isinstance(sources, list) and sources:
-                    matches_found_count += 1
-                    for source in sources:
-                        similarity = source.get('similarity', 0)
-                        similarity_percent = round(similarity * 100, 2)
-
-                        if similarity_percent > 5:
-                            match_data = {
-                                'text': source.get('query_text', chunks[i])[:500],
-                                'source_url': source.get('url', ''),
-                                'similarity': similarity_percent,
-                                'score': source.get('score', 0),
-                                'source': source.get('source', 'Web'),
-                                'matched_text': source.get('matched_text', ''),
-                                'original_text': source.get('original_text', ''),
-                                'page': i + 1,
-                                'chunk_index': i,
-                            }
-                            all_matches_data.append(match_data)
-
-                            if analysis_obj:
-                                try:
-                                    match_obj = PlagiatMatch(
-                                        analysis_id=analysis_obj.id,
-                                        text=match_data['text'][:1000],
-                                        source_url=match_data['source_url'][:500],
-                                        source=match_data['source'][:100],
-                                        score=match_data['score'],
-                                        similarity=match_data['similarity'],
-                                        matched_text=match_data['matched_text'][:1000],
-                                        original_text=match_data['original_text'][:1000],
-                                        page=match_data['page'],
-                                        chunk_index=match_data['chunk_index']
-                                    )
-                                    db.session.add(match_obj)
-                                    matches_saved_count += 1
-
-                                    if matches_saved_count % 10 == 0:
-                                        db.session.flush()
-
-                                except Exception as e:
-                                    db.session.rollback()
-
-        if analysis_obj and matches_saved_count > 0:
+        progress("extracted", chunks=len(chunks), changed_chunks=len(changed),
+                 words=document.stats.get("total_words", 0), pages=document.page_count)
+
+        # Tous les chunks passent par l'index interne ; les recherches externes,
+        # elles, sont limitées aux chunks les plus nouveaux
+        eligible = [i for i in changed if len(chunks[i].split()) >= 5]
+        queried = eligible
+        if Config.PLAGIAT_CHUNK_MODE != "legacy":
+            queried = select_for_lookup(chunks, eligible, Config.PLAGIAT_LOOKUP_BUDGET)
+
+        # Chunks à recommencer à la prochaine analyse : hors budget ou
+        # recherche en échec. Leur empreinte n'est pas enregistrée.
+        pending = set(eligible) - set(queried)
+
+        async def lookup(i):
+            failures = []
             try:
-                db.session.flush()
+                candidates = await detector.fetch_web_candidates(chunks[i], failures=failures)
             except Exception as e:
-                db.session.rollback()
-
-        ai_result = detector.calculate_ai_score(text_content) if detector.has_ai_detector else {"ai_score": 0,
-                                                                                                "risk": "none"}
-        ai_score = ai_result.get('ai_score', 0)
-
-        if all_matches_data:
-            similarity_score = max(m['similarity'] for m in all_matches_data)
-            avg_similarity = round(np.mean([m['similarity'] for m in all_matches_data]), 2)
-        else:
-            similarity_score = 0
-            avg_similarity = 0
-
-        originality_score = round(100 - similarity_score, 2)
-
-        if similarity_score > 60 or ai_score > 70:
-            risk = "high"
-        elif similarity_score > 30 or ai_score > 40:
-            risk = "medium"
-        elif similarity_score > 15 or ai_score > 20:
-            risk = "low"
-        else:
-            risk = "none"
-
-        text_stats = calculate_text_stats(text_content)
+                pending.add(i)
+                progress("chunk_queried", chunk_index=i, candidates=0, error=str(e))
+                return e
+            if failures:
+                pending.add(i)
+            progress("chunk_queried", chunk_index=i, candidates=len(candidates or []))
+            return candidates
+
+        fetched = await asyncio.gather(*[lookup(i) for i in queried])
+
+        # Un seul passage batché du modèle pour tous les chunks et candidats
+        scored_indices, scored_candidates = [], []
+        for i, candidates in zip(queried, fetched):
+            if isinstance(candidates, Exception) or not candidates:
+                continue
+            scored_indices.append(i)
+            scored_candidates.append(candidates)
+
+        # Tout le travail CPU (modèles, index) part dans un thread : la
+        # boucle d'événements ne fait que des entrées/sorties.
+        loop = asyncio.get_running_loop()
+        scored = await loop.run_in_executor(
+            None,
+            detector.score_web_candidates,
+            [chunks[i] for i in scored_indices], scored_candidates, scored_indices
+        )
+        results = dict(zip(scored_indices, scored))
+        progress("sources_queried", lookups=len(queried), chunks_with_candidates=len(scored_indices))
 
-        return {
-            "student": student.name,
-            "rapport": rapport.filename,
-            "similarity": similarity_score,
-            "originality": originality_score,
-            "risk": risk,
+        # Comparaison avec les autres rapports déjà déposés (index local)
+        internal = await loop.run_in_executor(
+            None, detector.check_internal_corpus, rapport_id, [chunks[i] for i in changed]
+        )
+        for i, hits in zip(changed, internal):
+            if hits:
+                results[i] = results.get(i, []) + hits
+        await loop.run_in_executor(None, detector.index_rapport, rapport_id, chunks, chunk_pages)
+        progress("embedded", chunks=len(chunks), internal_matches=sum(len(hits) for hits in internal))
+
+        for i, sources in sorted(results.items()):
+            if isinstance(sources, list) and sources:
+                for source in sources:
+                    similarity = source.get('similarity', 0)
+                    similarity_percent = round(similarity * 100, 2)
+
+                    if similarity_percent > 5:
+                        all_matches_data.append({
+                            'text': source.get('query_text', chunks[i])[:500],
+                            'source_url': source.get('url', ''),
+                            'similarity': similarity_percent,
+                            'score': source.get('score', 0),
+                            'source': source.get('source', 'Web'),
+                            'matched_text': source.get('matched_text', ''),
+                            'original_text': source.get('original_text', ''),
+                            'page': chunk_pages[i] if i < len(chunk_pages) else None,
+                            'chunk_index': i,
+                            'chunk_hash': chunk_hashes[i],
+                            'source_text': source.get('source_text', ''),
+                        })
+
+        # Passages communs calculés ici, une fois : l'affichage ne recalcule rien
+        align_matches(document, all_matches_data)
+
+        ai_result = await loop.run_in_executor(None, detector.calculate_ai_score, text_content)
+        progress("ai_scored", ai_score=round(ai_result.get('ai_score', 0), 2))
+
+        text_stats = document.stats
+        coverage = dict(document.coverage)
+        coverage["lookups"] = len(queried)
+        coverage["lookup_coverage_percent"] = chunk_coverage(
+            text_content, [chunks[i] for i in queried])["coverage_percent"]
+
+        return summarize_matches({
+            "student": student_name,
+            "rapport": filename,
             "sources": all_matches_data,
-            "ai_score": round(ai_score, 2),
+            "ai_score": round(ai_result.get('ai_score', 0), 2),
+            "ai_perplexity": ai_result.get("perplexity"),
+            "ai_sections": ai_result.get("sections", []),
             "chunks_analyzed": len(chunks),
-            "chunks_with_matches": matches_found_count,
-            "avg_similarity": avg_similarity,
-            "matches_saved": matches_saved_count,
+            "chunks_reanalyzed": len(changed),
+            "file_hash": file_hash,
+            # Position de chaque chunk ; None pour un chunk à recommencer
+            "chunk_hashes": [None if i in pending else h for i, h in enumerate(chunk_hashes)],
+            "chunk_pages": chunk_pages,
+            "reused_chunk_hashes": [h for h in chunk_hashes if h in known],
+            "pending_chunks": len(pending),
+            "coverage": coverage,
             # Stats textuelles
             "word_count": text_stats.get("total_words", 0),
             "unique_words": text_stats.get("unique_words", 0),
             "character_count": text_stats.get("total_characters", 0),
             "paragraph_count": text_stats.get("total_paragraphs", 0),
             "readability_score": text_stats.get("readability_score", 0)
-        }
+        })
 
+    except JobCancelled:
+        raise
     except Exception as e:
-        import traceback
         return {
-            "student": student.name,
-            "rapport": rapport.filename,
+            "student": student_name,
+            "rapport": filename,
             "similarity": 0,
             "originality": 100,
             "risk": "none",
@@ -304,72 +272,109 @@ async def analyze_single_rapport(rapport, student, analysis_obj: PlagiatAnalysis
         }
 
 
-@plagiat_analysis_bp.route("/analyze_all", methods=["POST"])
-def analyze_all_reports():
+def known_chunk_hashes(analysis_obj: Optional[PlagiatAnalysis]) -> List[str]:
+    # Empreintes réutilisables : seulement si l'analyse précédente a abouti
+    if not analysis_obj or analysis_obj.status != "completed" or not analysis_obj.chunk_hashes:
+        return []
+    return json.loads(analysis_obj.chunk_hashes)
+
+
+def is_unchanged(analysis: Optional[PlagiatAnalysis], file_hash: Optional[str]) -> bool:
+    return bool(
+        analysis and analysis.status == "completed"
+        and file_hash and analysis.file_hash == file_hash
+    )
+
+
+def analyze_rapport(rapport, student, analysis: Optional[PlagiatAnalysis] = None,
+                    progress: Callable = None) -> Tuple[PlagiatAnalysis, Dict]:
+    # Calcul et enregistrement d'une analyse. La ligne passe à "processing" et
+    # la transaction est validée avant le calcul : aucun verrou n'est tenu
+    # pendant les modèles et les recherches. Le bail (heartbeat_at) est
+    # renouvelé par l'appelant (jobs.ItemLease).
+    known = known_chunk_hashes(analysis)
+    if not analysis:
+        analysis = PlagiatAnalysis(rapport_id=rapport.id)
+        db.session.add(analysis)
+    analysis.status = "processing"
+    analysis.heartbeat_at = datetime.utcnow()
+    db.session.commit()
+
     try:
-        rapports = Rapport.query.all()
-        results = []
+        if Config.PLAGIAT_ANALYSIS_EXECUTOR == "process":
+            # Calcul dans un processus du pool, écritures ici
+            result = run_in_pool(
+                (rapport.id, rapport.storage_path, student.name, rapport.filename, known), progress
+            )
+        else:
+            result = asyncio.run(compute_rapport_result(
+                rapport.id, rapport.storage_path, student.name, rapport.filename,
+                known_chunk_hashes=known, progress=progress
+            ))
+    except Exception:
+        # Rien n'a été écrit (annulation, pool en échec) : l'analyse
+        # précédente reste la référence
+        db.session.rollback()
+        release_analysis(analysis)
+        raise
+    persist_analysis(analysis, result)
+    return analysis, result
 
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
 
-        db.session.begin_nested()
+def run_rapport_analysis(rapport_id: int, force: bool = False, progress: Callable = None) -> Dict:
+    # Analyse complète d'un rapport, utilisée par les workers de la file
+    rapport = Rapport.query.get(rapport_id)
+    if not rapport:
+        return {"rapport_id": rapport_id, "error": "Rapport non trouvé"}
 
-        for rapport in rapports:
-            student = User.query.get(rapport.auteur_id)
-            if not student:
-                continue
+    student = User.query.get(rapport.auteur_id)
+    if not student:
+        return {"rapport_id": rapport_id, "error": "Étudiant non trouvé"}
 
-            analysis = PlagiatAnalysis.query.filter_by(rapport_id=rapport.id).first()
-            if not analysis:
-                analysis = PlagiatAnalysis(rapport_id=rapport.id)
-                db.session.add(analysis)
-                db.session.flush()
-
-            res = loop.run_until_complete(analyze_single_rapport(rapport, student, analysis_obj=analysis))
-            results.append(res)
-
-            analysis.similarity_score = res["similarity"]
-            analysis.originality_score = res["originality"]
-            analysis.risk_level = res["risk"]
-            analysis.total_matches = len(res.get("sources", []))
-            analysis.sources_count = len(res.get("sources", []))
-            analysis.status = "completed"
-            analysis.analyzed_at = datetime.utcnow()
-            analysis.ai_score = res.get("ai_score", 0)
-            analysis.chunks_analyzed = res.get("chunks_analyzed", 0)
-            analysis.chunks_with_matches = res.get("chunks_with_matches", 0)
-            # Save detailed stats
-            analysis.word_count = res.get("word_count", 0)
-            analysis.unique_words = res.get("unique_words", 0)
-            analysis.character_count = res.get("character_count", 0)
-            analysis.paragraph_count = res.get("paragraph_count", 0)
-            analysis.readability_score = res.get("readability_score", 0)
-            analysis.chunks_with_matches = res.get("chunks_with_matches", 0)
+    analysis = PlagiatAnalysis.query.filter_by(rapport_id=rapport.id).first()
 
-        db.session.commit()
+    # Fichier inchangé depuis la dernière analyse réussie : rien à refaire
+    if not force and is_unchanged(analysis, file_fingerprint(rapport.storage_path)):
+        return {"rapport_id": rapport.id, "analysis_id": analysis.id, "skipped": True}
 
-        successful = [r for r in results if 'error' not in r]
-        avg_similarity = round(np.mean([r['similarity'] for r in successful]) if successful else 0, 2)
-        avg_originality = round(np.mean([r['originality'] for r in successful]) if successful else 100, 2)
+    analysis, result = analyze_rapport(rapport, student, analysis, progress)
+    if progress:
+        progress("matches_saved", analysis_id=analysis.id, matches=len(result.get("sources", [])))
 
-        return jsonify({
-            "results": results,
-            "statistics": {
-                "total_rapports": len(rapports),
-                "analyses_reussies": len(successful),
-                "average_similarity": avg_similarity,
-                "average_originality": avg_originality
-            },
-            "status": "completed"
-        })
+    return {
+        "rapport_id": rapport.id,
+        "analysis_id": analysis.id,
+        "filename": rapport.filename,
+        "student_name": student.name,
+        "similarity": result.get("similarity", 0),
+        "risk": result.get("risk", "none"),
+        "chunks_reanalyzed": result.get("chunks_reanalyzed"),
+        "coverage": result.get("coverage"),
+        "error": result.get("error")
+    }
+
+
+def _queued_response(job, message: str, **extra):
+    data = job_status(job)
+    data.update(extra)
+    data["message"] = message
+    data["status_url"] = f"/api/plagiat/jobs/{job.id}"
+    return jsonify(data), 202
+
+
+@plagiat_analysis_bp.route("/analyze_all", methods=["POST"])
+def analyze_all_reports():
+    try:
+        rapport_ids = [rapport_id for (rapport_id,) in db.session.query(Rapport.id).order_by(Rapport.id)]
+        job = enqueue_job("analyze_all", rapport_ids)
+
+        return _queued_response(job, f"{len(rapport_ids)} rapports mis en file d'analyse")
 
     except SQLAlchemyError as e:
         db.session.rollback()
         return jsonify(
             {"error": "Erreur de base de données lors de l'analyse multiple: " + str(e), "status": "error"}), 500
     except Exception as e:
-        import traceback
         return jsonify({"error": str(e), "status": "error"}), 500
 
 
@@ -384,7 +389,13 @@ def analyze_single(rapport_id):
 
         analysis = PlagiatAnalysis.query.filter_by(rapport_id=rapport.id).first()
 
-        if analysis and analysis.status == "completed" and analysis.analyzed_at is not None:
+        # Une analyse terminée n'est refaite que si le fichier a changé depuis ;
+        # seuls les chunks modifiés sont alors recherchés et rescorés.
+        file_changed = bool(
+            analysis and analysis.file_hash
+            and analysis.file_hash != file_fingerprint(rapport.storage_path)
+        )
+        if analysis and analysis.status == "completed" and analysis.analyzed_at is not None and not file_changed:
             formatted_date = analysis.analyzed_at.strftime('%Y-%m-%d %H:%M:%S')
 
             return jsonify({
@@ -400,45 +411,10 @@ def analyze_single(rapport_id):
                 "analysis_id": analysis.id
             })
 
-        if analysis:
-            try:
-                PlagiatMatch.query.filter_by(analysis_id=analysis.id).delete()
-                db.session.flush()
-            except Exception as e:
-                db.session.rollback()
-        else:
-            analysis = PlagiatAnalysis(rapport_id=rapport.id)
-            db.session.add(analysis)
-
-        db.session.flush()
-
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-
-        result = loop.run_until_complete(analyze_single_rapport(rapport, student, analysis_obj=analysis))
-
-        matches_count = len(result.get("sources", []))
-
-        analysis.similarity_score = result["similarity"]
-        analysis.originality_score = result["originality"]
-        analysis.risk_level = result["risk"]
-        analysis.total_matches = matches_count
-        analysis.sources_count = matches_count
-        analysis.status = "completed"
-        analysis.analyzed_at = datetime.utcnow()
-        analysis.ai_score = result.get("ai_score", 0)
-        analysis.chunks_analyzed = result.get("chunks_analyzed", 0)
-        analysis.chunks_with_matches = result.get("chunks_with_matches", 0)
-        # Save detailed stats
-        analysis.word_count = result.get("word_count", 0)
-        analysis.unique_words = result.get("unique_words", 0)
-        analysis.character_count = result.get("character_count", 0)
-        analysis.paragraph_count = result.get("paragraph_count", 0)
-        analysis.readability_score = result.get("readability_score", 0)
-
-        saved_matches = PlagiatMatch.query.filter_by(analysis_id=analysis.id).count()
-
-        db.session.commit()
+        # Bail renouvelé pendant le calcul, comme pour un élément de job
+        with ItemLease(None, None, rapport.id):
+            analysis, result = analyze_rapport(rapport, student, analysis)
+        saved_matches = result["matches_saved"]
 
         return jsonify({
             "analysis": result,
@@ -489,8 +465,9 @@ def get_analysis(analysis_id):
 
         avg_similarity = total_similarity / len(sources) if sources else 0
 
-        text_content = extract_text_from_file(rapport.storage_path)
-        text_stats = calculate_text_stats(text_content) if text_content else {}
+        # Statistiques lues dans le cache des textes : pas de nouvelle extraction
+        document = load_document(rapport.storage_path)
+        text_stats = document.stats
 
         response = {
             'analysis': {
@@ -501,6 +478,7 @@ def get_analysis(analysis_id):
                 'risk': analysis.risk_level or 'none',
                 'sources': sources,
                 'ai_score': analysis.ai_score or 0,
+                'ai_sections': json.loads(analysis.ai_sections) if analysis.ai_sections else [],
                 'chunks_analyzed': analysis.chunks_analyzed or 0,
                 'chunks_with_matches': analysis.chunks_with_matches or 0,
                 'avg_similarity': round(avg_similarity, 2),
@@ -511,6 +489,7 @@ def get_analysis(analysis_id):
                 'total_paragraphs': text_stats.get('total_paragraphs', 0),
                 'unique_words': text_stats.get('unique_words', 0),
                 'readability_score': text_stats.get('readability_score', 0),
+                'coverage': document.coverage,
                 'storage_path': rapport.storage_path
             },
             'analysis_id': analysis.id,
@@ -533,42 +512,178 @@ def get_analysis(analysis_id):
         }), 500
 
 
-@plagiat_analysis_bp.route("/analyses", methods=["GET"])
-def get_all_analyses():
+@plagiat_analysis_bp.route("/analysis/<int:analysis_id>/highlights", methods=["GET"])
+def get_analysis_highlights(analysis_id):
+    # Passages surlignés : positions enregistrées à l'analyse, texte lu dans le
+    # cache des textes ; aucun modèle n'est relancé. ?include_text=1 ajoute le texte complet.
+    analysis = PlagiatAnalysis.query.get(analysis_id)
+    if not analysis:
+        return jsonify({"error": "Analyse non trouvée"}), 404
+    rapport = Rapport.query.get(analysis.rapport_id)
+    if not rapport:
+        return jsonify({"error": "Rapport non trouvé"}), 404
+
+    document = load_document(rapport.storage_path)
+    if analysis.file_hash and document.file_hash and analysis.file_hash != document.file_hash:
+        return jsonify({
+            "error": "Le fichier a changé depuis l'analyse : relancez l'analyse",
+            "status": "stale"
+        }), 409
+
+    rows = (
+        db.session.query(PlagiatMatch.id, PlagiatMatch.chunk_index, PlagiatMatch.source,
+                         PlagiatMatch.source_url, PlagiatMatch.similarity, PlagiatMatch.matched_text,
+                         PlagiatMatch.spans)
+        .filter(PlagiatMatch.analysis_id == analysis.id)
+        .order_by(PlagiatMatch.chunk_index, PlagiatMatch.id)
+        .all()
+    )
+
+    matches, ranges = [], []
+    for row in rows:
+        spans = decode_spans(row.spans)
+        index = row.chunk_index
+        offsets = document.chunk_offsets[index] if index is not None and index < len(document.chunk_offsets) else None
+        if not spans or not offsets:
+            continue
+        items = []
+        for start, end, source_start, source_end in spans:
+            start, end = offsets[0] + start, offsets[0] + end
+            items.append({
+                "start": start,
+                "end": end,
+                "page": document.page_of_offset(start),
+                "text": document.text[start:end],
+                "source_start": source_start,
+                "source_end": source_end
+            })
+            ranges.append((start, end, row.id, row.similarity or 0))
+        matches.append({
+            "id": row.id,
+            "chunk_index": index,
+            "source": row.source or "Inconnu",
+            "source_url": row.source_url or "",
+            "similarity": row.similarity or 0,
+            "matched_text": row.matched_text or "",
+            "aligned_ratio": round(coverage_ratio(spans, offsets[1] - offsets[0]), 3),
+            "spans": items
+        })
+
+    highlights = merge_highlights(ranges)
+    for highlight in highlights:
+        highlight["page"] = document.page_of_offset(highlight["start"])
+
+    response = {
+        "analysis_id": analysis.id,
+        "rapport_id": rapport.id,
+        "text_length": len(document.text),
+        "matches": matches,
+        "highlights": highlights
+    }
+    if request.args.get("include_text") in ("1", "true"):
+        response["text"] = document.text
+    return jsonify(response)
+
+
+@plagiat_analysis_bp.route("/similar/<int:rapport_id>", methods=["GET"])
+def get_similar_reports(rapport_id):
+    # Rapports les plus proches d'après les embeddings conservés à l'analyse.
+    # ?filiere= : cohorte comparée (par défaut celle de l'auteur, "all" = tous
+    # les rapports) ; ?top_k= ; ?excerpts=1 ajoute le texte des chunks cités.
+    if detector is None or detector.report_vectors is None:
+        return jsonify({"error": "Le détecteur de plagiat n'a pas été initialisé.", "status": "error"}), 500
+
+    row = (
+        db.session.query(Rapport.id, Rapport.storage_path, Student.filiere)
+        .outerjoin(Student, Student.user_id == Rapport.auteur_id)
+        .filter(Rapport.id == rapport_id)
+        .first()
+    )
+    if not row:
+        return jsonify({"error": "Rapport non trouvé"}), 404
+
     try:
-        analyses = PlagiatAnalysis.query.order_by(PlagiatAnalysis.analyzed_at.desc()).all()
-        results = []
+        top_k = int(request.args.get("top_k", Config.PLAGIAT_SIMILAR_TOP_K))
+    except ValueError:
+        return jsonify({"error": "top_k doit être un entier"}), 400
+    top_k = max(1, min(top_k, Config.PLAGIAT_SIMILAR_MAX_TOP_K))
+
+    filiere = split_param(request.args.get("filiere")) or ([row.filiere] if row.filiere else [])
+    candidate_ids = None
+    if filiere and filiere != ["all"]:
+        candidate_ids = [
+            rid for (rid,) in db.session.query(Rapport.id)
+            .join(Student, Student.user_id == Rapport.auteur_id)
+            .filter(Student.filiere.in_(filiere))
+        ]
+
+    results = detector.report_vectors.similar(
+        rapport_id, candidate_ids,
+        top_k=top_k,
+        shortlist=Config.PLAGIAT_SIMILAR_SHORTLIST,
+        threshold=Config.PLAGIAT_SIMILAR_CHUNK_COSINE
+    )
+    if results is None:
+        return jsonify({
+            "error": "Rapport pas encore indexé : lancez son analyse ou /index/rebuild",
+            "status": "not_indexed"
+        }), 404
 
-        for analysis in analyses:
-            rapport = Rapport.query.get(analysis.rapport_id)
-            student = User.query.get(rapport.auteur_id) if rapport else None
+    details = {
+        r.id: r for r in db.session.query(
+            Rapport.id, Rapport.filename, Rapport.storage_path, User.name, User.prenom, Student.filiere
+        )
+        .join(User, User.id == Rapport.auteur_id)
+        .outerjoin(Student, Student.user_id == User.id)
+        .filter(Rapport.id.in_([r["rapport_id"] for r in results]))
+    }
+    # Rapports supprimés depuis leur indexation : ignorés
+    results = [r for r in results if r["rapport_id"] in details]
+    for result in results:
+        other = details[result["rapport_id"]]
+        result["filename"] = other.filename
+        result["student_name"] = f"{other.name} {other.prenom}"
+        result["filiere"] = other.filiere
+
+    if request.args.get("excerpts") in ("1", "true"):
+        chunks = load_document(row.storage_path).chunks
+        for result in results:
+            other_chunks = load_document(details[result["rapport_id"]].storage_path).chunks
+            for pair in result["evidence"]:
+                i, j = pair["chunk_index"], pair["other_chunk_index"]
+                pair["text"] = chunks[i][:300] if i < len(chunks) else ""
+                pair["other_text"] = other_chunks[j][:300] if j < len(other_chunks) else ""
 
-            matches_count = PlagiatMatch.query.filter_by(analysis_id=analysis.id).count()
+    return jsonify({
+        "rapport_id": rapport_id,
+        "filiere": filiere or None,
+        "candidates": len(candidate_ids) if candidate_ids is not None else None,
+        "results": results
+    })
 
-            result = {
-                'id': analysis.id,
-                'rapport_id': analysis.rapport_id,
-                'rapport_name': rapport.filename if rapport else 'Document inconnu',
-                'student_name': student.name if student else 'Étudiant inconnu',
-                'student_id': student.id if student else None,
-                'similarity': analysis.similarity_score or 0,
-                'originality': analysis.originality_score or 100,
-                'risk': analysis.risk_level or 'none',
-                'ai_score': analysis.ai_score or 0,
-                'status': analysis.status or 'unknown',
-                'analyzed_at': analysis.analyzed_at.isoformat() if analysis.analyzed_at else None,
-                'total_matches': matches_count,
-                'chunks_analyzed': analysis.chunks_analyzed or 0,
-                'chunks_with_matches': analysis.chunks_with_matches or 0
-            }
-            results.append(result)
+
+@plagiat_analysis_bp.route("/analyses", methods=["GET"])
+def get_all_analyses():
+    # ?after=<curseur>&limit=&risk=high,medium&status=completed&filiere=GI
+    try:
+        analyses, next_cursor = list_analyses(
+            after=request.args.get("after"),
+            limit=parse_limit(request.args.get("limit")),
+            risk=request.args.get("risk"),
+            status=request.args.get("status"),
+            filiere=request.args.get("filiere")
+        )
 
         return jsonify({
-            'analyses': results,
-            'count': len(results),
+            'analyses': analyses,
+            'count': len(analyses),
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None,
             'status': 'success'
         })
 
+    except ListingError as e:
+        return jsonify({'error': str(e), 'status': 'error'}), 400
     except Exception as e:
         return jsonify({
             'error': str(e),
@@ -578,31 +693,24 @@ def get_all_analyses():
 
 @plagiat_analysis_bp.route("/pending_analyses", methods=["GET"])
 def get_pending_analyses():
+    # ?after=<curseur>&limit=&filiere=GI
     try:
-        all_rapports = Rapport.query.all()
-        pending_rapports = []
-
-        for rapport in all_rapports:
-            analysis = PlagiatAnalysis.query.filter_by(rapport_id=rapport.id).first()
-
-            if not analysis:
-                student = User.query.get(rapport.auteur_id)
-                if student:
-                    pending_rapports.append({
-                        'rapport_id': rapport.id,
-                        'filename': rapport.filename,
-                        'student_id': student.id,
-                        'student_name': student.name,
-                        'storage_path': rapport.storage_path,
-                        'created_at': rapport.created_at.isoformat() if rapport.created_at else None
-                    })
+        pending_rapports, next_cursor = list_pending(
+            after=request.args.get("after"),
+            limit=parse_limit(request.args.get("limit")),
+            filiere=request.args.get("filiere")
+        )
 
         return jsonify({
             'pending_analyses': pending_rapports,
             'count': len(pending_rapports),
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None,
             'status': 'success'
         })
 
+    except ListingError as e:
+        return jsonify({'error': str(e), 'status': 'error'}), 400
     except Exception as e:
         return jsonify({
             'error': str(e),
@@ -613,65 +721,21 @@ def get_pending_analyses():
 @plagiat_analysis_bp.route("/analyze_selected", methods=["POST"])
 def analyze_selected_reports():
     try:
-        data = request.get_json()
+        data = request.get_json() or {}
         rapport_ids = data.get('rapport_ids', [])
 
         if not rapport_ids:
             return jsonify({"error": "Aucun rapport sélectionné", "status": "error"}), 400
 
-        results = []
-        processed_count = 0
-
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-
-        db.session.begin_nested()
-
-        for rapport_id in rapport_ids:
-            rapport = Rapport.query.get(rapport_id)
-            if not rapport:
-                continue
-
-            student = User.query.get(rapport.auteur_id)
-            if not student:
-                continue
+        existing_ids = [
+            rapport_id for (rapport_id,) in
+            db.session.query(Rapport.id).filter(Rapport.id.in_(rapport_ids)).order_by(Rapport.id)
+        ]
+        job = enqueue_job("analyze_selected", existing_ids)
 
-            analysis = PlagiatAnalysis.query.filter_by(rapport_id=rapport.id).first()
-            if not analysis:
-                analysis = PlagiatAnalysis(rapport_id=rapport.id)
-                db.session.add(analysis)
-                db.session.flush()
-
-            res = loop.run_until_complete(analyze_single_rapport(rapport, student, analysis_obj=analysis))
-            results.append({
-                'rapport_id': rapport.id,
-                'filename': rapport.filename,
-                'student_name': student.name,
-                'result': res
-            })
-
-            analysis.similarity_score = res.get("similarity", 0)
-            analysis.originality_score = res.get("originality", 100)
-            analysis.risk_level = res.get("risk", "none")
-            analysis.total_matches = len(res.get("sources", []))
-            analysis.sources_count = len(res.get("sources", []))
-            analysis.status = "completed"
-            analysis.analyzed_at = datetime.utcnow()
-            analysis.ai_score = res.get("ai_score", 0)
-            analysis.chunks_analyzed = res.get("chunks_analyzed", 0)
-            analysis.chunks_with_matches = res.get("chunks_with_matches", 0)
-
-            processed_count += 1
-
-        db.session.commit()
-
-        return jsonify({
-            "results": results,
-            "processed_count": processed_count,
-            "total_selected": len(rapport_ids),
-            "status": "completed",
-            "message": f"{processed_count} rapports analysés avec succès"
-        })
+        return _queued_response(
+            job, f"{len(existing_ids)} rapports mis en file d'analyse", total_selected=len(rapport_ids)
+        )
 
     except SQLAlchemyError as e:
         db.session.rollback()
@@ -685,124 +749,161 @@ def analyze_selected_reports():
 @plagiat_analysis_bp.route("/analyze_all_pending", methods=["POST"])
 def analyze_all_pending_reports():
     try:
-        all_rapports = Rapport.query.all()
-        pending_rapports = []
-
-        for rapport in all_rapports:
-            analysis = PlagiatAnalysis.query.filter_by(rapport_id=rapport.id).first()
-            if not analysis:
-                pending_rapports.append(rapport)
-
-        if not pending_rapports:
+        # Analyses interrompues (bail expiré) d'abord : leurs rapports
+        # redeviennent en attente
+        reclaim_stale()
+        # Rapports sans analyse et pas déjà en file
+        in_queue = db.session.query(PlagiatJobItem.rapport_id).filter(
+            PlagiatJobItem.status.in_(ACTIVE_STATUSES)
+        )
+        pending_ids = [
+            rapport_id for (rapport_id,) in
+            db.session.query(Rapport.id)
+            .outerjoin(PlagiatAnalysis, PlagiatAnalysis.rapport_id == Rapport.id)
+            .filter(PlagiatAnalysis.id.is_(None), Rapport.id.notin_(in_queue))
+            .order_by(Rapport.id)
+        ]
+
+        if not pending_ids:
             return jsonify({
                 "message": "Tous les rapports ont déjà été analysés",
                 "status": "no_action",
                 "pending_count": 0
             })
 
-        results = []
-        processed_count = 0
+        job = enqueue_job("analyze_all_pending", pending_ids)
 
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        return _queued_response(job, f"{len(pending_ids)} rapports mis en file d'analyse automatique")
 
-        db.session.begin_nested()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({"error": "Erreur de base de données: " + str(e), "status": "error"}), 500
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": str(e), "status": "error"}), 500
 
-        for rapport in pending_rapports:
-            student = User.query.get(rapport.auteur_id)
-            if not student:
-                continue
 
-            analysis = PlagiatAnalysis(rapport_id=rapport.id)
-            db.session.add(analysis)
-            db.session.flush()
+@plagiat_analysis_bp.route("/jobs/<int:job_id>", methods=["GET"])
+def get_job(job_id):
+    job = PlagiatJob.query.get_or_404(job_id)
+    with_items = request.args.get("items", "false").lower() in ("1", "true", "yes")
+    return jsonify(job_status(job, with_items=with_items))
 
-            res = loop.run_until_complete(analyze_single_rapport(rapport, student, analysis_obj=analysis))
-            results.append({
-                'rapport_id': rapport.id,
-                'filename': rapport.filename,
-                'student_name': student.name,
-                'result': res
-            })
 
-            analysis.similarity_score = res.get("similarity", 0)
-            analysis.originality_score = res.get("originality", 100)
-            analysis.risk_level = res.get("risk", "none")
-            analysis.total_matches = len(res.get("sources", []))
-            analysis.sources_count = len(res.get("sources", []))
-            analysis.status = "completed"
-            analysis.analyzed_at = datetime.utcnow()
-            analysis.ai_score = res.get("ai_score", 0)
-            analysis.chunks_analyzed = res.get("chunks_analyzed", 0)
-            analysis.chunks_with_matches = res.get("chunks_with_matches", 0)
-            # Save detailed text stats
-            analysis.word_count = res.get("word_count", 0)
-            analysis.unique_words = res.get("unique_words", 0)
-            analysis.character_count = res.get("character_count", 0)
-            analysis.paragraph_count = res.get("paragraph_count", 0)
-            analysis.readability_score = res.get("readability_score", 0)
-
-            processed_count += 1
+@plagiat_analysis_bp.route("/jobs/<int:job_id>/cancel", methods=["POST"])
+def cancel_job_route(job_id):
+    # Les rapports en file sont abandonnés, ceux en cours s'arrêtent à leur
+    # prochaine étape sans rien écrire ; les rapports terminés sont conservés
+    job = PlagiatJob.query.get_or_404(job_id)
+    if job.finished_at and not job.cancelled_at:
+        return jsonify({"error": "Job déjà terminé", "status": "error"}), 409
+    try:
+        if not job.cancelled_at:
+            cancel_job(job)
+        return jsonify(job_status(job))
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({"error": "Erreur de base de données: " + str(e), "status": "error"}), 500
 
-        db.session.commit()
 
-        return jsonify({
-            "results": results,
-            "processed_count": processed_count,
-            "total_pending": len(pending_rapports),
-            "status": "completed",
-            "message": f"{processed_count} rapports analysés automatiquement"
-        })
+@plagiat_analysis_bp.route("/jobs/<int:job_id>/resume", methods=["POST"])
+def resume_job_route(job_id):
+    # Reprise au dernier rapport terminé ; ?retry_errors=1 relance aussi les
+    # rapports en erreur
+    job = PlagiatJob.query.get_or_404(job_id)
+    retry_errors = request.args.get("retry_errors", "false").lower() in ("1", "true", "yes")
+    try:
+        requeued = resume_job(job, retry_errors=retry_errors)
+        return _queued_response(job, f"{requeued} rapports remis en file", requeued=requeued)
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({"error": "Erreur de base de données: " + str(e), "status": "error"}), 500
+
 
+@plagiat_analysis_bp.route("/jobs/reclaim", methods=["POST"])
+def reclaim_jobs():
+    # Reprise immédiate des analyses dont le bail a expiré (sinon faite
+    # périodiquement par la file locale)
+    try:
+        return jsonify(reclaim_stale())
     except SQLAlchemyError as e:
         db.session.rollback()
         return jsonify({"error": "Erreur de base de données: " + str(e), "status": "error"}), 500
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return jsonify({"error": str(e), "status": "error"}), 500
 
 
-@plagiat_analysis_bp.route("/overview", methods=["GET"])
-def get_overview():
+@plagiat_analysis_bp.route("/jobs/<int:job_id>/events", methods=["GET"])
+def stream_job_events(job_id):
+    # Avancement en direct (Server-Sent Events) : état du job, puis un
+    # événement par étape de chaque rapport jusqu'à job_finished. Last-Event-ID
+    # (ou ?last_event_id=) reprend après le dernier événement reçu.
+    job = PlagiatJob.query.get_or_404(job_id)
     try:
-        total_analyses = PlagiatAnalysis.query.count()
+        last_event_id = int(request.headers.get("Last-Event-ID") or request.args.get("last_event_id") or 0) or None
+    except ValueError:
+        last_event_id = None
 
-        analyses = PlagiatAnalysis.query.all()
-        if analyses:
-            originalite_moyenne = round(sum(a.originality_score or 0 for a in analyses) / len(analyses), 1)
-        else:
-            originalite_moyenne = 0
+    # Abonnement avant la lecture de l'état : aucun événement perdu entre les deux
+    subscription = broker.subscribe(job_id, last_event_id)
+    snapshot = job_status(job)
+    app = current_app._get_current_object()
 
-        high_risk = PlagiatAnalysis.query.filter(PlagiatAnalysis.risk_level == 'high').count()
-        medium_risk = PlagiatAnalysis.query.filter(PlagiatAnalysis.risk_level == 'medium').count()
-        low_risk = PlagiatAnalysis.query.filter(PlagiatAnalysis.risk_level.in_(['low', 'none'])).count()
+    def idle():
+        with app.app_context():
+            try:
+                current = db.session.get(PlagiatJob, job_id)
+                return job_status(current) if current else None
+            finally:
+                db.session.remove()
+
+    local = job.backend == "local"
+    # Pas de connexion à la base gardée pendant toute la durée du flux
+    db.session.remove()
+    return Response(
+        stream_events(
+            subscription, snapshot, idle,
+            heartbeat=Config.PLAGIAT_PROGRESS_HEARTBEAT_SECONDS if local else Config.PLAGIAT_PROGRESS_POLL_SECONDS
+        ),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
-        today = datetime.utcnow().date()
-        analyses_today = PlagiatAnalysis.query.filter(
-            db.func.date(PlagiatAnalysis.analyzed_at) == today
-        ).count()
+
+@plagiat_analysis_bp.route("/overview", methods=["GET"])
+def get_overview():
+    try:
+        totals = read_overview()
+        total_analyses = totals.count()
+        originalite_moyenne = round(totals.originality_avg(), 1)
+        high_risk = totals.count(risks=('high',))
+        medium_risk = totals.count(risks=('medium',))
+        low_risk = totals.count(risks=('low', 'none'))
+        analyses_today = totals.count(today=True)
 
         recent_analyses = []
-        for analysis in PlagiatAnalysis.query.order_by(PlagiatAnalysis.analyzed_at.desc()).limit(8).all():
-            rapport = Rapport.query.get(analysis.rapport_id)
-            student = User.query.get(rapport.auteur_id) if rapport else None
-
-            if rapport and student:
-                recent_analyses.append({
-                    'id': analysis.id,
-                    'rapport_id': rapport.id,
-                    'prenom': student.prenom if hasattr(student, 'prenom') else '',
-                    'name': student.name,
-                    'filename': rapport.filename,
-                    'similarity_score': analysis.similarity_score or 0,
-                    'originality_score': analysis.originality_score or 100,
-                    'risk': analysis.risk_level or 'none',
-                    'ai_score': analysis.ai_score or 0,
-                    'date': analysis.analyzed_at.strftime('%d/%m/%Y') if analysis.analyzed_at else '',
-                    'time': analysis.analyzed_at.strftime('%H:%M') if analysis.analyzed_at else '',
-                    'analyzed_at': analysis.analyzed_at.isoformat() if analysis.analyzed_at else None
-                })
+        recent = (
+            db.session.query(PlagiatAnalysis, Rapport, User)
+            .join(Rapport, Rapport.id == PlagiatAnalysis.rapport_id)
+            .join(User, User.id == Rapport.auteur_id)
+            .order_by(PlagiatAnalysis.analyzed_at.desc())
+            .limit(8)
+            .all()
+        )
+        for analysis, rapport, student in recent:
+            recent_analyses.append({
+                'id': analysis.id,
+                'rapport_id': rapport.id,
+                'prenom': student.prenom if hasattr(student, 'prenom') else '',
+                'name': student.name,
+                'filename': rapport.filename,
+                'similarity_score': analysis.similarity_score or 0,
+                'originality_score': analysis.originality_score or 100,
+                'risk': analysis.risk_level or 'none',
+                'ai_score': analysis.ai_score or 0,
+                'date': analysis.analyzed_at.strftime('%d/%m/%Y') if analysis.analyzed_at else '',
+                'time': analysis.analyzed_at.strftime('%H:%M') if analysis.analyzed_at else '',
+                'analyzed_at': analysis.analyzed_at.isoformat() if analysis.analyzed_at else None
+            })
 
         return jsonify({
             'stats': {
@@ -825,6 +926,112 @@ def get_overview():
         }), 500
 
 
+@plagiat_analysis_bp.route("/index/rebuild", methods=["POST"])
+def rebuild_corpus_index():
+    if detector is None:
+        return jsonify({"error": "Le détecteur de plagiat n'a pas été initialisé.", "status": "error"}), 500
+
+    try:
+        indexed = 0
+        for rapport in Rapport.query.all():
+            if index_rapport(rapport):
+                indexed += 1
+
+        return jsonify({
+            "indexed_rapports": indexed,
+            "corpus_index": detector.corpus_index.stats() if detector.corpus_index else None,
+            "status": "completed"
+        })
+    except Exception as e:
+        return jsonify({"error": str(e), "status": "error"}), 500
+
+
+@plagiat_analysis_bp.route("/warmup", methods=["POST"])
+def warmup_detector():
+    if detector is None:
+        return jsonify({"error": "Le détecteur de plagiat n'a pas été initialisé.", "status": "error"}), 500
+
+    return jsonify({"warmup": detector.warmup(), "status": "ready"})
+
+
+@plagiat_analysis_bp.cli.command("warmup")
+def warmup_command():
+    """Charge les modèles de détection avant la première analyse."""
+    if detector is None:
+        print("❌ Le détecteur de plagiat n'a pas été initialisé.")
+        return
+
+    result = detector.warmup()
+    for name, seconds in result["load_seconds"].items():
+        print(f"✅ {name} : {seconds}s")
+
+
+@plagiat_analysis_bp.cli.command("analyze-batch")
+@click.option("--workers", type=int, default=0, help="Processus d'analyse (0 = cœurs physiques).")
+@click.option("--pending", is_flag=True, help="Uniquement les rapports jamais analysés.")
+@click.option("--force", is_flag=True, help="Réanalyse aussi les rapports dont le fichier n'a pas changé.")
+def analyze_batch_command(workers, pending, force):
+    """Analyse les rapports en parallèle sur un pool de processus."""
+    if workers:
+        Config.PLAGIAT_PROCESS_WORKERS = workers
+
+    query = db.session.query(Rapport, User, PlagiatAnalysis) \
+        .join(User, User.id == Rapport.auteur_id) \
+        .outerjoin(PlagiatAnalysis, PlagiatAnalysis.rapport_id == Rapport.id)
+    if pending:
+        query = query.filter(PlagiatAnalysis.id.is_(None))
+    rows = query.order_by(Rapport.id).all()
+
+    payloads, skipped = [], 0
+    analyses = {rapport.id: analysis for rapport, _, analysis in rows}
+    for rapport, student, analysis in rows:
+        if not force and is_unchanged(analysis, file_fingerprint(rapport.storage_path)):
+            skipped += 1
+            continue
+        payloads.append((
+            rapport.id, rapport.storage_path, student.name, rapport.filename, known_chunk_hashes(analysis)
+        ))
+    print(f"🚀 {len(payloads)} rapports à analyser, {skipped} inchangés ignorés")
+
+    start = time.perf_counter()
+    done = 0
+    # Les résultats arrivent au fil de l'eau : écriture en base dans le parent
+    for rapport_id, result in analyze_rapports_parallel(payloads):
+        analysis = analyses.get(rapport_id)
+        if not analysis:
+            analysis = PlagiatAnalysis(rapport_id=rapport_id)
+            db.session.add(analysis)
+        persist_analysis(analysis, result)
+
+        done += 1
+        status = "❌" if result.get("error") else "✅"
+        print(f"{status} [{done}/{len(payloads)}] rapport {rapport_id} : {result.get('similarity', 0)}%")
+
+    print(f"⏱️ {done} rapports en {time.perf_counter() - start:.1f}s")
+
+
+@plagiat_analysis_bp.cli.command("reclaim")
+def reclaim_command():
+    """Remet en file les analyses interrompues dont le bail a expiré."""
+    reclaimed = reclaim_stale()
+    print(f"♻️ {reclaimed['analyses']} analyses rétablies, {reclaimed['items']} éléments de job repris")
+
+
+@plagiat_analysis_bp.cli.command("overview-check")
+@click.option("--rebuild", is_flag=True, help="Reconstruit la table depuis plagiat_analyses.")
+def overview_check_command(rebuild):
+    """Compare les statistiques de la vue d'ensemble à un recalcul complet."""
+    differences = check_overview_stats()
+    for diff in differences:
+        print(f"⚠️ {diff['scope']} {diff['status']}/{diff['risk_level']} : "
+              f"attendu {diff['expected']}, enregistré {diff['stored']}")
+    if not differences:
+        print("✅ Statistiques de la vue d'ensemble cohérentes")
+
+    if rebuild:
+        print(f"🔄 {rebuild_overview_stats()} lignes reconstruites")
+
+
 @plagiat_analysis_bp.route("/stats", methods=["GET"])
 def get_detector_stats():
     if detector:
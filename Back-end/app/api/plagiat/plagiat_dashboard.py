@@ -1,99 +1,200 @@
-from flask import Blueprint, jsonify
-from sqlalchemy.orm import joinedload
-from ...models import db, User, Rapport, PlagiatAnalysis, Student, PlagiatMatch
+import json
+from collections import defaultdict
+from datetime import datetime
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import aliased, joinedload
+from ...config import Config
+from ...models import db, User, Rapport, PlagiatAnalysis, Student, PlagiatMatch, Soutenance, Jury
+from .listing import ListingError, split_param, decode_cursor, encode_cursor, parse_limit
 
 plagiat_dashboard_bp = Blueprint("plagiat_dashboard", __name__, url_prefix="/api/plagiat")
 
-@plagiat_dashboard_bp.route("/dashboard", methods=["GET"])
-def dashboard_plagiat():
-    # Start from Rapport to get ALL reports, even those without analysis
-    results = (
-        db.session.query(
-            Rapport,
-            User,
-            Student,
-            PlagiatAnalysis
+# Tris disponibles : expression SQL sans NULL (clé de curseur) et conversion du curseur
+DASHBOARD_SORTS = {
+    "rapportId": (Rapport.id, int),
+    "similarity": (func.coalesce(PlagiatAnalysis.similarity_score, 0.0), float),
+    "analyzedAt": (func.coalesce(PlagiatAnalysis.analyzed_at, datetime(1970, 1, 1)), datetime.fromisoformat),
+    "studentName": (User.name, str),
+}
+
+
+class DashboardQuery:
+    # Filtres, tri et curseur de /dashboard, lus depuis la query string
+
+    def __init__(self, args):
+        self.sort = args.get("sort", "rapportId")
+        if self.sort not in DASHBOARD_SORTS:
+            raise ListingError(f"sort doit être parmi : {', '.join(DASHBOARD_SORTS)}")
+        self.descending = args.get("order", "asc").lower() == "desc"
+        self.risk = split_param(args.get("risk"))
+        self.status = split_param(args.get("status"))
+        self.filiere = split_param(args.get("filiere"))
+        self.niveau = split_param(args.get("niveau"))
+        self.search = (args.get("q") or "").strip()
+
+    def base(self):
+        sort_key = DASHBOARD_SORTS[self.sort][0]
+        query = (
+            db.session.query(
+                Rapport.id, Rapport.filename,
+                User.id, User.name, User.prenom,
+                Student.user_id, Student.cne, Student.filiere, Student.niveau,
+                PlagiatAnalysis.id, PlagiatAnalysis.similarity_score, PlagiatAnalysis.originality_score,
+                PlagiatAnalysis.risk_level, PlagiatAnalysis.total_matches, PlagiatAnalysis.sources_count,
+                PlagiatAnalysis.status, PlagiatAnalysis.analyzed_at,
+                sort_key.label("sort_key")
+            )
+            .join(User, User.id == Rapport.auteur_id)
+            .outerjoin(Student, Student.user_id == User.id)
+            .outerjoin(PlagiatAnalysis, PlagiatAnalysis.rapport_id == Rapport.id)
         )
-        .join(User, User.id == Rapport.auteur_id)
-        .outerjoin(Student, Student.user_id == User.id)
-        .outerjoin(PlagiatAnalysis, PlagiatAnalysis.rapport_id == Rapport.id)
+        if self.risk:
+            query = query.filter(func.coalesce(PlagiatAnalysis.risk_level, "none").in_(self.risk))
+        if self.status:
+            # Rapport sans analyse : "pending", comme dans la réponse
+            query = query.filter(func.coalesce(PlagiatAnalysis.status, "pending").in_(self.status))
+        if self.filiere:
+            query = query.filter(Student.filiere.in_(self.filiere))
+        if self.niveau:
+            query = query.filter(Student.niveau.in_(self.niveau))
+        if self.search:
+            pattern = f"%{self.search}%"
+            query = query.filter(or_(User.name.ilike(pattern), User.prenom.ilike(pattern),
+                                     Rapport.filename.ilike(pattern)))
+        return query
+
+    def page(self, after=None, limit=None):
+        sort_key, convert = DASHBOARD_SORTS[self.sort]
+        query = self.base()
+        if after:
+            value, last_id = decode_cursor(after, 2)
+            try:
+                value, last_id = convert(value), int(last_id)
+            except ValueError:
+                raise ListingError("Curseur invalide")
+            if self.descending:
+                query = query.filter(or_(sort_key < value, and_(sort_key == value, Rapport.id < last_id)))
+            else:
+                query = query.filter(or_(sort_key > value, and_(sort_key == value, Rapport.id > last_id)))
+
+        if self.descending:
+            query = query.order_by(sort_key.desc(), Rapport.id.desc())
+        else:
+            query = query.order_by(sort_key.asc(), Rapport.id.asc())
+
+        rows = query.limit(limit + 1).all() if limit else query.all()
+        next_cursor = None
+        if limit and len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            value = last.sort_key.isoformat() if isinstance(last.sort_key, datetime) else last.sort_key
+            next_cursor = encode_cursor(value, last[0])
+        return rows, next_cursor
+
+
+def jury_names_by_rapport(rapport_ids):
+    # Jurys de la première soutenance de chaque rapport, en une requête
+    if not rapport_ids:
+        return {}
+    teacher = aliased(User)
+    rows = (
+        db.session.query(Soutenance.rapport_id, Soutenance.id, teacher.name, Jury.role)
+        .outerjoin(Jury, Jury.soutenance_id == Soutenance.id)
+        .outerjoin(teacher, teacher.id == Jury.teacher_id)
+        .filter(Soutenance.rapport_id.in_(rapport_ids))
+        .order_by(Soutenance.id, Jury.id)
         .all()
     )
+    first_soutenance, names = {}, defaultdict(list)
+    for rapport_id, soutenance_id, teacher_name, role in rows:
+        first_soutenance.setdefault(rapport_id, soutenance_id)
+        if first_soutenance[rapport_id] == soutenance_id and teacher_name is not None:
+            names[rapport_id].append(f"{teacher_name} ({role})")
+    return names
+
 
+def serialize_rows(rows):
+    juries = jury_names_by_rapport([row[0] for row in rows])
     data = []
-    
+    for (rapport_id, filename, user_id, user_name, user_prenom, student_id, cne, filiere, niveau,
+         analysis_id, similarity, originality, risk, total_matches, sources_count, status, analyzed_at,
+         _) in rows:
+        has_student = student_id is not None
+        data.append({
+            "id": analysis_id,  # Can be None for reports without analysis
+            "rapportId": rapport_id,  # Always present
+            "studentId": user_id,
+            "studentName": user_name,
+            "studentPrenom": user_prenom,
+            "studentMatricule": cne if has_student else "N/A",
+            "specialty": filiere if has_student else "--",
+            "level": niveau if has_student else "--",
+            "rapportName": filename,
+            "similarityScore": int(similarity or 0) if analysis_id else 0,
+            "originalityScore": int(originality or 100) if analysis_id else 100,
+            "riskLevel": risk if analysis_id else "none",
+            "totalMatches": total_matches if analysis_id else 0,
+            "sourcesCount": sources_count if analysis_id else 0,
+            "status": status if analysis_id else "pending",
+            "analyzedAt": analyzed_at.isoformat() if analyzed_at else None,
+            "juryAssigned": juries.get(rapport_id, [])  # List of strings
+        })
+    return data
+
+
+def _stream(dashboard_query, ndjson):
+    # Lecture par pages de PLAGIAT_LIST_MAX_LIMIT lignes : mémoire bornée,
+    # premiers octets envoyés avant la fin de la lecture
+    batch = Config.PLAGIAT_LIST_MAX_LIMIT
+
+    def generate():
+        cursor, first = None, True
+        if not ndjson:
+            yield "["
+        while True:
+            rows, cursor = dashboard_query.page(after=cursor, limit=batch)
+            items = serialize_rows(rows)
+            if ndjson:
+                yield "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in items)
+            elif items:
+                # Un morceau par page : le tableau JSON de la page, sans ses crochets
+                yield ("" if first else ",") + json.dumps(items, ensure_ascii=False)[1:-1]
+                first = False
+            if cursor is None:
+                break
+        if not ndjson:
+            yield "]"
+
+    mimetype = "application/x-ndjson" if ndjson else "application/json"
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
+
+@plagiat_dashboard_bp.route("/dashboard", methods=["GET"])
+def dashboard_plagiat():
+    # Sans pagination : tableau complet (format historique), envoyé par morceaux.
+    # ?limit=&after= : une page avec next_cursor. ?format=ndjson : une ligne par rapport.
+    # Filtres : risk, status, filiere, niveau, q ; tri : sort=rapportId|similarity|analyzedAt|studentName, order=asc|desc
     try:
-        for rapport, user, student_info, analysis in results:
-
-            user_prenom = user.prenom if user else "N/A"
-            user_name = user.name if user else "Inconnu"
-
-            student_matricule = getattr(student_info, 'cne', 'N/A')
-            student_specialty = getattr(student_info, 'filiere', '--')
-            student_level = getattr(student_info, 'niveau', '--')
-
-            # Default values if no analysis exists
-            analysis_id = None
-            similarity_score = 0
-            originality_score = 100
-            risk_level = "none"
-            total_matches = 0
-            sources_count = 0
-            status = "pending"
-            analyzed_at = None
-            
-            # If analysis exists, use its values
-            if analysis:
-                analysis_id = analysis.id
-                similarity_score = analysis.similarity_score or 0
-                originality_score = analysis.originality_score or 100
-                risk_level = analysis.risk_level
-                total_matches = analysis.total_matches
-                sources_count = analysis.sources_count
-                status = analysis.status
-                analyzed_at = analysis.analyzed_at
-
-            # Fetch Jury via Rapport -> Soutenance -> Juries
-            jury_names = []
-            if rapport and rapport.soutenance:
-                 # Check if soutenance is a list (backref behavior) or single object
-                 soutenance_obj = rapport.soutenance[0] if isinstance(rapport.soutenance, list) and rapport.soutenance else rapport.soutenance
-                 
-                 # If it's a list but empty, soutenance_obj will be [] (falsey) if we didn't check, 
-                 # but the list check handles it. 
-                 # If it's not a list, it's the object itself.
-                 # Wait, if it IS a list, we need the first item.
-                 if isinstance(rapport.soutenance, list):
-                     soutenance_obj = rapport.soutenance[0] if rapport.soutenance else None
-                 else:
-                     soutenance_obj = rapport.soutenance
-
-                 if soutenance_obj and hasattr(soutenance_obj, 'juries'):
-                     for j in soutenance_obj.juries:
-                         if j.teacher:
-                             jury_names.append(f"{j.teacher.name} ({j.role})")
-            
-            data.append({
-                "id": analysis_id,  # Can be None for reports without analysis
-                "rapportId": rapport.id,  # Always present
-                "studentId": user.id if user else None,
-                "studentName": user_name,
-                "studentPrenom": user_prenom,
-                "studentMatricule": student_matricule,
-                "specialty": student_specialty,
-                "level": student_level,
-                "rapportName": rapport.filename if rapport else "Non lié",
-                "similarityScore": int(similarity_score),
-                "originalityScore": int(originality_score),
-                "riskLevel": risk_level,
-                "totalMatches": total_matches,
-                "sourcesCount": sources_count,
-                "status": status,
-                "analyzedAt": analyzed_at.isoformat() if analyzed_at else None,
-                "juryAssigned": jury_names # List of strings
-            })
+        dashboard_query = DashboardQuery(request.args)
 
-        return jsonify(data)
+        if request.args.get("format") == "ndjson":
+            return _stream(dashboard_query, ndjson=True)
+        if "limit" not in request.args and "after" not in request.args:
+            return _stream(dashboard_query, ndjson=False)
+
+        rows, next_cursor = dashboard_query.page(
+            after=request.args.get("after"), limit=parse_limit(request.args.get("limit"))
+        )
+        items = serialize_rows(rows)
+        return jsonify({
+            "items": items,
+            "count": len(items),
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None
+        })
+    except ListingError as e:
+        return jsonify({"message": str(e)}), 400
     except Exception as e:
         print(f"Error in dashboard_plagiat: {e}")
         return jsonify({"message": "Server error fetching plagiarism data"}), 500
@@ -157,6 +258,7 @@ def get_analysis_details(analysis_id):
             "warnings": getattr(analysis, 'warnings', None),
             "recommendations": getattr(analysis, 'recommendations', None),
             "aiScore": analysis.ai_score,
+            "aiSections": json.loads(analysis.ai_sections) if analysis.ai_sections else [],
             "totalMatches": analysis.total_matches,
             "sourcesCount": analysis.sources_count,
             "chunksAnalyzed": analysis.chunks_analyzed,
@@ -1,7 +1,6 @@
 from flask import Blueprint, jsonify
-from sqlalchemy import func
-from datetime import date
 from ...models import db, User, Rapport, PlagiatAnalysis
+from .overview_stats import read_overview
 
 plagiat_overview_bp = Blueprint(
     "plagiat_overview",
@@ -21,27 +20,15 @@ def risk_fr(risk):
 
 @plagiat_overview_bp.route("/overview", methods=["GET"])
 def plagiat_overview():
-    base_completed_query = PlagiatAnalysis.query.filter(PlagiatAnalysis.status == "completed")
+    # Compteurs lus dans plagiat_overview_stats, tenue à jour à chaque analyse
+    totals = read_overview()
 
-    total_analyses = base_completed_query.count()
-    
-    # Count total reports
-    total_rapports = Rapport.query.count()
+    total_analyses = totals.count(status="completed")
+    total_rapports = totals.total_rapports
     rapports_non_analyses = total_rapports - total_analyses
-
-    avg_originality = db.session.query(
-        func.avg(PlagiatAnalysis.originality_score)
-    ).filter(
-        PlagiatAnalysis.status == "completed"
-    ).scalar() or 0
-
-    risks_detected = base_completed_query.filter(
-        PlagiatAnalysis.risk_level.in_(["medium", "high"])
-    ).count()
-
-    today_analyses = base_completed_query.filter(
-        func.date(PlagiatAnalysis.analyzed_at) == date.today()
-    ).count()
+    avg_originality = totals.originality_avg(status="completed")
+    risks_detected = totals.count(status="completed", risks=("medium", "high"))
+    today_analyses = totals.count(status="completed", today=True)
 
     recent = (
         db.session.query(
@@ -0,0 +1,164 @@
+"""
+Pool de processus pour l'analyse des rapports sur tous les cœurs.
+
+Chaque processus charge les modèles une seule fois (initialiseur) et limite
+torch à `threads_per_worker` threads, pour que workers x threads ne dépasse
+pas le nombre de cœurs physiques. Les processus ne touchent pas à la base :
+ils renvoient le résultat au parent, qui enregistre les correspondances.
+"""
+import os
+import queue
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed, wait
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from ...config import Config
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+# Relais des événements d'avancement des processus fils vers le parent
+_manager = None
+
+
+def physical_cores() -> int:
+    try:
+        import psutil
+
+        return psutil.cpu_count(logical=False) or os.cpu_count() or 1
+    except ImportError:
+        return os.cpu_count() or 1
+
+
+def pool_size() -> int:
+    return Config.PLAGIAT_PROCESS_WORKERS or physical_cores()
+
+
+def threads_per_worker(workers: int) -> int:
+    return Config.PLAGIAT_TORCH_THREADS or max(1, physical_cores() // workers)
+
+
+def _init_worker(torch_threads: int) -> None:
+    # Avant tout import de torch / numpy dans le processus fils
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(torch_threads)
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+    Config.PLAGIAT_TORCH_THREADS = torch_threads
+    # Les processus du pool occupent déjà tous les cœurs : pages lues en série
+    Config.PLAGIAT_PDF_WORKERS = 1
+
+    from .plagiat_analysis import detector
+
+    if detector is not None:
+        detector.warmup()
+
+
+def _analyze(rapport_id: int, storage_path: str, student_name: str, filename: str,
+             known_chunk_hashes: List[str] = None, events=None, cancel=None) -> Dict:
+    from .plagiat_analysis import compute_rapport_result
+    from .jobs import JobCancelled
+
+    def relay(event, **data):
+        events.put((event, data))
+        # Job annulé côté parent : arrêt à l'étape suivante
+        if cancel is not None and cancel.is_set():
+            raise JobCancelled()
+
+    progress = relay if events is not None else None
+    return asyncio.run(compute_rapport_result(
+        rapport_id, storage_path, student_name, filename,
+        known_chunk_hashes=known_chunk_hashes, progress=progress
+    ))
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = pool_size()
+            threads = threads_per_worker(workers)
+            # spawn : pas de fork d'un parent qui a déjà des threads et torch
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(threads,)
+            )
+            print(f"⚙️ Pool d'analyse : {workers} processus x {threads} threads torch")
+        return _pool
+
+
+def submit_rapport(rapport_id: int, storage_path: str, student_name: str, filename: str,
+                   known_chunk_hashes: List[str] = None, events=None, cancel=None) -> Future:
+    return get_pool().submit(
+        _analyze, rapport_id, storage_path, student_name, filename, known_chunk_hashes, events, cancel
+    )
+
+
+def _channel():
+    # File des événements (fils -> parent) et drapeau d'annulation (parent -> fils)
+    global _manager
+    with _pool_lock:
+        if _manager is None:
+            _manager = multiprocessing.get_context("spawn").Manager()
+        return _manager.Queue(), _manager.Event()
+
+
+def run_in_pool(payload: Tuple, progress: Optional[Callable] = None) -> Dict:
+    # Analyse d'un rapport dans le pool ; les événements du processus fils
+    # sont republiés ici, au fil de l'eau
+    if progress is None:
+        return submit_rapport(*payload).result()
+
+    from .jobs import JobCancelled
+
+    events, cancel = _channel()
+    future = submit_rapport(*payload, events=events, cancel=cancel)
+    try:
+        while True:
+            try:
+                event, data = events.get(timeout=0.2)
+            except queue.Empty:
+                if future.done():
+                    break
+                continue
+            progress(event, **data)
+        # Derniers événements arrivés avant la fin du calcul
+        while True:
+            try:
+                event, data = events.get_nowait()
+            except queue.Empty:
+                break
+            progress(event, **data)
+    except JobCancelled:
+        # Le processus fils s'arrête à sa prochaine étape : il reste occupé
+        # jusque-là, le résultat est ignoré
+        cancel.set()
+        wait([future])
+        raise
+    return future.result()
+
+
+def analyze_rapports_parallel(payloads: List[Tuple]) -> Iterator[Tuple[int, Dict]]:
+    # Les résultats remontent au fil de l'eau, dans l'ordre de fin d'analyse
+    futures = {submit_rapport(*payload): payload[0] for payload in payloads}
+    for future in as_completed(futures):
+        rapport_id = futures[future]
+        try:
+            yield rapport_id, future.result()
+        except Exception as e:
+            yield rapport_id, {"similarity": 0, "originality": 100, "risk": "none", "sources": [],
+                               "ai_score": 0, "error": str(e), "chunks_analyzed": 0,
+                               "chunks_with_matches": 0}
+
+
+def shutdown_pool() -> None:
+    global _pool, _manager
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+        if _manager is not None:
+            _manager.shutdown()
+            _manager = None
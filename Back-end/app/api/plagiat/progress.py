@@ -0,0 +1,174 @@
+"""
+Événements d'avancement des jobs d'analyse, diffusés en mémoire.
+
+Les workers de la file locale publient au fil de l'analyse (rapport
+commencé, texte extrait, chunk recherché, embeddings calculés,
+correspondances enregistrées, rapport terminé, job terminé) ;
+/jobs/<id>/events les relaie en Server-Sent Events sans interroger la base.
+
+Chaque job garde ses derniers événements (PLAGIAT_PROGRESS_BUFFER) : un
+client qui se reconnecte avec Last-Event-ID reçoit ce qu'il a manqué. Les
+tampons des jobs terminés sont oubliés après PLAGIAT_PROGRESS_RETENTION_SECONDS.
+
+La diffusion est limitée au processus : pour un job exécuté ailleurs (Celery,
+autre processus web), le flux se rabat sur l'état du job relu en base
+pendant les silences.
+"""
+import json
+import time
+import queue
+import threading
+from collections import deque
+from typing import Callable, Dict, Iterator, List, Optional
+
+from ...config import Config
+
+FINAL_STATUSES = ("completed", "cancelled")
+
+
+class Subscription:
+
+    def __init__(self, broker: "ProgressBroker", job_id: int, maxsize: int):
+        self.broker = broker
+        self.job_id = job_id
+        self.queue: "queue.Queue[Dict]" = queue.Queue(maxsize=maxsize)
+        # Client trop lent : des événements ont été perdus, il doit relire l'état
+        self.lagged = False
+
+    def push(self, event: Dict) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.lagged = True
+
+    def get(self, timeout: float) -> Optional[Dict]:
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self) -> None:
+        self.broker.unsubscribe(self)
+
+
+class ProgressBroker:
+
+    def __init__(self, buffer_size: int = 500, retention: float = 600):
+        self.buffer_size = buffer_size
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._buffers: Dict[int, deque] = {}
+        self._next_id: Dict[int, int] = {}
+        self._finished_at: Dict[int, float] = {}
+        self._subscribers: Dict[int, List[Subscription]] = {}
+
+    def publish(self, job_id: int, event: str, **data) -> Dict:
+        with self._lock:
+            self._expire()
+            event_id = self._next_id.get(job_id, 0) + 1
+            self._next_id[job_id] = event_id
+            item = {"id": event_id, "event": event, "at": round(time.time(), 3), "job_id": job_id, **data}
+            self._buffers.setdefault(job_id, deque(maxlen=self.buffer_size)).append(item)
+            if event == "job_finished":
+                self._finished_at[job_id] = time.time()
+            subscribers = list(self._subscribers.get(job_id, ()))
+        for subscription in subscribers:
+            subscription.push(item)
+        return item
+
+    def subscribe(self, job_id: int, last_event_id: Optional[int] = None, maxsize: int = 1000) -> Subscription:
+        # Abonnement et rattrapage sous le même verrou : aucun événement perdu
+        # ni reçu deux fois entre les deux
+        subscription = Subscription(self, job_id, maxsize)
+        with self._lock:
+            for item in self._buffers.get(job_id, ()):
+                if last_event_id is None or item["id"] > last_event_id:
+                    subscription.push(item)
+            self._subscribers.setdefault(job_id, []).append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.job_id, [])
+            if subscription in subscribers:
+                subscribers.remove(subscription)
+            if not subscribers:
+                self._subscribers.pop(subscription.job_id, None)
+
+    def _expire(self) -> None:
+        limit = time.time() - self.retention
+        for job_id in [j for j, at in self._finished_at.items() if at < limit]:
+            if job_id in self._subscribers:
+                continue
+            self._buffers.pop(job_id, None)
+            self._next_id.pop(job_id, None)
+            self._finished_at.pop(job_id, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "jobs": len(self._buffers),
+                "subscribers": sum(len(s) for s in self._subscribers.values()),
+            }
+
+
+broker = ProgressBroker(
+    buffer_size=Config.PLAGIAT_PROGRESS_BUFFER,
+    retention=Config.PLAGIAT_PROGRESS_RETENTION_SECONDS
+)
+
+
+def job_reporter(job_id: int, **context) -> Callable:
+    # progress(event, **data) pour compute_rapport_result et run_rapport_analysis
+    def progress(event: str, **data) -> None:
+        broker.publish(job_id, event, **context, **data)
+
+    return progress
+
+
+def format_sse(item: Dict) -> str:
+    return f"id: {item['id']}\nevent: {item['event']}\ndata: {json.dumps(item, default=str)}\n\n"
+
+
+def stream_events(subscription: Subscription, snapshot: Optional[Dict] = None,
+                  idle: Optional[Callable[[], Optional[Dict]]] = None,
+                  heartbeat: float = 15) -> Iterator[str]:
+    # snapshot : état du job lu juste après l'abonnement. Le flux s'arrête au
+    # premier job_finished. Pendant les silences, idle() relit l'état : il
+    # est envoyé s'il a changé (jobs Celery, job lancé par un autre processus
+    # web), sinon un commentaire garde la connexion ouverte
+    def status(state: Dict) -> str:
+        return f"event: status\ndata: {json.dumps(state, default=str)}\n\n"
+
+    try:
+        yield "retry: 3000\n\n"
+        if snapshot is not None:
+            yield status(snapshot)
+            if snapshot.get("status") in FINAL_STATUSES:
+                # Job déjà terminé : seulement les événements encore en mémoire
+                while True:
+                    item = subscription.get(timeout=0)
+                    if item is None:
+                        return
+                    yield format_sse(item)
+        while True:
+            item = subscription.get(timeout=heartbeat)
+            if subscription.lagged:
+                # Le client relit /jobs/<id> puis se reconnecte
+                yield 'event: lagged\ndata: {"resync": true}\n\n'
+                return
+            if item is not None:
+                yield format_sse(item)
+                if item["event"] == "job_finished":
+                    return
+                continue
+            state = idle() if idle else None
+            if state is None or state == snapshot:
+                yield ": keep-alive\n\n"
+                continue
+            snapshot = state
+            yield status(state)
+            if state.get("status") in FINAL_STATUSES:
+                return
+    finally:
+        subscription.close()
@@ -0,0 +1,343 @@
+"""
+Fournisseurs de sources externes pour la détection de plagiat.
+
+Chaque fournisseur expose une méthode asynchrone `search(query)` qui renvoie
+une liste de candidats {title, url, text, source}. Les fournisseurs actifs
+sont déclarés dans Config.PLAGIAT_SOURCE_PROVIDERS et interrogés en parallèle,
+chacun avec son propre délai maximal (par requête HTTP pour les API
+distantes, voir SourceProvider.per_request_timeout et
+PlagiarismDetector.fetch_web_candidates).
+
+Fournisseurs intégrés :
+- semantic_scholar / crossref : API distantes, via le SourceClient partagé ;
+- local_corpus : dump local de résumés (JSONL ou Parquet), indexé par un
+  index inversé et des embeddings, pour des vérifications massives hors ligne.
+"""
+import os
+import re
+import abc
+import json
+import math
+import asyncio
+import hashlib
+import threading
+from concurrent.futures import Future
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from ...config import Config
+
+TOKEN_PATTERN = re.compile(r"\w{3,}", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall((text or "").lower())
+
+
+class SourceProvider(abc.ABC):
+    name = "base"
+    # True : `timeout` borne chaque requête HTTP (dans le SourceClient), sans
+    # compter l'attente du débit de l'hôte ; False : il borne tout l'appel
+    per_request_timeout = False
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.timeout = timeout
+
+    async def prepare(self) -> None:
+        # Chargement préalable, attendu avant la recherche et hors de son délai
+        pass
+
+    @abc.abstractmethod
+    async def search(self, query: str) -> List[Dict]:
+        ...
+
+    def get_stats(self) -> Dict:
+        return {}
+
+
+class SemanticScholarProvider(SourceProvider):
+    name = "semantic_scholar"
+    per_request_timeout = True
+
+    def __init__(self, client, url: str = None, limit: int = 5, timeout: Optional[float] = None):
+        super().__init__(timeout)
+        self.client = client
+        self.url = url or Config.PLAGIAT_SEMANTIC_SCHOLAR_URL
+        self.limit = limit
+
+    async def search(self, query: str) -> List[Dict]:
+        params = {
+            "query": query[:200],
+            "limit": self.limit,
+            "fields": "title,abstract,url"
+        }
+
+        data = await self.client.get_json(self.url, params, timeout=self.timeout)
+        if not data:
+            return []
+
+        candidates = []
+        for paper in data.get("data", []):
+            abstract = paper.get("abstract")
+            if not abstract:
+                continue
+
+            candidates.append({
+                "title": paper.get("title"),
+                "url": paper.get("url"),
+                "text": abstract,
+                "source": "Semantic Scholar"
+            })
+
+        return candidates
+
+
+class CrossRefProvider(SourceProvider):
+    name = "crossref"
+    per_request_timeout = True
+
+    def __init__(self, client, url: str = None, rows: int = 5, timeout: Optional[float] = None):
+        super().__init__(timeout)
+        self.client = client
+        self.url = url or Config.PLAGIAT_CROSSREF_URL
+        self.rows = rows
+
+    async def search(self, query: str) -> List[Dict]:
+        params = {"query": query[:200], "rows": self.rows}
+
+        data = await self.client.get_json(self.url, params, timeout=self.timeout)
+        if not data:
+            return []
+
+        candidates = []
+        for item in data.get("message", {}).get("items", []):
+            title = " ".join(item.get("title", []))
+            candidates.append({
+                "title": title,
+                "url": item.get("URL"),
+                "text": title,
+                "source": "CrossRef"
+            })
+
+        return candidates
+
+
+class LocalCorpusProvider(SourceProvider):
+    """
+    Recherche dans un dump local de résumés (une entrée par ligne JSONL, ou
+    un fichier Parquet) avec les champs title, abstract (ou text) et url.
+
+    L'index inversé (BM25) est construit en mémoire au premier appel ; les
+    embeddings du corpus sont calculés une seule fois puis conservés dans
+    PLAGIAT_CACHE_DIR, indexés par le chemin et la date de modification du dump.
+    Le chargement (prepare) est fait une seule fois, dans un thread à part,
+    et attendu par toutes les recherches : seule la requête est soumise au
+    délai du fournisseur.
+    """
+    name = "local_corpus"
+
+    def __init__(
+            self,
+            path: str,
+            encoder: Optional[Callable[[List[str]], np.ndarray]] = None,
+            top_k: int = 5,
+            lexical_candidates: int = 50,
+            timeout: Optional[float] = None
+    ):
+        super().__init__(timeout)
+        self.path = path
+        self.encoder = encoder
+        self.top_k = top_k
+        self.lexical_candidates = lexical_candidates
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._loading: Optional[Future] = None
+        self._loading_lock = threading.Lock()  # distinct de _lock, tenu pendant load()
+        self.documents: List[Dict] = []
+        self.postings: Dict[str, List[tuple]] = {}
+        self.doc_lengths = np.zeros(0, dtype=np.float32)
+        self.idf: Dict[str, float] = {}
+        self.embeddings: Optional[np.ndarray] = None
+        self.searches = 0
+
+    def _read_records(self):
+        if self.path.endswith(".parquet"):
+            import pandas as pd
+
+            for record in pd.read_parquet(self.path).to_dict("records"):
+                yield record
+            return
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+    def load(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+
+            postings = defaultdict(list)
+            lengths = []
+            for record in self._read_records():
+                text = record.get("abstract") or record.get("text")
+                if not text:
+                    continue
+
+                doc_id = len(self.documents)
+                self.documents.append({
+                    "title": record.get("title"),
+                    "url": record.get("url") or f"local://{doc_id}",
+                    "text": text
+                })
+
+                tokens = tokenize(f"{record.get('title') or ''} {text}")
+                lengths.append(len(tokens))
+                for term, tf in Counter(tokens).items():
+                    postings[term].append((doc_id, tf))
+
+            n_docs = len(self.documents)
+            self.postings = dict(postings)
+            self.doc_lengths = np.asarray(lengths, dtype=np.float32)
+            self.idf = {
+                term: math.log(1 + (n_docs - len(p) + 0.5) / (len(p) + 0.5))
+                for term, p in self.postings.items()
+            }
+            self.embeddings = self._load_embeddings()
+            self._loaded = True
+            print(f"📚 Corpus local chargé : {n_docs} résumés ({self.path})")
+
+    def _start_loading(self) -> Future:
+        # Future partagé entre les boucles d'événements (une par analyse) ;
+        # déjà "en cours" : l'annulation d'une recherche ne l'annule pas
+        with self._loading_lock:
+            if self._loading is None:
+                future = self._loading = Future()
+                future.set_running_or_notify_cancel()
+
+                def run():
+                    try:
+                        self.load()
+                        future.set_result(None)
+                    except Exception as e:
+                        with self._loading_lock:
+                            self._loading = None  # nouvel essai à la prochaine recherche
+                        future.set_exception(e)
+
+                threading.Thread(target=run, name="plagiat-local-corpus", daemon=True).start()
+            return self._loading
+
+    async def prepare(self) -> None:
+        if not self._loaded:
+            await asyncio.wrap_future(self._start_loading())
+
+    def _load_embeddings(self) -> Optional[np.ndarray]:
+        if self.encoder is None or not self.documents:
+            return None
+
+        stamp = f"{os.path.abspath(self.path)}:{os.path.getmtime(self.path)}"
+        key = hashlib.sha1(stamp.encode("utf-8")).hexdigest()[:16]
+        cache_path = os.path.join(Config.PLAGIAT_CACHE_DIR, f"local_corpus_{key}.npy")
+
+        if os.path.exists(cache_path):
+            embeddings = np.load(cache_path)
+            if len(embeddings) == len(self.documents):
+                return embeddings
+
+        try:
+            embeddings = np.asarray(
+                self.encoder([doc["text"] for doc in self.documents]), dtype=np.float16
+            )
+        except Exception as e:
+            print(f"⚠️ Embeddings du corpus local indisponibles : {e}")
+            return None
+
+        os.makedirs(Config.PLAGIAT_CACHE_DIR, exist_ok=True)
+        np.save(cache_path, embeddings)
+        return embeddings
+
+    def _bm25(self, query_tokens: List[str], k1: float = 1.2, b: float = 0.75) -> Dict[int, float]:
+        avg_length = float(self.doc_lengths.mean()) if len(self.doc_lengths) else 1.0
+        scores = defaultdict(float)
+        for term in set(query_tokens):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, tf in self.postings[term]:
+                norm = k1 * (1 - b + b * self.doc_lengths[doc_id] / avg_length)
+                scores[doc_id] += idf * tf * (k1 + 1) / (tf + norm)
+        return scores
+
+    def search_sync(self, query: str) -> List[Dict]:
+        self.load()
+        self.searches += 1
+        if not self.documents:
+            return []
+
+        lexical = self._bm25(tokenize(query))
+        candidates = sorted(lexical, key=lexical.get, reverse=True)[:self.lexical_candidates]
+
+        if self.embeddings is not None:
+            try:
+                query_vector = np.asarray(self.encoder([query])[0], dtype=np.float32)
+                dense = self.embeddings.astype(np.float32) @ query_vector
+                nearest = np.argpartition(-dense, min(self.top_k, len(dense) - 1))[:self.top_k]
+                # Union du rappel lexical et sémantique, classée par cosinus
+                candidates = sorted(
+                    set(candidates) | set(int(i) for i in nearest),
+                    key=lambda i: dense[i],
+                    reverse=True
+                )
+            except Exception as e:
+                print(f"⚠️ Recherche dense indisponible sur le corpus local : {e}")
+
+        return [
+            dict(self.documents[doc_id], source="Corpus local")
+            for doc_id in candidates[:self.top_k]
+        ]
+
+    async def search(self, query: str) -> List[Dict]:
+        return await asyncio.get_running_loop().run_in_executor(None, self.search_sync, query)
+
+    def get_stats(self) -> Dict:
+        return {
+            "path": self.path,
+            "loaded": self._loaded,
+            "documents": len(self.documents),
+            "embeddings": self.embeddings is not None,
+            "searches": self.searches
+        }
+
+
+PROVIDERS = {
+    SemanticScholarProvider.name: SemanticScholarProvider,
+    CrossRefProvider.name: CrossRefProvider,
+    LocalCorpusProvider.name: LocalCorpusProvider,
+}
+
+
+def build_providers(client, encoder=None, names: List[str] = None) -> List[SourceProvider]:
+    names = names if names is not None else Config.PLAGIAT_SOURCE_PROVIDERS
+    timeouts = Config.PLAGIAT_SOURCE_PROVIDER_TIMEOUTS
+
+    providers = []
+    for name in names:
+        timeout = timeouts.get(name, Config.PLAGIAT_SOURCE_TIMEOUT)
+        if name == LocalCorpusProvider.name:
+            path = Config.PLAGIAT_LOCAL_CORPUS_PATH
+            if not path or not os.path.exists(path):
+                print(f"⚠️ Corpus local introuvable ({path}) : fournisseur ignoré")
+                continue
+            providers.append(LocalCorpusProvider(path, encoder=encoder, timeout=timeout))
+        elif name in PROVIDERS:
+            providers.append(PROVIDERS[name](client, timeout=timeout))
+        else:
+            print(f"⚠️ Fournisseur de sources inconnu : {name}")
+
+    return providers
@@ -0,0 +1,197 @@
+"""
+Embeddings des chunks conservés par rapport, pour /similar/<rapport_id>.
+
+Chaque rapport indexé garde sa matrice d'embeddings (un vecteur MiniLM
+normalisé par chunk) en float16 dans un fichier SQLite, plus quelques
+vecteurs de sections : moyennes de chunks consécutifs (chapitres,
+approximativement), renormalisées.
+
+Une recherche ne ré-encode rien :
+1. présélection : les sections du rapport contre les sections de tous les
+   rapports, un seul produit matriciel sur une matrice gardée en mémoire
+   (float32, rechargée quand un autre processus a écrit dans le fichier) ;
+2. comparaison exacte chunk à chunk avec les rapports présélectionnés :
+   part des chunks quasi identiques, similarité moyenne et meilleures paires
+   comme preuves.
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+class ReportVectorStore:
+
+    def __init__(self, path: str, sections: int = 8):
+        self.sections = sections
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS reports ("
+            " rapport_id INTEGER PRIMARY KEY,"
+            " dim INTEGER NOT NULL,"
+            " chunks INTEGER NOT NULL,"
+            " pages TEXT,"
+            " sections BLOB NOT NULL,"
+            " vectors BLOB NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+        # Matrice des sections en mémoire : lignes groupées par rapport
+        self._loaded_version = None
+        self._sketch = np.zeros((0, 0), dtype=np.float32)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._starts = np.zeros(0, dtype=np.int64)
+
+    # ------------------------------------------------------------------
+    # Écriture
+    # ------------------------------------------------------------------
+    def section_vectors(self, vectors: np.ndarray) -> np.ndarray:
+        groups = np.array_split(np.arange(len(vectors)), min(self.sections, len(vectors)))
+        sections = np.stack([vectors[group].mean(axis=0) for group in groups])
+        norms = np.linalg.norm(sections, axis=1, keepdims=True)
+        return sections / np.where(norms > 0, norms, 1.0)
+
+    def put(self, rapport_id: int, embeddings: np.ndarray, pages: Optional[List] = None) -> None:
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim != 2 or not len(vectors):
+            self.remove(rapport_id)
+            return
+
+        sections = self.section_vectors(vectors)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO reports"
+                " (rapport_id, dim, chunks, pages, sections, vectors, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (rapport_id, vectors.shape[1], len(vectors),
+                 json.dumps(pages) if pages is not None else None,
+                 sections.astype(np.float16).tobytes(), vectors.astype(np.float16).tobytes(),
+                 time.time())
+            )
+            self._conn.commit()
+            self._loaded_version = None
+
+    def remove(self, rapport_id: int) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM reports WHERE rapport_id = ?", (rapport_id,))
+            self._conn.commit()
+            self._loaded_version = None
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+    def _refresh(self) -> None:
+        # data_version change quand une autre connexion (worker, autre
+        # processus) a validé une écriture ; nos propres écritures remettent
+        # _loaded_version à None
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._loaded_version:
+            return
+
+        ids, starts, blocks, row = [], [], [], 0
+        dim = None
+        for rapport_id, row_dim, blob in self._conn.execute(
+                "SELECT rapport_id, dim, sections FROM reports ORDER BY rapport_id"):
+            if dim is None:
+                dim = row_dim
+            if row_dim != dim:
+                continue  # autre modèle : rapport à réindexer
+            block = np.frombuffer(blob, dtype=np.float16).reshape(-1, dim)
+            ids.append(rapport_id)
+            starts.append(row)
+            blocks.append(block)
+            row += len(block)
+
+        self._sketch = np.concatenate(blocks).astype(np.float32) if blocks else np.zeros((0, 0), dtype=np.float32)
+        self._ids = np.array(ids, dtype=np.int64)
+        self._starts = np.array(starts, dtype=np.int64)
+        self._loaded_version = version
+
+    def _load(self, rapport_ids: Iterable[int]) -> Dict[int, Dict]:
+        ids = list(rapport_ids)
+        found = {}
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            for rapport_id, dim, pages, blob in self._conn.execute(
+                    "SELECT rapport_id, dim, pages, vectors FROM reports "
+                    f"WHERE rapport_id IN ({','.join('?' * len(batch))})", batch):
+                found[rapport_id] = {
+                    "vectors": np.frombuffer(blob, dtype=np.float16).reshape(-1, dim).astype(np.float32),
+                    "pages": json.loads(pages) if pages else None,
+                }
+        return found
+
+    def similar(self, rapport_id: int, candidate_ids: Optional[Iterable[int]] = None,
+                top_k: int = 10, shortlist: int = 100, threshold: float = 0.9,
+                evidence: int = 3) -> Optional[List[Dict]]:
+        # None : rapport absent du magasin (pas encore analysé ni indexé)
+        with self._lock:
+            query = self._load([rapport_id]).get(rapport_id)
+            if query is None:
+                return None
+            self._refresh()
+            sketch, ids, starts = self._sketch, self._ids, self._starts
+
+            if not len(ids) or sketch.shape[1] != query["vectors"].shape[1]:
+                return []
+
+            # 1. Présélection : meilleure paire de sections par rapport
+            row_scores = (sketch @ self.section_vectors(query["vectors"]).T).max(axis=1)
+            report_scores = np.maximum.reduceat(row_scores, starts)
+            allowed = ids != rapport_id
+            if candidate_ids is not None:
+                allowed &= np.isin(ids, np.fromiter(candidate_ids, dtype=np.int64))
+            report_scores = np.where(allowed, report_scores, -np.inf)
+
+            count = min(int(allowed.sum()), max(shortlist, top_k))
+            if not count:
+                return []
+            picked = np.argpartition(-report_scores, count - 1)[:count]
+            others = self._load(int(rapport_id) for rapport_id in ids[picked])
+
+        # 2. Comparaison chunk à chunk, hors verrou
+        q = query["vectors"]
+        results = []
+        for other_id, other in others.items():
+            scores = q @ other["vectors"].T
+            best = scores.max(axis=1)
+            best_other = scores.argmax(axis=1)
+            shared = int((best >= threshold).sum())
+            pairs = []
+            for i in np.argsort(-best)[:evidence]:
+                j = int(best_other[i])
+                pairs.append({
+                    "chunk_index": int(i),
+                    "page": query["pages"][i] if query["pages"] else None,
+                    "other_chunk_index": j,
+                    "other_page": other["pages"][j] if other["pages"] else None,
+                    "similarity": round(float(best[i]) * 100, 2),
+                })
+            results.append({
+                "rapport_id": other_id,
+                "similarity": round(float(best.mean()) * 100, 2),
+                "max_similarity": round(float(best.max()) * 100, 2),
+                "shared_chunks": shared,
+                "shared_percent": round(shared / len(q) * 100, 2),
+                "evidence": pairs,
+            })
+
+        # Copie d'abord (part de chunks quasi identiques), proximité de sujet ensuite
+        results.sort(key=lambda r: (r["shared_chunks"], r["similarity"]), reverse=True)
+        return results[:top_k]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            reports, chunks = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(chunks), 0) FROM reports"
+            ).fetchone()
+        return {"rapports": reports, "chunks": chunks}
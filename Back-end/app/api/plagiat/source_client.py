@@ -0,0 +1,249 @@
+"""
+Client partagé des sources externes (Semantic Scholar, CrossRef...).
+
+Toutes les requêtes du processus passent par une boucle asyncio dédiée
+(thread de fond), ce qui permet de partager entre toutes les analyses :
+- un pool de connexions aiohttp persistant ;
+- un limiteur de débit « token bucket » par hôte, attendu avant de prendre
+  une place de la concurrence bornée (sémaphore global, requêtes en vol) ;
+- des ré-essais avec backoff exponentiel sur 429 / 5xx / erreurs réseau ;
+- un cache disque des réponses (SQLite), indexé par requête normalisée, avec TTL.
+"""
+import os
+import json
+import time
+import atexit
+import random
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import aiohttp
+
+
+class SourceError(Exception):
+    pass
+
+
+class SourceTimeout(SourceError):
+    # Dernière tentative sans réponse dans le délai
+    pass
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        # Réserve un jeton et renvoie le temps d'attente avant de l'utiliser
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def refund(self) -> None:
+        # Jeton réservé mais jamais utilisé (attente annulée) : rendu aux suivants
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + 1)
+
+    async def acquire(self) -> None:
+        wait = self.reserve()
+        if not wait:
+            return
+        try:
+            await asyncio.sleep(wait)
+        except asyncio.CancelledError:
+            self.refund()
+            raise
+
+
+class ResponseCache:
+    def __init__(self, path: str, ttl: int):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " body TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def put(self, key: str, body: Any) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, body, created_at) VALUES (?, ?, ?)",
+                (key, json.dumps(body), time.time())
+            )
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            deleted = self._conn.execute(
+                "DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,)
+            ).rowcount
+            self._conn.commit()
+        return deleted
+
+
+def normalize_query(text: str) -> str:
+    return " ".join(str(text).lower().split())
+
+
+class SourceClient:
+    def __init__(self, rate_limits: Dict[str, Tuple[float, float]], default_rate: Tuple[float, float],
+                 max_concurrency: int = 8, max_retries: int = 3, timeout: float = 15,
+                 backoff_base: float = 1.0, cache: Optional[ResponseCache] = None):
+        self.rate_limits = rate_limits
+        self.default_rate = default_rate
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.backoff_base = backoff_base
+        self.cache = cache
+
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._buckets_lock = threading.Lock()
+        self._loop = None
+        self._loop_lock = threading.Lock()
+        self._session = None
+        self._semaphore = None
+
+        self.stats = {
+            "requests": 0,
+            "cache_hits": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "failures": 0
+        }
+
+    # ------------------------------------------------------------------
+    # Boucle dédiée
+    # ------------------------------------------------------------------
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="plagiat-sources", daemon=True).start()
+                self._loop = loop
+                atexit.register(self.close)
+        return self._loop
+
+    def close(self) -> None:
+        if self._loop is None or self._session is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._session.close(), self._loop).result(timeout=5)
+        except Exception:
+            pass
+        self._session = None
+
+    def _bucket(self, host: str) -> TokenBucket:
+        with self._buckets_lock:
+            if host not in self._buckets:
+                rate, burst = self.rate_limits.get(host, self.default_rate)
+                self._buckets[host] = TokenBucket(rate, burst)
+            return self._buckets[host]
+
+    async def get_json(self, url: str, params: Dict[str, Any], timeout: Optional[float] = None) -> Optional[Any]:
+        # Utilisable depuis n'importe quelle boucle : la requête s'exécute sur
+        # la boucle partagée du client. `timeout` s'applique à chaque tentative
+        # HTTP (self.timeout sinon), pas à l'attente du débit de l'hôte.
+        key = self._cache_key(url, params)
+        if self.cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.stats["cache_hits"] += 1
+                return cached
+
+        future = asyncio.run_coroutine_threadsafe(
+            self._fetch(url, params, timeout), self._ensure_loop()
+        )
+        data = await asyncio.wrap_future(future)
+
+        if self.cache and data is not None:
+            self.cache.put(key, data)
+        return data
+
+    @staticmethod
+    def _cache_key(url: str, params: Dict[str, Any]) -> str:
+        normalized = sorted(
+            (k, normalize_query(v) if k == "query" else str(v)) for k, v in params.items()
+        )
+        return hashlib.sha1(json.dumps([url, normalized]).encode("utf-8")).hexdigest()
+
+    async def _fetch(self, url: str, params: Dict[str, Any], timeout: Optional[float] = None) -> Optional[Any]:
+        if self._session is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+
+        bucket = self._bucket(urlsplit(url).netloc)
+        attempt_timeout = aiohttp.ClientTimeout(total=timeout) if timeout else None
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            # Attente du débit de l'hôte avant le sémaphore global : un hôte
+            # lent (Semantic Scholar, 1 req/s) n'occupe pas les places des autres
+            await bucket.acquire()
+
+            self.stats["requests"] += 1
+            retry_after = None
+            try:
+                async with self._semaphore:
+                    async with self._session.get(url, params=params, timeout=attempt_timeout) as r:
+                        if r.status == 200:
+                            return await r.json(content_type=None)
+                        if r.status == 429 or r.status >= 500:
+                            if r.status == 429:
+                                self.stats["rate_limited"] += 1
+                            retry_after = r.headers.get("Retry-After")
+                            last_error = SourceError(f"HTTP {r.status} sur {url}")
+                        else:
+                            # Erreur client (4xx) : inutile de ré-essayer
+                            return None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                last_error = e
+
+            if attempt == self.max_retries:
+                break
+
+            self.stats["retries"] += 1
+            delay = self.backoff_base * (2 ** attempt) * (1 + random.random() * 0.25)
+            if retry_after:
+                try:
+                    delay = max(delay, float(retry_after))
+                except ValueError:
+                    pass
+            await asyncio.sleep(delay)
+
+        self.stats["failures"] += 1
+        if isinstance(last_error, asyncio.TimeoutError):
+            raise SourceTimeout(f"Délai dépassé sur {url}")
+        raise SourceError(str(last_error))
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats)
@@ -0,0 +1,440 @@
+"""
+Extraction du texte des rapports, en flux, avec cache disque.
+
+Les pages sont lues une à une (générateur) et chaque ligne alimente en un
+seul passage les statistiques du texte et le découpage en chunks
+(fenêtres couvrant tout le document, voir chunking.py). Le
+résultat (texte, pages, statistiques, chunks) est conservé dans un cache
+SQLite indexé par le sha256 du fichier : un même PDF n'est jamais analysé
+deux fois, que ce soit pour /analyze, /analysis/<id> ou l'indexation.
+"""
+import os
+import re
+import json
+import time
+import zlib
+import bisect
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from ...config import Config
+from .pdf_backends import configured_backends, iter_pdf_pages
+from .chunking import WindowChunker, chunk_coverage, get_boilerplate_index
+
+try:
+    import docx
+except ImportError:
+    docx = None
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SENTENCE_DELIMITERS = re.compile(r'[.!?]')
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+VOWELS = "aeiouyàâéèêëîïôùûüÿ"
+
+# À incrémenter si le découpage ou les statistiques changent
+EXTRACTION_VERSION = 5
+
+
+def cache_version() -> str:
+    # Le texte dépend aussi du moteur PDF et les chunks du mode de découpage :
+    # un changement de l'un ou de l'autre invalide le cache
+    return f"{EXTRACTION_VERSION}:{','.join(configured_backends())}:{Config.PLAGIAT_CHUNK_MODE}"
+
+
+def resolve_storage_path(filepath: str) -> str:
+    if os.path.isabs(filepath) or ':' in filepath:
+        match = re.search(r'(uploads[/\\][\s\S]+)', filepath, re.IGNORECASE)
+        if match:
+            relative_path = match.group(1)
+            relative_path = relative_path.replace('/', os.path.sep).replace('\\', os.path.sep)
+        else:
+            relative_path = filepath
+    else:
+        relative_path = filepath.lstrip(os.path.sep)
+
+    absolute_filepath = os.path.join(ROOT_DIR, relative_path)
+    return absolute_filepath.replace('/', os.path.sep).replace('\\', os.path.sep)
+
+
+def file_fingerprint(filepath: str) -> Optional[str]:
+    absolute_filepath = resolve_storage_path(filepath)
+    if not os.path.exists(absolute_filepath):
+        return None
+
+    digest = hashlib.sha256()
+    with open(absolute_filepath, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_fingerprint(chunk: str) -> str:
+    return hashlib.sha1(" ".join(chunk.lower().split()).encode("utf-8")).hexdigest()
+
+
+def iter_pages(absolute_filepath: str) -> Iterator[Tuple[int, str]]:
+    # (numéro de page, texte) ; les formats sans pagination forment une page
+    if absolute_filepath.endswith('.pdf'):
+        for number, page_text in iter_pdf_pages(absolute_filepath):
+            if page_text:
+                yield number, page_text
+    elif absolute_filepath.endswith('.docx'):
+        if docx is None:
+            raise ImportError("python-docx est requis pour les fichiers .docx")
+        doc = docx.Document(absolute_filepath)
+        paragraphs = [p.text.strip() for p in doc.paragraphs if p.text.strip()]
+        if paragraphs:
+            yield 1, '\n'.join(paragraphs)
+    elif absolute_filepath.endswith('.txt'):
+        with open(absolute_filepath, 'r', encoding='utf-8') as f:
+            yield 1, f.read()
+
+
+def count_syllables(word: str) -> int:
+    word = word.lower()
+    count = 0
+    prev_char_vowel = False
+    for char in word:
+        is_vowel = char in VOWELS
+        if is_vowel and not prev_char_vowel:
+            count += 1
+        prev_char_vowel = is_vowel
+    return max(1, count)
+
+
+class TextStats:
+    # Statistiques calculées ligne par ligne, identiques à un calcul sur le texte complet
+
+    def __init__(self):
+        self.words = 0
+        self.syllables = 0
+        self.unique = set()
+        self.sentences = 0
+        self.paragraphs = 0
+        self._open_sentence = False
+
+    def add_line(self, line: str) -> None:
+        words = line.split()
+        self.words += len(words)
+        self.unique.update(words)
+        self.syllables += sum(count_syllables(word) for word in words)
+        if line.strip():
+            self.paragraphs += 1
+
+        pieces = SENTENCE_DELIMITERS.split(line)
+        self._open_sentence = self._open_sentence or bool(pieces[0].strip())
+        for piece in pieces[1:]:
+            self.sentences += self._open_sentence
+            self._open_sentence = bool(piece.strip())
+
+    def result(self, total_characters: int) -> Dict:
+        sentences = self.sentences + self._open_sentence
+        syllables = self.syllables or 1
+        words_count = self.words or 1
+        sentences_count = sentences or 1
+        readability = 206.835 - 1.015 * (words_count / sentences_count) - 84.6 * (syllables / words_count)
+        readability = max(0, min(100, readability))
+
+        return {
+            "total_words": words_count,
+            "total_characters": total_characters,
+            "total_sentences": sentences_count,
+            "total_paragraphs": self.paragraphs,
+            "unique_words": len(self.unique),
+            "readability_score": round(readability, 2)
+        }
+
+
+class Chunker:
+    # Découpage historique (PLAGIAT_CHUNK_MODE = "legacy") : paragraphe par
+    # paragraphe, max_chunks au plus
+
+    def __init__(self, max_chunks: int = 25):
+        self.max_chunks = max_chunks
+        self.chunks: List[str] = []
+        self.pages: List[int] = []
+
+    def _append(self, chunk: str, page: int) -> None:
+        self.chunks.append(chunk)
+        self.pages.append(page)
+
+    def add_paragraph(self, para: str, page: int = 1, offset: Optional[int] = None) -> None:
+        # offset est ignoré : les positions sont retrouvées après coup (locate_chunks)
+        if len(self.chunks) >= self.max_chunks:
+            return
+
+        words = para.split()
+        if len(words) <= 150:
+            self._append(para, page)
+            return
+
+        sentences = SENTENCE_BOUNDARY.split(para)
+        current_chunk = []
+        current_words = 0
+        for sentence in sentences:
+            sentence_words = sentence.split()
+            if len(sentence_words) < 3:
+                continue
+            if current_words + len(sentence_words) <= 100 and len(current_chunk) < 5:
+                current_chunk.append(sentence)
+                current_words += len(sentence_words)
+            else:
+                if current_chunk:
+                    self._append(' '.join(current_chunk), page)
+                current_chunk = [sentence]
+                current_words = len(sentence_words)
+            if len(self.chunks) >= self.max_chunks:
+                break
+        if current_chunk and len(self.chunks) < self.max_chunks:
+            self._append(' '.join(current_chunk), page)
+
+    def finish(self, text: str, page_of_offset=None) -> Tuple[List[str], List[int]]:
+        # Documents peu structurés : complément par phrases du texte entier
+        if len(self.chunks) < 10:
+            cursor = 0
+            for sentence in SENTENCE_BOUNDARY.split(text):
+                offset = text.find(sentence, cursor)
+                cursor = max(cursor, offset)
+                sentence = sentence.strip()
+                if not sentence or len(sentence.split()) < 5:
+                    continue
+                if len(self.chunks) >= self.max_chunks:
+                    break
+                self._append(sentence, page_of_offset(offset) if page_of_offset else 1)
+
+        return self.chunks[:self.max_chunks], self.pages[:self.max_chunks]
+
+
+def make_chunker(max_chunks: int = 25):
+    if Config.PLAGIAT_CHUNK_MODE == "legacy":
+        return Chunker(max_chunks)
+    index = get_boilerplate_index()
+    return WindowChunker(common=index.common() if index else frozenset())
+
+
+def locate_chunks(text: str, chunks: List[str]) -> List[Optional[Tuple[int, int]]]:
+    # Chunks du découpage historique : sous-chaînes du texte, dans l'ordre de lecture
+    offsets, cursor = [], 0
+    for chunk in chunks:
+        start = text.find(chunk, cursor)
+        if start < 0:
+            start = text.find(chunk)
+        if start < 0:
+            offsets.append(None)
+            continue
+        offsets.append((start, start + len(chunk)))
+        cursor = start
+    return offsets
+
+
+class ExtractedDocument:
+    def __init__(self, file_hash: Optional[str], text: str, page_offsets: List[Tuple[int, int]],
+                 stats: Dict, chunks: List[str], chunk_pages: List[int], coverage: Dict = None,
+                 chunk_offsets: List[Optional[Tuple[int, int]]] = None):
+        self.file_hash = file_hash
+        self.text = text
+        self.page_offsets = page_offsets  # [(numéro de page, position de début dans text)]
+        self.stats = stats
+        self.chunks = chunks
+        self.chunk_pages = chunk_pages
+        self.coverage = coverage or {}  # voir chunking.chunk_coverage
+        self.chunk_offsets = chunk_offsets or []  # (début, fin) de chaque chunk dans text, ou None
+
+    @property
+    def page_count(self) -> int:
+        return len(self.page_offsets)
+
+    def page_of_offset(self, offset: int) -> int:
+        if not self.page_offsets:
+            return 1
+        starts = [start for _, start in self.page_offsets]
+        return self.page_offsets[max(0, bisect.bisect_right(starts, offset) - 1)][0]
+
+    def to_dict(self) -> Dict:
+        return {
+            "text": self.text,
+            "page_offsets": self.page_offsets,
+            "stats": self.stats,
+            "chunks": self.chunks,
+            "chunk_pages": self.chunk_pages,
+            "coverage": self.coverage,
+            "chunk_offsets": self.chunk_offsets
+        }
+
+    @classmethod
+    def from_dict(cls, file_hash: str, data: Dict) -> "ExtractedDocument":
+        return cls(
+            file_hash, data["text"], [tuple(p) for p in data["page_offsets"]],
+            data["stats"], data["chunks"], data["chunk_pages"], data.get("coverage"),
+            [tuple(o) if o else None for o in data.get("chunk_offsets", [])]
+        )
+
+
+EMPTY_DOCUMENT = ExtractedDocument(None, "", [], {}, [], [])
+
+
+def extract_document(absolute_filepath: str, file_hash: Optional[str] = None,
+                     max_chunks: int = 25) -> ExtractedDocument:
+    stats = TextStats()
+    chunker = make_chunker(max_chunks)
+    parts, raw_offsets = [], []
+    length = 0
+
+    for number, page_text in iter_pages(absolute_filepath):
+        raw_offsets.append((number, length))
+        parts.append(page_text)
+        parts.append("\n")
+        length += len(page_text) + 1
+        position = length - len(page_text) - 1
+        for line in page_text.split('\n'):
+            stats.add_line(line)
+            para = line.strip()
+            if para:
+                chunker.add_paragraph(para, number, position + len(line) - len(line.lstrip()))
+            position += len(line) + 1
+
+    raw_text = "".join(parts)
+    text = raw_text.strip()
+    shift = len(raw_text) - len(raw_text.lstrip())
+    page_offsets = [(number, max(0, offset - shift)) for number, offset in raw_offsets]
+
+    document = ExtractedDocument(file_hash, text, page_offsets, {}, [], [])
+    document.chunks, document.chunk_pages = chunker.finish(text, document.page_of_offset)
+    document.stats = stats.result(len(text)) if text else {}
+    document.coverage = chunk_coverage(text, document.chunks, getattr(chunker, "boilerplate_words", 0))
+    if isinstance(chunker, WindowChunker):
+        # Positions relevées sur le texte brut, avant le strip()
+        document.chunk_offsets = [(o[0] - shift, o[1] - shift) if o else None for o in chunker.offsets]
+    else:
+        document.chunk_offsets = locate_chunks(text, document.chunks)
+
+    if isinstance(chunker, WindowChunker) and file_hash:
+        # Lignes de ce rapport, comptées pour reconnaître le gabarit des suivants
+        index = get_boilerplate_index()
+        try:
+            if index:
+                index.record(file_hash, chunker.template_lines)
+        except sqlite3.Error as e:
+            print(f"⚠️ Empreintes de gabarit non enregistrées : {e}")
+    return document
+
+
+class TextCache:
+    def __init__(self, path: str, max_entries: int = 5000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " file_hash TEXT NOT NULL,"
+            " version TEXT NOT NULL,"
+            " body BLOB NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (file_hash, version))"
+        )
+        self._conn.commit()
+
+    def get(self, file_hash: str) -> Optional[ExtractedDocument]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body FROM documents WHERE file_hash = ? AND version = ?",
+                (file_hash, cache_version())
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute(
+                "UPDATE documents SET last_used = ? WHERE file_hash = ? AND version = ?",
+                (time.time(), file_hash, cache_version())
+            )
+            self._conn.commit()
+        return ExtractedDocument.from_dict(file_hash, json.loads(zlib.decompress(row[0])))
+
+    def put(self, document: ExtractedDocument) -> None:
+        body = zlib.compress(json.dumps(document.to_dict()).encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents (file_hash, version, body, last_used) VALUES (?, ?, ?, ?)",
+                (document.file_hash, cache_version(), body, time.time())
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM documents WHERE rowid IN ("
+                    " SELECT rowid FROM documents ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        return {"entries": entries, "hits": self.hits, "misses": self.misses}
+
+
+_text_cache: Optional[TextCache] = None
+_text_cache_lock = threading.Lock()
+
+
+def get_text_cache() -> Optional[TextCache]:
+    global _text_cache
+    with _text_cache_lock:
+        if _text_cache is None:
+            try:
+                _text_cache = TextCache(
+                    os.path.join(Config.PLAGIAT_CACHE_DIR, "texts.sqlite3"),
+                    max_entries=Config.PLAGIAT_TEXT_CACHE_MAX_ENTRIES
+                )
+            except Exception as e:
+                print(f"⚠️ Cache des textes extraits désactivé : {e}")
+                return None
+        return _text_cache
+
+
+def load_document(filepath: str) -> ExtractedDocument:
+    # Texte, statistiques et chunks d'un rapport, depuis le cache si possible
+    absolute_filepath = resolve_storage_path(filepath)
+    if not os.path.exists(absolute_filepath):
+        return EMPTY_DOCUMENT
+
+    file_hash = file_fingerprint(filepath)
+    cache = get_text_cache()
+    if cache:
+        cached = cache.get(file_hash)
+        if cached is not None:
+            return cached
+
+    try:
+        document = extract_document(absolute_filepath, file_hash)
+    except Exception as e:
+        print(f"⚠️ Extraction impossible ({os.path.basename(absolute_filepath)}) : {e}")
+        return ExtractedDocument(file_hash, "", [], {}, [], [])
+
+    if cache and document.text:
+        cache.put(document)
+    return document
+
+
+def calculate_text_stats(text: str) -> Dict:
+    stats = TextStats()
+    for line in text.split('\n'):
+        stats.add_line(line)
+    return stats.result(len(text))
+
+
+def chunk_text_intelligently(text: str, max_chunks: int = 25) -> List[str]:
+    # max_chunks ne s'applique qu'au mode "legacy" ; en mode "coverage" tout le texte est découpé
+    chunker = make_chunker(max_chunks)
+    for line in text.split('\n'):
+        para = line.strip()
+        if para:
+            chunker.add_paragraph(para)
+    return chunker.finish(text)[0]
@@ -28,13 +28,17 @@ def upload_rapport():
 
     filename, path = save_pdf(file)
 
-    RapportDAO.create(
+    rapport = RapportDAO.create(
         auteur_id=student_id,
         titre=titre,
         filename=filename,
         storage_path=path
     )
 
+    # Ajout du rapport à l'index interne anti-plagiat (en arrière-plan)
+    from .plagiat.plagiat_analysis import index_rapport_async
+    index_rapport_async(rapport.id)
+
     return jsonify({"message": "Rapport uploadé avec succès"}), 201
 
 
@@ -1,4 +1,8 @@
 import os
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
 class Config:
     SQLALCHEMY_DATABASE_URI = 'mysql+pymysql://root:@localhost/projet_soutenances_simplifie'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
@@ -13,7 +17,111 @@ class Config:
     # CELERY
     CELERY_BROKER_URL = "redis://localhost:6379/0"
     CELERY_RESULT_BACKEND = "redis://localhost:6379/0"
+    # File des analyses de plagiat : "celery", "local" (threads + SQLite) ou
+    # "auto" (Celery si le broker répond, file locale sinon)
+    PLAGIAT_JOB_BACKEND = os.environ.get("PLAGIAT_JOB_BACKEND", "auto")
+    PLAGIAT_JOB_WORKERS = int(os.environ.get("PLAGIAT_JOB_WORKERS", 2))
+    # Exécution d'une analyse : "thread" (dans le processus courant) ou
+    # "process" (pool de processus, un jeu de modèles par processus)
+    PLAGIAT_ANALYSIS_EXECUTOR = os.environ.get("PLAGIAT_ANALYSIS_EXECUTOR", "thread")
+    PLAGIAT_PROCESS_WORKERS = int(os.environ.get("PLAGIAT_PROCESS_WORKERS", 0))  # 0 = cœurs physiques
+    # Bail d'un élément de job / d'une analyse en cours, renouvelé par un thread
+    # toutes les PLAGIAT_JOB_HEARTBEAT_SECONDS (annulation relue au même moment) ;
+    # au-delà, l'analyse est considérée interrompue et reprise
+    PLAGIAT_JOB_LEASE_SECONDS = int(os.environ.get("PLAGIAT_JOB_LEASE_SECONDS", 900))
+    PLAGIAT_JOB_HEARTBEAT_SECONDS = 10
+    PLAGIAT_JOB_RECLAIM_INTERVAL_SECONDS = 300  # balayage de la file locale
+    # Avancement des jobs en direct (/jobs/<id>/events) : événements gardés par
+    # job pour les reconnexions, durée de conservation après la fin du job
+    PLAGIAT_PROGRESS_BUFFER = 500
+    PLAGIAT_PROGRESS_RETENTION_SECONDS = 600
+    PLAGIAT_PROGRESS_HEARTBEAT_SECONDS = 15
+    PLAGIAT_PROGRESS_POLL_SECONDS = 2  # jobs Celery : état relu en base
 
-import os
-
+    # PLAGIAT
+    PLAGIAT_CACHE_DIR = os.environ.get("PLAGIAT_CACHE_DIR", os.path.join(BASE_DIR, "cache", "plagiat"))
+    PLAGIAT_EMBEDDING_CACHE_MAX_ENTRIES = 200000
+    PLAGIAT_TEXT_CACHE_MAX_ENTRIES = 5000  # documents extraits (texte, stats, chunks)
+    # Pagination de /analyses et /pending_analyses (?after=&limit=)
+    PLAGIAT_LIST_DEFAULT_LIMIT = 100
+    PLAGIAT_LIST_MAX_LIMIT = 500
+    # Moteurs d'extraction PDF par ordre de préférence (pypdf, pymupdf, pdfplumber)
+    PLAGIAT_PDF_BACKENDS = [
+        name.strip()
+        for name in os.environ.get("PLAGIAT_PDF_BACKENDS", "pypdf,pdfplumber").split(",")
+        if name.strip()
+    ]
+    # Extraction des pages en parallèle au-delà de ce nombre de pages
+    PLAGIAT_PDF_PARALLEL_MIN_PAGES = 40
+    PLAGIAT_PDF_WORKERS = int(os.environ.get("PLAGIAT_PDF_WORKERS", 0))  # 0 = min(4, cœurs physiques)
+    # Découpage : "coverage" (fenêtres chevauchantes sur tout le document) ou
+    # "legacy" (paragraphes, 25 chunks au plus)
+    PLAGIAT_CHUNK_MODE = os.environ.get("PLAGIAT_CHUNK_MODE", "coverage")
+    PLAGIAT_CHUNK_WINDOW_WORDS = 120
+    PLAGIAT_CHUNK_OVERLAP_WORDS = 30
+    # Recherches externes par rapport : les chunks les plus nouveaux d'abord
+    PLAGIAT_LOOKUP_BUDGET = int(os.environ.get("PLAGIAT_LOOKUP_BUDGET", 25))
+    # Ligne courte vue dans au moins ce nombre de rapports : gabarit, ignorée
+    PLAGIAT_BOILERPLATE_MIN_REPORTS = 3
+    PLAGIAT_BOILERPLATE_FRONT_PAGES = 8  # pages de garde, sommaire, listes
+    # Alignement des correspondances : graines de n mots, écarts tolérés entre passages
+    PLAGIAT_ALIGN_SEED_WORDS = 5
+    PLAGIAT_ALIGN_MAX_GAP_WORDS = 3
+    # Rapports similaires (/similar/<id>) : embeddings des chunks en float16,
+    # présélection par sections puis comparaison chunk à chunk
+    PLAGIAT_SIMILAR_SECTIONS = 8
+    PLAGIAT_SIMILAR_SHORTLIST = 50
+    PLAGIAT_SIMILAR_TOP_K = 10
+    PLAGIAT_SIMILAR_MAX_TOP_K = 50
+    PLAGIAT_SIMILAR_CHUNK_COSINE = 0.9  # chunk compté comme repris au-delà
+    # Seuils de l'index interne (rapport contre rapport)
+    PLAGIAT_INTERNAL_MIN_JACCARD = 0.5
+    PLAGIAT_INTERNAL_MIN_COSINE = 0.9
+    # Serveur de modèles partagé (optionnel) : chemin du socket Unix, ex.
+    # cache/plagiat/model_server.sock ; None = modèles chargés dans chaque worker
+    PLAGIAT_MODEL_SERVER_ADDRESS = os.environ.get("PLAGIAT_MODEL_SERVER_ADDRESS")
+    PLAGIAT_MODEL_SERVER_AUTHKEY = os.environ.get("PLAGIAT_MODEL_SERVER_AUTHKEY", "plagiat-model-server")
+    PLAGIAT_MODEL_SERVER_BATCH_WINDOW_MS = 10
+    # Détection IA : "sliding" = perplexité sur tout le document par fenêtres
+    # glissantes, "truncated" = ancien calcul sur les 1024 premiers caractères
+    PLAGIAT_AI_MODE = "sliding"
+    PLAGIAT_AI_MAX_TOKENS = 32768
+    PLAGIAT_AI_WINDOW_TOKENS = 512
+    PLAGIAT_AI_STRIDE_TOKENS = 384
+    PLAGIAT_AI_BATCH_SIZE = 4
+    PLAGIAT_TORCH_THREADS = None  # None = valeur par défaut de torch
+    # Backend d'inférence CPU : "torch" (fp32), "torch_int8" (quantification
+    # dynamique) ou "onnx" (ONNX Runtime, nécessite optimum[onnxruntime])
+    PLAGIAT_INFERENCE_BACKEND = "torch"
+    # Sources externes (URLs surchargeables pour les tests hors ligne)
+    PLAGIAT_SEMANTIC_SCHOLAR_URL = os.environ.get(
+        "PLAGIAT_SEMANTIC_SCHOLAR_URL", "https://api.semanticscholar.org/graph/v1/paper/search"
+    )
+    PLAGIAT_CROSSREF_URL = os.environ.get("PLAGIAT_CROSSREF_URL", "https://api.crossref.org/works")
+    # Débit par hôte : (requêtes / seconde, rafale)
+    PLAGIAT_SOURCE_RATE_LIMITS = {
+        "api.semanticscholar.org": (1.0, 1),
+        "api.crossref.org": (10.0, 10),
+    }
+    PLAGIAT_SOURCE_DEFAULT_RATE = (5.0, 5)
+    PLAGIAT_SOURCE_MAX_CONCURRENCY = 8
+    PLAGIAT_SOURCE_MAX_RETRIES = 3
+    PLAGIAT_SOURCE_TIMEOUT = 15
+    PLAGIAT_SOURCE_CACHE_TTL = 7 * 24 * 3600
+    # Fournisseurs interrogés en parallèle (voir app/api/plagiat/providers.py)
+    PLAGIAT_SOURCE_PROVIDERS = [
+        name.strip()
+        for name in os.environ.get("PLAGIAT_SOURCE_PROVIDERS", "semantic_scholar,crossref").split(",")
+        if name.strip()
+    ]
+    # Délai maximal par fournisseur (secondes), PLAGIAT_SOURCE_TIMEOUT sinon : par
+    # requête HTTP pour les API distantes (attente du débit non comptée), pour
+    # tout l'appel pour le corpus local
+    PLAGIAT_SOURCE_PROVIDER_TIMEOUTS = {
+        "semantic_scholar": 20,
+        "crossref": 20,
+        "local_corpus": 5,
+    }
+    # Dump local de résumés (JSONL ou Parquet : title, abstract, url)
+    PLAGIAT_LOCAL_CORPUS_PATH = os.environ.get("PLAGIAT_LOCAL_CORPUS_PATH")
 
@@ -253,14 +253,22 @@ class PlagiatAnalysis(db.Model):
     
     status = db.Column(db.String(50), default='pending')  # pending, processing, completed, error
     error_message = db.Column(db.Text, nullable=True)
+    # Bail d'une analyse "processing", renouvelé pendant le calcul : périmé, la
+    # ligne est récupérée (jobs.reclaim_stale)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
     
-    analyzed_at = db.Column(db.DateTime, nullable=True)
+    analyzed_at = db.Column(db.DateTime, nullable=True, index=True)  # tri des listes paginées
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Métriques détaillées
     ai_score = db.Column(db.Float, default=0.0)
+    ai_sections = db.Column(db.Text, nullable=True)  # JSON : score IA par chapitre
     chunks_analyzed = db.Column(db.Integer, default=0)
     chunks_with_matches = db.Column(db.Integer, default=0)
+
+    # Empreintes pour la réanalyse incrémentale
+    file_hash = db.Column(db.String(64), nullable=True)  # sha256 du fichier
+    chunk_hashes = db.Column(db.Text, nullable=True)  # JSON : sha1 de chaque chunk
     
 
     # Statistiques du texte
@@ -300,6 +308,59 @@ class PlagiatMatch(db.Model):
     # Localisation
     page = db.Column(db.Integer)
     chunk_index = db.Column(db.Integer)
+    chunk_hash = db.Column(db.String(40), nullable=True)  # empreinte du chunk analysé
+    spans = db.Column(db.Text, nullable=True)  # JSON : passages communs, voir alignment.py
 
     def __repr__(self):
         return f"<PlagiatMatch {self.id} {self.similarity}%>"
+
+
+class PlagiatOverviewStat(db.Model):
+    # Agrégats de plagiat_analyses tenus à jour à chaque écriture (voir overview_stats.py)
+    __tablename__ = 'plagiat_overview_stats'
+    __table_args__ = (
+        db.UniqueConstraint('scope', 'status', 'risk_level', name='uq_plagiat_overview_stats_key'),
+    )
+
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    scope = db.Column(db.String(10), nullable=False)  # "all" ou jour d'analyse (AAAA-MM-JJ)
+    status = db.Column(db.String(50), nullable=False)
+    risk_level = db.Column(db.String(50), nullable=False)
+    analyses_count = db.Column(db.Integer, nullable=False, default=0)
+    originality_sum = db.Column(db.Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f"<PlagiatOverviewStat {self.scope} {self.status}/{self.risk_level}: {self.analyses_count}>"
+
+class PlagiatJob(db.Model):
+    __tablename__ = 'plagiat_jobs'
+
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    kind = db.Column(db.String(50), nullable=False)  # analyze_all, analyze_selected, analyze_all_pending
+    backend = db.Column(db.String(20), default='local')  # celery, local
+    total = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    cancelled_at = db.Column(db.DateTime, nullable=True)
+
+    items = db.relationship('PlagiatJobItem', backref='job', cascade='all, delete-orphan', lazy='dynamic')
+
+    def __repr__(self):
+        return f"<PlagiatJob {self.id} {self.kind}>"
+
+class PlagiatJobItem(db.Model):
+    __tablename__ = 'plagiat_job_items'
+
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    job_id = db.Column(db.BigInteger, db.ForeignKey('plagiat_jobs.id'), nullable=False, index=True)
+    rapport_id = db.Column(db.Integer, db.ForeignKey('rapports.id'), nullable=False)
+    analysis_id = db.Column(db.BigInteger, db.ForeignKey('plagiat_analyses.id'), nullable=True)
+
+    status = db.Column(db.String(20), default='queued', index=True)  # queued, running, completed, skipped, error, cancelled
+    error_message = db.Column(db.Text, nullable=True)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)  # bail d'un élément "running"
+
+    def __repr__(self):
+        return f"<PlagiatJobItem {self.id} rapport={self.rapport_id} {self.status}>"
@@ -0,0 +1,51 @@
+"""
+Tâches Celery de l'application.
+
+Lancement d'un worker :
+    celery -A celery_worker.celery worker --concurrency=4
+"""
+try:
+    from celery import Celery
+except ImportError:
+    Celery = None
+
+from ..config import Config
+
+celery = None
+_flask_app = None
+
+if Celery is not None:
+    celery = Celery(
+        "soutenances",
+        broker=Config.CELERY_BROKER_URL,
+        backend=Config.CELERY_RESULT_BACKEND
+    )
+    # Un rapport à la fois par processus : les analyses sont longues
+    celery.conf.update(
+        task_acks_late=True,
+        worker_prefetch_multiplier=1,
+        task_ignore_result=True
+    )
+
+
+def init_celery(app):
+    global _flask_app
+    _flask_app = app
+    return celery
+
+
+def _get_flask_app():
+    global _flask_app
+    if _flask_app is None:
+        from .. import create_app
+        _flask_app = create_app()
+    return _flask_app
+
+
+if celery is not None:
+    @celery.task(name="plagiat.analyze_rapport")
+    def analyze_rapport_task(item_id):
+        from ..api.plagiat.jobs import process_job_item
+
+        with _get_flask_app().app_context():
+            return process_job_item(item_id)
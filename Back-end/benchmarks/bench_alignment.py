@@ -0,0 +1,166 @@
+"""
+Mesure l'alignement fin des correspondances et /analysis/<id>/highlights.
+
+Construit un rapport synthétique d'environ 70 pages (fichier texte dans
+app/uploads, supprimé à la fin), puis 100 correspondances : sources qui
+reprennent un passage du chunk avec quelques mots modifiés, et sources sans
+rapport. Vérifie que les passages repris sont retrouvés (positions exactes
+dans le texte extrait), mesure align_matches sur les 100 correspondances,
+puis enregistre l'analyse et mesure l'endpoint (cache des textes chaud).
+
+    python benchmarks/bench_alignment.py [--matches 100] [--runs 20]
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+os.environ["PLAGIAT_SOURCE_PROVIDERS"] = ""
+os.environ["PLAGIAT_CACHE_DIR"] = tempfile.mkdtemp(prefix="bench_alignment_")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import BigInteger, event
+from sqlalchemy.ext.compiler import compiles
+
+from app.models import db, User, Rapport, PlagiatAnalysis
+from app.api.plagiat.alignment import WORD, align_matches, decode_spans
+from app.api.plagiat.persistence import persist_analysis
+from app.api.plagiat.plagiat_analysis import plagiat_analysis_bp
+from app.api.plagiat.text_extraction import ROOT_DIR, load_document
+
+VOCABULARY = (
+    "système données application gestion utilisateur serveur base modèle architecture service "
+    "formation qualité processus évaluation interface sécurité déploiement performance requête "
+    "conception analyse besoin module fonctionnalité laboratoire validation document rapport "
+    "méthode résultat développement technologie solution intégration test client réseau "
+    "le la les un une des de du et pour dans avec sur par qui que est sont ont cette ce"
+).split()
+
+
+@compiles(BigInteger, "sqlite")
+def _sqlite_big_integer(type_, compiler, **kw):
+    return "INTEGER"
+
+
+def synthetic_text(rng: random.Random, pages: int = 70) -> str:
+    lines = []
+    for page in range(pages):
+        for _ in range(10):
+            words = [rng.choice(VOCABULARY) + (str(rng.randint(0, 99)) if rng.random() < 0.1 else "")
+                     for _ in range(rng.randint(25, 40))]
+            lines.append(" ".join(words).capitalize() + ".")
+    return "\n".join(lines)
+
+
+def make_matches(rng: random.Random, document, count: int):
+    matches, expected = [], []
+    for n in range(count):
+        index = rng.randrange(len(document.chunks))
+        start, end = document.chunk_offsets[index]
+        words = document.text[start:end].split()
+        # Texte de remplissage sans mot commun avec le rapport : seul le passage repris doit s'aligner
+        filler = " ".join(f"autre{rng.randint(0, 500)}" for _ in range(rng.randint(20, 80)))
+        if n % 4 == 3:
+            source, copied = filler + " " + filler, None
+        else:
+            # Passage repris avec un mot modifié au milieu
+            a = rng.randrange(0, max(1, len(words) - 40))
+            original = words[a:a + 40]
+            passage = original[:20] + ["MODIFIÉ"] + original[21:]
+            source, copied = f"{filler} {' '.join(passage)} {filler}", original
+        matches.append({
+            "text": document.chunks[index][:500], "source_url": f"https://example.org/{n}",
+            "similarity": 60.0, "score": 60.0, "source": "Web", "matched_text": source[:200],
+            "original_text": "", "page": document.chunk_pages[index], "chunk_index": index,
+            "chunk_hash": None, "source_text": source,
+        })
+        expected.append(copied)
+    return matches, expected
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--matches", type=int, default=100)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    upload_dir = os.path.join(ROOT_DIR, "uploads", "tmp_bench_alignment")
+    os.makedirs(upload_dir, exist_ok=True)
+    try:
+        with open(os.path.join(upload_dir, "rapport.txt"), "w", encoding="utf-8") as f:
+            f.write(synthetic_text(rng))
+        storage_path = "uploads/tmp_bench_alignment/rapport.txt"
+        document = load_document(storage_path)
+        print(f"Rapport : {len(document.text.split())} mots, {len(document.chunks)} chunks")
+
+        matches, expected = make_matches(rng, document, args.matches)
+        start = time.perf_counter()
+        align_matches(document, matches)
+        elapsed = time.perf_counter() - start
+        print(f"align_matches : {len(matches)} correspondances en {elapsed * 1000:.1f} ms")
+
+        for match, copied in zip(matches, expected):
+            spans = decode_spans(match["spans"])
+            if copied is None:
+                assert not spans, f"passage trouvé dans une source sans rapport : {spans}"
+                continue
+            base = document.chunk_offsets[match["chunk_index"]][0]
+            found = [WORD.findall(document.text[base + s:base + e]) for s, e, _, _ in spans]
+            # Un seul passage : le mot modifié est couvert par la fusion des deux graines voisines
+            assert found == [WORD.findall(" ".join(copied))], (found, copied)
+        print("✅ Passages repris retrouvés, mot modifié inclus ; aucun passage dans les sources sans rapport")
+
+        app = Flask(__name__)
+        app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tempfile.mkdtemp()}/alignment.db"
+        db.init_app(app)
+        app.register_blueprint(plagiat_analysis_bp)
+        with app.app_context():
+            db.create_all()
+            user = User(name="Nom", prenom="Prenom", email="e@example.org", password_hash="x", role="student")
+            db.session.add(user)
+            db.session.flush()
+            rapport = Rapport(auteur_id=user.id, filename="rapport.txt", storage_path=storage_path)
+            db.session.add(rapport)
+            db.session.flush()
+            analysis = PlagiatAnalysis(rapport_id=rapport.id)
+            db.session.add(analysis)
+            persist_analysis(analysis, {"sources": matches, "similarity": 60.0, "originality": 40.0,
+                                        "risk": "high", "file_hash": document.file_hash,
+                                        "chunk_hashes": [], "chunk_pages": document.chunk_pages})
+
+            client = app.test_client()
+            url = f"/api/plagiat/analysis/{analysis.id}/highlights"
+            data = client.get(url).get_json()
+            assert len(data["matches"]) == sum(copied is not None for copied in expected)
+            for item in data["matches"]:
+                for span in item["spans"]:
+                    assert span["text"] == document.text[span["start"]:span["end"]]
+
+            statements = {"n": 0}
+
+            def before(*a, **k):
+                statements["n"] += 1
+
+            event.listen(db.engine, "before_cursor_execute", before)
+            durations = []
+            for _ in range(args.runs):
+                db.session.remove()  # comme une requête isolée : rien dans la session
+                start = time.perf_counter()
+                response = client.get(url)
+                durations.append(time.perf_counter() - start)
+                assert response.status_code == 200
+            event.remove(db.engine, "before_cursor_execute", before)
+            durations.sort()
+            print(f"{url} : {len(data['highlights'])} zones, {statements['n'] // args.runs} requêtes SQL, "
+                  f"p50 {durations[len(durations) // 2] * 1000:.1f} ms, p95 {durations[int(0.95 * (len(durations) - 1))] * 1000:.1f} ms")
+    finally:
+        shutil.rmtree(upload_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
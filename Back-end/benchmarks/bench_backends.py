@@ -0,0 +1,104 @@
+"""
+Compare les backends d'inférence du détecteur (torch fp32, torch int8, ONNX).
+
+Pour chaque backend, dans un processus séparé (pour mesurer la RSS) :
+- débit d'embeddings MiniLM (chunks/s) ;
+- débit de perplexité distilgpt2 par fenêtres glissantes (tokens/s) ;
+- RSS maximale du processus.
+
+Puis contrôle de parité par rapport à torch fp32 : écart maximal des
+similarités cosinus entre paires de chunks et écart relatif de perplexité.
+
+    python benchmarks/bench_backends.py [--backends torch torch_int8 onnx] [--chunks 200]
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CHILD = """
+import json, random, resource, sys, time
+import numpy as np
+from app.config import Config
+Config.PLAGIAT_MODEL_SERVER_ADDRESS = None
+from app.api.plagiat.plagiarism_detector import PlagiarismDetector
+
+backend, n_chunks = sys.argv[1], int(sys.argv[2])
+random.seed(0)
+words = open(sys.argv[3], encoding="utf-8").read().split()
+chunks = [" ".join(random.choices(words, k=120)) for _ in range(n_chunks)]
+document = " ".join(random.choices(words, k=4000))
+
+detector = PlagiarismDetector(use_model_server=False, backend=backend)
+detector.embedding_cache = None
+detector.warmup()
+
+start = time.perf_counter()
+embeddings = detector.embed(chunks)
+embed_seconds = time.perf_counter() - start
+
+start = time.perf_counter()
+ai = detector.calculate_ai_score(document)
+ai_seconds = time.perf_counter() - start
+
+pairs = embeddings[: n_chunks // 2] @ embeddings[n_chunks // 2:].T
+print(json.dumps({
+    "backend": backend,
+    "chunks_per_sec": n_chunks / embed_seconds,
+    "tokens_per_sec": ai.get("tokens_scored", 0) / ai_seconds,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "pair_similarities": np.diag(pairs).tolist(),
+    "perplexity": ai.get("perplexity"),
+}))
+"""
+
+SAMPLE_WORDS = (
+    "le projet consiste à concevoir une application web de gestion des soutenances "
+    "pour les étudiants et les enseignants avec une architecture client serveur "
+    "the system uses a relational database and a rest api to manage users reports "
+    "and schedules while machine learning models detect plagiarism in documents "
+    "nous avons réalisé une étude comparative des solutions existantes puis une "
+    "analyse des besoins fonctionnels et non fonctionnels de la plateforme"
+)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=["torch", "torch_int8", "onnx"])
+    parser.add_argument("--chunks", type=int, default=200)
+    args = parser.parse_args()
+
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    words_path = os.path.join(backend_dir, "cache", "bench_words.txt")
+    os.makedirs(os.path.dirname(words_path), exist_ok=True)
+    with open(words_path, "w", encoding="utf-8") as f:
+        f.write(SAMPLE_WORDS)
+
+    results = {}
+    for backend in args.backends:
+        proc = subprocess.run(
+            [sys.executable, "-c", CHILD, backend, str(args.chunks), words_path],
+            cwd=backend_dir, capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            print(f"{backend:<11} échec : {proc.stderr.strip().splitlines()[-1:]}")
+            continue
+        results[backend] = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    reference = results.get("torch")
+    print(f"{'backend':<11} {'chunks/s':>9} {'tokens/s':>9} {'RSS (Mo)':>9} {'Δ cos max':>10} {'Δ ppl %':>8}")
+    for backend, r in results.items():
+        cos_delta = ppl_delta = float("nan")
+        if reference:
+            cos_delta = max(abs(a - b) for a, b in zip(r["pair_similarities"], reference["pair_similarities"]))
+            if r["perplexity"] and reference["perplexity"]:
+                ppl_delta = abs(r["perplexity"] - reference["perplexity"]) / reference["perplexity"] * 100
+        print(f"{backend:<11} {r['chunks_per_sec']:>9.1f} {r['tokens_per_sec']:>9.0f} "
+              f"{r['max_rss_mb']:>9.0f} {cos_delta:>10.4f} {ppl_delta:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
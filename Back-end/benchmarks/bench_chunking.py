@@ -0,0 +1,115 @@
+"""
+Compare le découpage historique (25 chunks au plus) au découpage par
+fenêtres chevauchantes : chunks produits, débit (chunks/s), couverture du
+texte, part écartée comme gabarit et recherches externes par rapport.
+
+Rapports utilisés : le PDF d'exemple de app/uploads (s'il existe) et des
+rapports synthétiques de 70 pages qui partagent la page de garde ENSIASD,
+des en-têtes et pieds de page. Ils passent dans l'ordre : les empreintes de
+gabarit partagées s'enrichissent d'un rapport à l'autre.
+
+    python benchmarks/bench_chunking.py [--reports 6] [--repeat 5]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+os.environ["PLAGIAT_CACHE_DIR"] = tempfile.mkdtemp(prefix="bench_chunking_")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import Config
+from app.api.plagiat.chunking import WindowChunker, chunk_coverage, get_boilerplate_index, select_for_lookup
+from app.api.plagiat.text_extraction import Chunker, iter_pages, resolve_storage_path
+
+SAMPLE = "uploads/1828e04f9ab849e78af630a362bae4a9_Rapport_de_stage.pdf"
+VOCABULARY = (
+    "système données application gestion utilisateur serveur base modèle architecture service "
+    "formation qualité processus évaluation interface sécurité déploiement performance requête "
+    "conception analyse besoin module fonctionnalité laboratoire validation document rapport "
+    "méthode résultat développement technologie solution intégration test client réseau"
+).split()
+FILLER = "le la les un une des de du et pour dans avec sur par qui que est sont ont cette ce".split()
+
+
+def synthetic_report(seed: int, pages: int = 70):
+    rng = random.Random(seed)
+    cover = [
+        "RAPPORT DE STAGE", "Filière : Ingénierie Logicielle", f"Sujet numéro {seed}",
+        "Présenté par :", f"Étudiant {seed}", f"Soutenue le 0{seed % 9 + 1}/12/2025 à l'Heure 14h40",
+        "Devant le jury :", f"Pr. Enseignant{seed} NOM Président", "Pr. Basma SAAD Examinateur",
+        "Année Universitaire 2024-2025",
+    ]
+    result = [(1, "\n".join(cover))]
+    toc = ["Table des matières"] + [f"{k}.{j} Section {k}.{j} . . . . . . . . . . {k * 3 + j}"
+                                    for k in range(1, 6) for j in range(1, 6)]
+    result.append((2, "\n".join(toc)))
+    for number in range(3, pages + 1):
+        lines = [f"Chapitre {number // 10 + 1}. Réalisation"]
+        for _ in range(9):
+            words = [rng.choice(VOCABULARY if rng.random() < 0.55 else FILLER) for _ in range(rng.randint(25, 40))]
+            lines.append(" ".join(words).capitalize() + ".")
+        lines.append(f"Rapport de fin d'études {seed}")
+        lines.append(str(number))
+        result.append((number, "\n".join(lines)))
+    return result
+
+
+def run(chunker, pages):
+    parts = []
+    for number, page_text in pages:
+        parts.append(page_text)
+        for line in page_text.split("\n"):
+            para = line.strip()
+            if para:
+                chunker.add_paragraph(para, number)
+    text = "\n".join(parts)
+    chunks, _ = chunker.finish(text)
+    return text, chunks
+
+
+def measure(label: str, make, pages, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        chunker = make()
+        text, chunks = run(chunker, pages)
+    elapsed = (time.perf_counter() - start) / repeat
+
+    coverage = chunk_coverage(text, chunks, getattr(chunker, "boilerplate_words", 0))
+    candidates = [i for i, chunk in enumerate(chunks) if len(chunk.split()) >= 5]
+    start = time.perf_counter()
+    looked_up = select_for_lookup(chunks, candidates, Config.PLAGIAT_LOOKUP_BUDGET)
+    selection = time.perf_counter() - start
+    lookup_coverage = chunk_coverage(text, [chunks[i] for i in looked_up])["coverage_percent"]
+    print(f"  {label:<9} {len(chunks):4d} chunks  {len(chunks) / elapsed:9.0f} chunks/s  "
+          f"couverture {coverage['coverage_percent']:5.1f} %  gabarit {coverage['boilerplate_percent']:4.1f} %  "
+          f"recherches {len(looked_up):3d} ({lookup_coverage:4.1f} % du texte, tri {selection * 1000:.1f} ms)")
+    return chunker
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reports", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    reports = []
+    sample = resolve_storage_path(SAMPLE)
+    if os.path.exists(sample):
+        reports.append((os.path.basename(sample)[:40], list(iter_pages(sample))))
+    reports += [(f"synthétique {seed} (70 pages)", synthetic_report(seed)) for seed in range(1, args.reports + 1)]
+
+    index = get_boilerplate_index()
+    for seed, (name, pages) in enumerate(reports):
+        words = sum(len(text.split()) for _, text in pages)
+        print(f"\n{name} : {len(pages)} pages, {words} mots, "
+              f"{len(index.common())} lignes de gabarit partagées connues")
+        measure("legacy", lambda: Chunker(25), pages, args.repeat)
+        chunker = measure("coverage", lambda: WindowChunker(common=index.common()), pages, args.repeat)
+        index.record(f"report-{seed}", chunker.template_lines)
+
+
+if __name__ == "__main__":
+    main()
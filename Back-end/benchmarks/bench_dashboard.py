@@ -0,0 +1,228 @@
+"""
+Mesure /api/plagiat/dashboard : ancien parcours (soutenance, jurys et
+enseignant chargés rapport par rapport) contre la nouvelle lecture (une
+requête par page plus une pour les jurys).
+
+Remplit une base SQLite avec N rapports (étudiants, analyses, soutenances et
+jurys), vérifie que le tableau complet est identique à l'ancien calcul, que
+la pagination par curseur rend chaque rapport une fois quel que soit le tri,
+puis affiche requêtes et p50 / p95 de chaque mode.
+
+    python benchmarks/bench_dashboard.py [--reports 5000] [--runs 20]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+from datetime import date, datetime, time as dtime, timedelta
+
+os.environ["PLAGIAT_SOURCE_PROVIDERS"] = ""
+os.environ["PLAGIAT_CACHE_DIR"] = tempfile.mkdtemp(prefix="bench_dashboard_")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import BigInteger, event, insert, text
+from sqlalchemy.ext.compiler import compiles
+
+from app.models import db, User, Student, Rapport, PlagiatAnalysis, Soutenance, Jury
+from app.api.plagiat.plagiat_dashboard import plagiat_dashboard_bp
+
+FILIERES = ["GI", "GE", "GM"]
+NIVEAUX = ["L3", "M1", "M2"]
+RISKS = ["none", "low", "medium", "high"]
+ROLES = ["president", "member", "supervisor"]
+
+
+@compiles(BigInteger, "sqlite")
+def _sqlite_big_integer(type_, compiler, **kw):
+    return "INTEGER"
+
+
+def populate(count: int) -> None:
+    random.seed(count)
+    teachers = [{"id": 1_000_000 + t, "name": f"Prof{t}", "prenom": "P", "email": f"t{t}@example.org",
+                 "password_hash": "x", "role": "teacher"} for t in range(40)]
+    users, students, rapports, analyses, soutenances, juries = [], [], [], [], [], []
+    base = datetime(2026, 1, 1)
+    for i in range(1, count + 1):
+        users.append({"id": i, "name": f"Nom{i % 700}", "prenom": f"Prenom{i}", "email": f"e{i}@example.org",
+                      "password_hash": "x", "role": "student"})
+        if i % 6:
+            students.append({"user_id": i, "cin": f"C{i}", "cne": f"N{i}",
+                             "filiere": FILIERES[i % 3], "niveau": NIVEAUX[i % 3]})
+        rapports.append({"id": i, "auteur_id": i, "filename": f"rapport|{i}.pdf", "storage_path": "x"})
+        if i % 4:
+            analyses.append({
+                "rapport_id": i, "status": "completed" if i % 9 else "error",
+                "risk_level": random.choice(RISKS),
+                # Scores et dates en partie identiques : le curseur doit départager
+                "similarity_score": float(random.randint(0, 20)), "originality_score": random.uniform(10, 100),
+                "total_matches": random.randint(0, 30), "sources_count": random.randint(0, 5),
+                "analyzed_at": base + timedelta(hours=i // 3),
+            })
+        if i % 6 and i % 5:
+            for k in range(1 + (i % 7 == 0)):
+                sid = len(soutenances) + 1
+                soutenances.append({"id": sid, "student_id": i, "rapport_id": i, "date_soutenance": date(2026, 6, 1),
+                                    "heure_debut": dtime(9, 0)})
+                for r in range(3):
+                    juries.append({"soutenance_id": sid, "teacher_id": random.choice(teachers)["id"],
+                                   "role": ROLES[r]})
+    for model, rows in ((User, teachers + users), (Student, students), (Rapport, rapports),
+                        (PlagiatAnalysis, analyses), (Soutenance, soutenances), (Jury, juries)):
+        db.session.execute(insert(model.__table__), rows)
+    # Index créés d'office par MySQL (InnoDB) sur les clés étrangères, absents sous SQLite
+    db.session.execute(text("CREATE INDEX ix_soutenances_rapport_id ON soutenances (rapport_id)"))
+    db.session.execute(text("CREATE INDEX ix_juries_soutenance_id ON juries (soutenance_id)"))
+    db.session.commit()
+
+
+def legacy_dashboard():
+    # Ancien handler : parcours paresseux rapport -> soutenance -> jurys -> enseignant
+    data = []
+    for rapport, user, student_info, analysis in (
+        db.session.query(Rapport, User, Student, PlagiatAnalysis)
+        .join(User, User.id == Rapport.auteur_id)
+        .outerjoin(Student, Student.user_id == User.id)
+        .outerjoin(PlagiatAnalysis, PlagiatAnalysis.rapport_id == Rapport.id)
+        .all()
+    ):
+        jury_names = []
+        soutenance = rapport.soutenance[0] if rapport.soutenance else None
+        if soutenance:
+            for j in soutenance.juries:
+                if j.teacher:
+                    jury_names.append(f"{j.teacher.name} ({j.role})")
+        data.append({
+            "id": analysis.id if analysis else None,
+            "rapportId": rapport.id,
+            "studentId": user.id,
+            "studentName": user.name,
+            "studentPrenom": user.prenom,
+            "studentMatricule": getattr(student_info, "cne", "N/A"),
+            "specialty": getattr(student_info, "filiere", "--"),
+            "level": getattr(student_info, "niveau", "--"),
+            "rapportName": rapport.filename,
+            "similarityScore": int(analysis.similarity_score or 0) if analysis else 0,
+            "originalityScore": int(analysis.originality_score or 100) if analysis else 100,
+            "riskLevel": analysis.risk_level if analysis else "none",
+            "totalMatches": analysis.total_matches if analysis else 0,
+            "sourcesCount": analysis.sources_count if analysis else 0,
+            "status": analysis.status if analysis else "pending",
+            "analyzedAt": analysis.analyzed_at.isoformat() if analysis and analysis.analyzed_at else None,
+            "juryAssigned": jury_names,
+        })
+    return data
+
+
+class Counter:
+    def __init__(self):
+        self.n = 0
+
+    def __call__(self, *args, **kwargs):
+        self.n += 1
+
+
+def timed(call, runs: int):
+    counter = Counter()
+    event.listen(db.engine, "before_cursor_execute", counter)
+    durations = []
+    try:
+        for _ in range(runs):
+            db.session.expire_all()
+            start = time.perf_counter()
+            result = call()
+            durations.append(time.perf_counter() - start)
+            db.session.remove()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", counter)
+    durations.sort()
+    p95 = durations[min(len(durations) - 1, int(round(0.95 * (len(durations) - 1))))]
+    return result, counter.n // runs, durations[len(durations) // 2] * 1000, p95 * 1000
+
+
+def get(client, url: str):
+    response = client.get(url)
+    assert response.status_code == 200, response.data[:300]
+    return response.get_data(as_text=True)
+
+
+def walk(client, query: str, limit: int = 173):
+    seen, cursor = [], None
+    while True:
+        url = f"/api/plagiat/dashboard?{query}&limit={limit}" + (f"&after={cursor}" if cursor else "")
+        page = json.loads(get(client, url))
+        seen.extend(row["rapportId"] for row in page["items"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            return seen
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reports", type=int, default=5000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tempfile.mkdtemp()}/dashboard.db"
+    db.init_app(app)
+    app.register_blueprint(plagiat_dashboard_bp)
+
+    with app.app_context():
+        db.create_all()
+        populate(args.reports)
+        client = app.test_client()
+
+        full = json.loads(get(client, "/api/plagiat/dashboard"))
+        assert full == legacy_dashboard(), "tableau différent de l'ancien calcul"
+        by_id = {row["rapportId"]: row for row in full}
+        print(f"✅ Tableau complet identique à l'ancien calcul ({len(full)} rapports)")
+
+        ndjson = [json.loads(line) for line in get(client, "/api/plagiat/dashboard?format=ndjson").splitlines()]
+        assert ndjson == full, "flux ndjson incohérent"
+
+        def key(sort):
+            return {
+                "rapportId": lambda r: (r["rapportId"],),
+                "similarity": lambda r: (r["similarityScore"] if r["id"] else 0,),
+                "analyzedAt": lambda r: (r["analyzedAt"] or "",),
+                "studentName": lambda r: (r["studentName"],),
+            }[sort]
+
+        for sort in ("rapportId", "similarity", "analyzedAt", "studentName"):
+            for order in ("asc", "desc"):
+                ids = walk(client, f"sort={sort}&order={order}")
+                assert sorted(ids) == sorted(by_id), f"{sort} {order} : rapports manquants ou en double"
+                keys = [key(sort)(by_id[i]) for i in ids]
+                assert keys == sorted(keys, reverse=order == "desc"), f"{sort} {order} : ordre incorrect"
+        filtered = walk(client, "risk=high,medium&filiere=GI&status=completed&q=Nom1")
+        expected = [r["rapportId"] for r in full if r["riskLevel"] in ("high", "medium") and r["specialty"] == "GI"
+                    and r["status"] == "completed" and any("nom1" in r[k].lower() for k in ("studentName", "studentPrenom", "rapportName"))]
+        assert filtered == expected, "filtres incohérents"
+        pending = walk(client, "status=pending")
+        assert pending == [r["rapportId"] for r in full if r["id"] is None]
+        assert client.get("/api/plagiat/dashboard?limit=5&after=%%%").status_code == 400
+        assert client.get("/api/plagiat/dashboard?sort=cne").status_code == 400
+        print("✅ Pagination, tris et filtres cohérents")
+
+        print(f"\n/dashboard avec {args.reports} rapports ({args.runs} appels)")
+        modes = [
+            ("ancien handler (tableau complet)", legacy_dashboard),
+            ("tableau complet", lambda: get(client, "/api/plagiat/dashboard")),
+            ("ndjson", lambda: get(client, "/api/plagiat/dashboard?format=ndjson")),
+            ("page de 100", lambda: get(client, "/api/plagiat/dashboard?limit=100")),
+            ("page de 100, tri similarité", lambda: get(client, "/api/plagiat/dashboard?limit=100&sort=similarity&order=desc")),
+            ("page de 100, filtres", lambda: get(client, "/api/plagiat/dashboard?limit=100&risk=high&filiere=GE")),
+        ]
+        for label, call in modes:
+            runs = max(2, args.runs // 5) if label.startswith("ancien") else args.runs
+            _, statements, p50, p95 = timed(call, runs)
+            print(f"  {label:<32} {statements:5d} requêtes  p50 {p50:8.1f} ms  p95 {p95:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
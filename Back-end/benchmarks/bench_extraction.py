@@ -0,0 +1,107 @@
+"""
+Extraction du texte d'un rapport de 70 pages (longueur maximale du guide).
+
+Compare :
+- ancien chemin : concaténation page par page (full_text += ...), puis
+  calculate_text_stats et chunk_text_intelligently sur le texte complet ;
+- extraction en flux (extract_document) : statistiques et chunks en un passage ;
+- load_document avec le cache des textes chaud (aucune lecture du PDF).
+
+Vérifie aussi que texte, statistiques et chunks sont identiques.
+
+    python benchmarks/bench_extraction.py [--pages 70] [--runs 3]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["PLAGIAT_CACHE_DIR"] = tempfile.mkdtemp(prefix="bench_extraction_")
+
+import pdfplumber
+
+from app.config import Config
+from app.api.plagiat import text_extraction
+
+
+def make_pdf(path: str, pages: int) -> None:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    random.seed(0)
+    words = ("analyse conception plateforme gestion soutenance étudiant réseau modèle données "
+             "application sécurité architecture évaluation résultats méthode apprentissage "
+             "système base serveur client interface utilisateur performance test").split()
+    c = canvas.Canvas(path, pagesize=A4)
+    for number in range(pages):
+        y = 800
+        c.setFont("Helvetica-Bold", 13)
+        c.drawString(50, y, f"Chapitre {number // 10 + 1} - Section {number + 1}")
+        c.setFont("Helvetica", 10)
+        y -= 24
+        while y > 60:
+            sentence = " ".join(random.choices(words, k=random.randint(8, 14))).capitalize() + "."
+            c.drawString(50, y, sentence)
+            y -= 14 if random.random() > 0.2 else 24
+        c.showPage()
+    c.save()
+
+
+def legacy(path: str):
+    full_text = ""
+    with pdfplumber.open(path) as pdf:
+        for page in pdf.pages:
+            page_text = page.extract_text()
+            if page_text:
+                full_text += page_text + "\n"
+    text = full_text.strip()
+    return text, text_extraction.calculate_text_stats(text), text_extraction.chunk_text_intelligently(text)
+
+
+def measure(fn, runs: int):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=70)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    # Comparaison avec l'ancien chemin : même moteur, pages en série
+    Config.PLAGIAT_PDF_BACKENDS = ["pdfplumber"]
+    Config.PLAGIAT_PDF_WORKERS = 1
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "rapport.pdf")
+        make_pdf(path, args.pages)
+        print(f"rapport : {args.pages} pages, {os.path.getsize(path) / 1024:.0f} Ko")
+
+        (text, stats, chunks), legacy_time = measure(lambda: legacy(path), args.runs)
+        document, stream_time = measure(
+            lambda: text_extraction.extract_document(path), args.runs
+        )
+        assert document.text == text, "texte différent"
+        assert document.stats == stats, "statistiques différentes"
+        assert document.chunks == chunks, "chunks différents"
+
+        text_extraction.load_document(path)  # remplit le cache
+        cached, cached_time = measure(lambda: text_extraction.load_document(path), args.runs)
+        assert cached.chunks == chunks
+
+        print(f"ancien chemin      : {legacy_time * 1000:8.1f} ms")
+        print(f"extraction en flux : {stream_time * 1000:8.1f} ms")
+        print(f"cache chaud        : {cached_time * 1000:8.1f} ms")
+        print(f"{stats['total_words']} mots, {len(chunks)} chunks, pages des chunks : {document.chunk_pages}")
+
+
+if __name__ == "__main__":
+    main()
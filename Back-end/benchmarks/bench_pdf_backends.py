@@ -0,0 +1,69 @@
+"""
+Moteurs d'extraction PDF sur un rapport de 70 pages.
+
+Pour chaque moteur installé : durée de lecture page par page, puis en
+parallèle (pool de processus), nombre de mots par rapport à pdfplumber, et
+vérification que la lecture parallèle rend les mêmes pages dans le même
+ordre que la lecture en série.
+
+    python benchmarks/bench_pdf_backends.py [--pages 70] [--workers 4]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["PLAGIAT_CACHE_DIR"] = tempfile.mkdtemp(prefix="bench_pdf_backends_")
+
+from app.config import Config
+from app.api.plagiat import pdf_backends
+from benchmarks.bench_extraction import make_pdf
+
+
+def read_all(path: str, name: str, workers: int):
+    Config.PLAGIAT_PDF_WORKERS = workers
+    start = time.perf_counter()
+    pages = list(pdf_backends.iter_pdf_pages(path, [name]))
+    return pages, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=70)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    Config.PLAGIAT_PDF_PARALLEL_MIN_PAGES = 1
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "rapport.pdf")
+        make_pdf(path, args.pages)
+        print(f"rapport : {args.pages} pages, {os.cpu_count()} cœurs logiques")
+
+        reference_words = None
+        for name in pdf_backends.PDF_BACKENDS:
+            try:
+                pdf_backends.PDF_BACKENDS[name](path).close()
+            except ImportError:
+                print(f"{name:<11}: non installé")
+                continue
+
+            serial, serial_time = read_all(path, name, 1)
+            # Premier passage : démarrage des processus, non mesuré
+            read_all(path, name, args.workers)
+            parallel, parallel_time = read_all(path, name, args.workers)
+            assert parallel == serial, f"{name} : lecture parallèle différente"
+
+            words = sum(len(text.split()) for _, text in serial)
+            # pdfplumber, premier de la liste, sert de référence
+            reference_words = reference_words or words
+            print(f"{name:<11}: série {serial_time * 1000:8.1f} ms, "
+                  f"{args.workers} processus {parallel_time * 1000:8.1f} ms, "
+                  f"{words} mots ({100 * words / reference_words:.1f} % de pdfplumber)")
+
+        pdf_backends.shutdown_page_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Temps base de données par rapport à l'enregistrement d'une analyse.
+
+Résultat synthétique de 25 chunks x 5 sources (125 correspondances), écrit :
+- par l'ancien chemin : un objet PlagiatMatch par correspondance, flush tous
+  les 10, mise à jour de l'analyse, comptage des correspondances, commit ;
+- par persist_analysis : suppression, insertion groupée et mise à jour
+  de l'analyse dans une transaction.
+
+Deux scénarios : première analyse, puis réanalyse où 20 chunks sur 25 sont
+inchangés. Compte aussi les requêtes SQL envoyées. Par défaut sur SQLite ;
+--database-url mysql+mysqlconnector://... pour mesurer sur le serveur réel
+(tables créées si besoin, lignes du benchmark supprimées à la fin).
+
+    python benchmarks/bench_persistence.py [--reports 50]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import BigInteger, event
+from sqlalchemy.ext.compiler import compiles
+
+from app.models import db, User, Rapport, PlagiatAnalysis, PlagiatMatch
+from app.api.plagiat.persistence import persist_analysis, apply_result
+
+CHUNKS = 25
+SOURCES_PER_CHUNK = 5
+
+
+@compiles(BigInteger, "sqlite")
+def _sqlite_big_integer(type_, compiler, **kw):
+    # Clés auto-incrémentées sous SQLite
+    return "INTEGER"
+
+
+def make_result(seed: int, reused: int = 0):
+    random.seed(seed)
+    chunk_hashes = [f"{seed:08d}{i:032d}" for i in range(CHUNKS)]
+    changed = range(reused, CHUNKS)
+    sources = [
+        {
+            'text': "Texte du rapport " * 20,
+            'source_url': f"https://example.org/{i}/{k}",
+            'similarity': round(random.uniform(6, 90), 2),
+            'score': random.random(),
+            'source': "Semantic Scholar",
+            'matched_text': "Texte correspondant " * 20,
+            'original_text': "Texte original " * 20,
+            'page': i // 3 + 1,
+            'chunk_index': i,
+            'chunk_hash': chunk_hashes[i],
+        }
+        for i in changed for k in range(SOURCES_PER_CHUNK)
+    ]
+    from app.api.plagiat.plagiat_analysis import summarize_matches
+
+    return summarize_matches({
+        "sources": sources,
+        "ai_score": 10,
+        "chunk_hashes": chunk_hashes,
+        "chunk_pages": [i // 3 + 1 for i in range(CHUNKS)],
+        "reused_chunk_hashes": chunk_hashes[:reused],
+        "chunks_analyzed": CHUNKS,
+        "file_hash": f"{seed:064d}",
+    })
+
+
+def legacy_persist(analysis, result):
+    # Chemin précédent : correspondances une à une, puis comptage et commit
+    kept = set(result.get("reused_chunk_hashes") or [])
+    for match in PlagiatMatch.query.filter_by(analysis_id=analysis.id).all():
+        if match.chunk_hash not in kept:
+            db.session.delete(match)
+    db.session.flush()
+
+    saved = 0
+    for match_data in result["sources"]:
+        db.session.add(PlagiatMatch(
+            analysis_id=analysis.id,
+            text=match_data['text'][:1000],
+            source_url=match_data['source_url'][:500],
+            source=match_data['source'][:100],
+            score=match_data['score'],
+            similarity=match_data['similarity'],
+            matched_text=match_data['matched_text'][:1000],
+            original_text=match_data['original_text'][:1000],
+            page=match_data['page'],
+            chunk_index=match_data['chunk_index'],
+            chunk_hash=match_data['chunk_hash']
+        ))
+        saved += 1
+        if saved % 10 == 0:
+            db.session.flush()
+    db.session.flush()
+    apply_result(analysis, result)
+    PlagiatMatch.query.filter_by(analysis_id=analysis.id).count()
+    db.session.commit()
+
+
+def run(name, persist, analyses, reused, counter):
+    timings, statements = [], 0
+    for analysis in analyses:
+        result = make_result(analysis.rapport_id, reused)
+        counter["n"] = 0
+        start = time.perf_counter()
+        persist(analysis, result)
+        timings.append(time.perf_counter() - start)
+        statements += counter["n"]
+    timings.sort()
+    print(f"{name:<28}: médiane {timings[len(timings) // 2] * 1000:7.2f} ms, "
+          f"moyenne {sum(timings) / len(timings) * 1000:7.2f} ms, "
+          f"{statements / len(analyses):5.1f} requêtes / rapport")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reports", type=int, default=50)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="bench_persistence_")
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = args.database_url or f"sqlite:///{directory}/bench.db"
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        counter = {"n": 0}
+        event.listen(db.engine, "before_cursor_execute", lambda *a, **k: counter.__setitem__("n", counter["n"] + 1))
+
+        student = User(name="Bench", prenom="Bench", email=f"bench{time.time()}@example.org",
+                       password_hash="x", role="student")
+        db.session.add(student)
+        db.session.flush()
+        groups = {}
+        for label in ("legacy", "bulk"):
+            groups[label] = []
+            for i in range(args.reports):
+                rapport = Rapport(auteur_id=student.id, filename=f"{label}_{i}.pdf", storage_path="bench")
+                db.session.add(rapport)
+                db.session.flush()
+                analysis = PlagiatAnalysis(rapport_id=rapport.id, status="processing")
+                db.session.add(analysis)
+                groups[label].append(analysis)
+        db.session.commit()
+
+        print(f"{args.reports} rapports, {CHUNKS} chunks x {SOURCES_PER_CHUNK} sources, "
+              f"{db.engine.dialect.name}")
+        for reused, title in ((0, "première analyse"), (20, "réanalyse, 20/25 chunks inchangés")):
+            print(f"-- {title}")
+            run("ancien chemin", legacy_persist, groups["legacy"], reused, counter)
+            run("persist_analysis", persist_analysis, groups["bulk"], reused, counter)
+
+        for analyses in groups.values():
+            for analysis in analyses:
+                PlagiatMatch.query.filter_by(analysis_id=analysis.id).delete()
+                rapport = db.session.get(Rapport, analysis.rapport_id)
+                db.session.delete(analysis)
+                db.session.delete(rapport)
+        db.session.delete(student)
+        db.session.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Accélération de l'analyse par lots avec le pool de processus.
+
+Génère N rapports texte synthétiques, mesure l'analyse séquentielle
+(compute_rapport_result dans le processus courant), puis la même charge
+répartie sur des pools de 1, 2, 4... processus jusqu'au nombre de cœurs
+physiques. Les sources externes sont désactivées : on mesure le calcul
+local (extraction, embeddings, perplexité, index interne).
+
+    python benchmarks/bench_process_pool.py [--reports 32] [--words 3000]
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+
+# Avant l'import de la config, dans ce processus et dans les fils (spawn)
+os.environ["PLAGIAT_SOURCE_PROVIDERS"] = ""
+os.environ.pop("PLAGIAT_MODEL_SERVER_ADDRESS", None)
+# Index interne et caches isolés : les rapports synthétiques n'y restent pas
+os.environ["PLAGIAT_CACHE_DIR"] = tempfile.mkdtemp(prefix="bench_plagiat_")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import Config
+from app.api.plagiat import process_pool
+
+
+def make_reports(directory: str, count: int, words: int):
+    random.seed(0)
+    vocabulary = open(os.path.join(os.path.dirname(__file__), "..", "requirements.txt")).read().split()
+    vocabulary += ("analyse conception plateforme gestion soutenance étudiant réseau modèle données "
+                   "application sécurité architecture évaluation résultats méthode").split()
+    payloads = []
+    for i in range(count):
+        path = os.path.join(directory, f"rapport_{i}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            for _ in range(words // 80):
+                f.write(" ".join(random.choices(vocabulary, k=80)) + ".\n")
+        payloads.append((100000 + i, path, "Bench", f"rapport_{i}.txt"))
+    return payloads
+
+
+def run_sequential(payloads):
+    from app.api.plagiat.plagiat_analysis import compute_rapport_result, detector
+
+    detector.warmup()
+    start = time.perf_counter()
+    for payload in payloads:
+        asyncio.run(compute_rapport_result(*payload))
+    return time.perf_counter() - start
+
+
+def run_pool(payloads, workers):
+    Config.PLAGIAT_PROCESS_WORKERS = workers
+    pool = process_pool.get_pool()
+    # Démarrage et chargement des modèles hors mesure
+    list(pool.map(int, range(workers * 4)))
+    for future in [process_pool.submit_rapport(*payloads[0]) for _ in range(workers)]:
+        future.result()
+
+    start = time.perf_counter()
+    errors = sum(1 for _, result in process_pool.analyze_rapports_parallel(payloads) if result.get("error"))
+    elapsed = time.perf_counter() - start
+    process_pool.shutdown_pool()
+    return elapsed, errors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reports", type=int, default=32)
+    parser.add_argument("--words", type=int, default=3000)
+    parser.add_argument("--max-workers", type=int, default=0)
+    args = parser.parse_args()
+
+    cores = args.max_workers or process_pool.physical_cores()
+    with tempfile.TemporaryDirectory() as directory:
+        payloads = make_reports(directory, args.reports, args.words)
+
+        Config.PLAGIAT_TORCH_THREADS = 1
+        baseline = run_sequential(payloads)
+        print(f"cœurs physiques : {process_pool.physical_cores()}")
+        print(f"séquentiel (1 thread torch) : {baseline:.1f}s, {args.reports / baseline:.2f} rapports/s")
+
+        workers = 1
+        while workers <= cores:
+            elapsed, errors = run_pool(payloads, workers)
+            print(f"pool {workers:>2} processus : {elapsed:6.1f}s, "
+                  f"{args.reports / elapsed:.2f} rapports/s, accélération x{baseline / elapsed:.2f}"
+                  + (f", {errors} erreurs" if errors else ""))
+            workers *= 2
+
+
+if __name__ == "__main__":
+    main()
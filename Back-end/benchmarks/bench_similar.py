@@ -0,0 +1,189 @@
+"""
+Mesure /api/plagiat/similar/<rapport_id> sur un magasin d'embeddings synthétique.
+
+Remplit le magasin (float16) avec N rapports de 80 à 250 chunks : vecteurs
+construits à partir d'un thème de filière, d'un thème propre au rapport et
+de bruit, de sorte que deux rapports d'une même filière soient proches sans
+être copiés. Pour une partie des rapports, un autre rapport de la même
+filière reprend une part de leurs chunks (bloc contigu ou chunks épars, avec
+un léger bruit). Vérifie que la copie est retrouvée dans le top-k, puis
+affiche taille du magasin, p50 / p95 de la recherche seule et de l'endpoint
+(base SQLite : étudiants et rapports).
+
+    python benchmarks/bench_similar.py [--reports 3000] [--queries 60] [--runs 30]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+os.environ["PLAGIAT_SOURCE_PROVIDERS"] = ""
+os.environ["PLAGIAT_CACHE_DIR"] = tempfile.mkdtemp(prefix="bench_similar_")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from flask import Flask
+from sqlalchemy import BigInteger, event, insert
+from sqlalchemy.ext.compiler import compiles
+
+from app.config import Config
+from app.models import db, User, Student, Rapport
+from app.api.plagiat.plagiat_analysis import plagiat_analysis_bp, detector
+
+FILIERES = ["GI", "GE", "GM", "GC", "IDSD"]
+DIM = 384
+
+
+@compiles(BigInteger, "sqlite")
+def _sqlite_big_integer(type_, compiler, **kw):
+    return "INTEGER"
+
+
+def unit(rng: np.random.Generator, *shape) -> np.ndarray:
+    v = rng.standard_normal(shape + (DIM,)).astype(np.float32)
+    return v / np.linalg.norm(v, axis=-1, keepdims=True)
+
+
+def normalize(v: np.ndarray) -> np.ndarray:
+    return v / np.linalg.norm(v, axis=-1, keepdims=True)
+
+
+def percentiles(durations):
+    durations = sorted(durations)
+    return durations[len(durations) // 2] * 1000, durations[int(0.95 * (len(durations) - 1))] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reports", type=int, default=3000)
+    parser.add_argument("--queries", type=int, default=60)
+    parser.add_argument("--runs", type=int, default=30)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    rnd = random.Random(0)
+    store = detector.report_vectors
+    topics = unit(rng, len(FILIERES))
+    filiere_of = {rid: rnd.randrange(len(FILIERES)) for rid in range(1, args.reports + 1)}
+    by_filiere = {}
+    for rid, f in filiere_of.items():
+        by_filiere.setdefault(f, []).append(rid)
+
+    # Copies : rapport copié -> (rapport qui copie, part reprise, bloc contigu ?)
+    copied = rnd.sample(range(1, args.reports + 1), args.queries)
+    plans, copiers = {}, set()
+    for n, rid in enumerate(copied):
+        choices = [c for c in by_filiere[filiere_of[rid]] if c not in copied and c not in copiers]
+        copier = rnd.choice(choices)
+        copiers.add(copier)
+        plans[copier] = (rid, (0.05, 0.1, 0.2)[n % 3], n % 2 == 0)
+
+    # Les rapports copiés sont générés d'abord : leurs chunks servent aux copies
+    start = time.perf_counter()
+    generated, total_chunks = {}, 0
+    for rid in copied + [r for r in filiere_of if r not in copied]:
+        n = rnd.randint(80, 250)
+        vectors = normalize(0.6 * topics[filiere_of[rid]] + 0.5 * unit(rng) + 0.6 * unit(rng, n))
+        if rid in plans:
+            source_id, share, contiguous = plans[rid]
+            source = generated[source_id]
+            k = max(1, int(share * len(source)))
+            if contiguous:
+                a = rnd.randrange(0, len(source) - k + 1)
+                picked = list(range(a, a + k))
+            else:
+                picked = rnd.sample(range(len(source)), k)
+            positions = rnd.sample(range(n), min(k, n))
+            vectors[positions] = normalize(source[picked[:len(positions)]] + 0.25 * unit(rng, len(positions)))
+            plans[rid] = (source_id, share, contiguous, len(positions))
+        if rid in copied:
+            generated[rid] = vectors
+        store.put(rid, vectors, [1 + i // 4 for i in range(n)])
+        total_chunks += n
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(os.path.join(Config.PLAGIAT_CACHE_DIR, "report_vectors.sqlite3"))
+    print(f"Magasin : {args.reports} rapports, {total_chunks} chunks, {size / 1e6:.0f} Mo "
+          f"(float32 : {total_chunks * DIM * 4 / 1e6:.0f} Mo), écrit en {elapsed:.1f} s")
+
+    start = time.perf_counter()
+    store.similar(copied[0], top_k=1)
+    print(f"Premier chargement de la matrice des sections : {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    found, first, durations = {}, 0, []
+    for copier, (source_id, share, contiguous, k) in plans.items():
+        cohort = by_filiere[filiere_of[source_id]]
+        start = time.perf_counter()
+        results = store.similar(source_id, cohort, top_k=Config.PLAGIAT_SIMILAR_TOP_K,
+                                shortlist=Config.PLAGIAT_SIMILAR_SHORTLIST,
+                                threshold=Config.PLAGIAT_SIMILAR_CHUNK_COSINE)
+        durations.append(time.perf_counter() - start)
+        ids = [r["rapport_id"] for r in results]
+        key = (share, "bloc" if contiguous else "épars")
+        found.setdefault(key, []).append(copier in ids)
+        if ids and ids[0] == copier:
+            first += 1
+            assert results[0]["shared_chunks"] >= 0.8 * k, (results[0], k)
+    for (share, kind), hits in sorted(found.items()):
+        print(f"  copie de {share:.0%} ({kind}) : retrouvée {sum(hits)}/{len(hits)}")
+    print(f"Copie classée première : {first}/{len(plans)}")
+    p50, p95 = percentiles(durations)
+    print(f"Recherche dans la filière (~{args.reports // len(FILIERES)} rapports) : p50 {p50:.1f} ms, p95 {p95:.1f} ms")
+
+    durations = []
+    for source_id in copied[:args.runs]:
+        start = time.perf_counter()
+        store.similar(source_id, None, top_k=Config.PLAGIAT_SIMILAR_TOP_K,
+                      shortlist=Config.PLAGIAT_SIMILAR_SHORTLIST)
+        durations.append(time.perf_counter() - start)
+    p50, p95 = percentiles(durations)
+    print(f"Recherche sur tous les rapports : p50 {p50:.1f} ms, p95 {p95:.1f} ms")
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tempfile.mkdtemp()}/similar.db"
+    db.init_app(app)
+    app.register_blueprint(plagiat_analysis_bp)
+    with app.app_context():
+        db.create_all()
+        db.session.execute(insert(User), [
+            {"id": rid, "name": f"Nom{rid}", "prenom": "P", "email": f"e{rid}@example.org",
+             "password_hash": "x", "role": "student"} for rid in filiere_of])
+        db.session.execute(insert(Student), [
+            {"user_id": rid, "cin": f"C{rid}", "cne": f"N{rid}", "filiere": FILIERES[f]}
+            for rid, f in filiere_of.items()])
+        db.session.execute(insert(Rapport), [
+            {"id": rid, "auteur_id": rid, "filename": f"rapport{rid}.pdf", "storage_path": "x"}
+            for rid in filiere_of])
+        db.session.execute(db.text("CREATE INDEX idx_students_filiere ON students (filiere)"))
+        db.session.commit()
+
+        client = app.test_client()
+        copier, (source_id, _, _, _) = next(iter(plans.items()))
+        data = client.get(f"/api/plagiat/similar/{source_id}").get_json()
+        assert data["filiere"] == [FILIERES[filiere_of[source_id]]]
+        assert all(r["filiere"] == data["filiere"][0] for r in data["results"])
+        assert data["results"][0]["rapport_id"] == copier, data["results"][0]
+        assert client.get("/api/plagiat/similar/999999").status_code == 404
+
+        statements = {"n": 0}
+
+        def before(*a, **k):
+            statements["n"] += 1
+
+        event.listen(db.engine, "before_cursor_execute", before)
+        durations = []
+        for source_id in copied[:args.runs]:
+            db.session.remove()
+            start = time.perf_counter()
+            response = client.get(f"/api/plagiat/similar/{source_id}")
+            durations.append(time.perf_counter() - start)
+            assert response.status_code == 200
+        event.remove(db.engine, "before_cursor_execute", before)
+        p50, p95 = percentiles(durations)
+        print(f"/api/plagiat/similar/<id> (filière de l'auteur) : {statements['n'] // len(durations)} requêtes SQL, "
+              f"p50 {p50:.1f} ms, p95 {p95:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Latence par chunk des recherches externes contre de faux serveurs locaux
+(benchmarks/stub_sources.py) avec délai injecté.
+
+Un faux serveur par fournisseur, chacun limité au débit configuré pour le
+vrai hôte (Config.PLAGIAT_SOURCE_RATE_LIMITS : Semantic Scholar 1 req/s,
+CrossRef 10 req/s), comme en production.
+
+Compare :
+- séquentiel : Semantic Scholar puis CrossRef (ancien comportement) ;
+- concurrent : fetch_web_candidates (les deux sources en parallèle).
+
+Mesure aussi le retard maximal de la boucle d'événements pendant
+check_web_source, le scoring étant exécuté hors de la boucle, puis une
+charge de --reports rapports de --lookups recherches simultanés : délais
+dépassés, chunks sans résultat CrossRef et latence CrossRef (un hôte lent
+ne doit pas retarder les autres).
+
+    python benchmarks/bench_sources_latency.py [--delay 0.2] [--chunks 20] [--reports 2] [--lookups 25]
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiohttp import web
+
+from app.config import Config
+from benchmarks.stub_sources import build_app
+
+
+async def loop_lag_probe(stop: asyncio.Event, lags: list, interval: float = 0.005):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[int(q * (len(values) - 1))] if values else 0.0
+
+
+async def run(args):
+    # Un serveur par fournisseur : le débit est limité par hôte
+    runners, rate_limits = [], {}
+    for offset, (name, attr) in enumerate((("semantic_scholar", "PLAGIAT_SEMANTIC_SCHOLAR_URL"),
+                                           ("crossref", "PLAGIAT_CROSSREF_URL"))):
+        runner = web.AppRunner(build_app(delay=args.delay))
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", args.port + offset).start()
+        runners.append(runner)
+
+        real_host = urlsplit(getattr(Config, attr)).netloc
+        rate_limits[f"127.0.0.1:{args.port + offset}"] = Config.PLAGIAT_SOURCE_RATE_LIMITS.get(
+            real_host, Config.PLAGIAT_SOURCE_DEFAULT_RATE)
+        setattr(Config, attr, f"http://127.0.0.1:{args.port + offset}/{name}")
+    Config.PLAGIAT_SOURCE_RATE_LIMITS = rate_limits
+    Config.PLAGIAT_MODEL_SERVER_ADDRESS = None
+
+    from app.api.plagiat.plagiarism_detector import PlagiarismDetector
+
+    Config.PLAGIAT_SOURCE_PROVIDERS = ["semantic_scholar", "crossref"]
+    detector = PlagiarismDetector(use_model_server=False)
+    detector.sources.cache = None
+    chunks = [
+        f"chunk {i} : conception d'une plateforme de gestion des soutenances et détection de plagiat"
+        for i in range(args.chunks)
+    ]
+
+    async def sequential(chunk):
+        candidates = []
+        for provider in detector.providers:
+            candidates += await provider.search(chunk)
+        return candidates
+
+    timings = {}
+    for name, fn in (("sequentiel", sequential), ("concurrent", detector.fetch_web_candidates)):
+        latencies = []
+        for chunk in chunks:
+            start = time.perf_counter()
+            await fn(chunk)
+            latencies.append(time.perf_counter() - start)
+        timings[name] = latencies
+
+    # Chargement des modèles hors mesure
+    await asyncio.get_running_loop().run_in_executor(None, detector.warmup)
+
+    stop, lags = asyncio.Event(), []
+    probe = asyncio.create_task(loop_lag_probe(stop, lags))
+    start = time.perf_counter()
+    await asyncio.gather(*[detector.check_web_source(c, chunk_index=i) for i, c in enumerate(chunks)])
+    batch_seconds = time.perf_counter() - start
+    stop.set()
+    await probe
+
+    # Charge : plusieurs rapports analysés en même temps
+    crossref = next(p for p in detector.providers if p.name == "crossref")
+    search = crossref.search
+    crossref_latencies = []
+
+    async def timed_search(query):
+        start = time.perf_counter()
+        try:
+            return await search(query)
+        finally:
+            crossref_latencies.append(time.perf_counter() - start)
+
+    crossref.search = timed_search
+    timeouts_before = detector.stats["provider_timeouts"]
+    lookups = [
+        f"rapport {r} chunk {i} : plateforme de gestion des soutenances, détection de plagiat et évaluation"
+        for r in range(args.reports) for i in range(args.lookups)
+    ]
+    start = time.perf_counter()
+    results = await asyncio.gather(*[detector.fetch_web_candidates(q) for q in lookups])
+    load_seconds = time.perf_counter() - start
+    without_crossref = sum(
+        not any(c.get("source") == "CrossRef" for c in candidates) for candidates in results
+    )
+    without_semantic = sum(
+        not any(c.get("source") == "Semantic Scholar" for c in candidates) for candidates in results
+    )
+
+    for runner in runners:
+        await runner.cleanup()
+    detector.sources.close()
+
+    print(f"délai injecté : {args.delay * 1000:.0f} ms par requête, {args.chunks} chunks, "
+          f"débits : {rate_limits}")
+    for name, latencies in timings.items():
+        print(f"  {name:<11} médiane {statistics.median(latencies) * 1000:7.1f} ms / chunk, "
+              f"max {max(latencies) * 1000:7.1f} ms")
+    print(f"  check_web_source x{args.chunks} en parallèle : {batch_seconds * 1000:.0f} ms, "
+          f"retard max de la boucle {max(lags or [0]) * 1000:.1f} ms")
+    print(f"  charge {args.reports} rapports x {args.lookups} recherches : {load_seconds:.1f} s, "
+          f"{detector.stats['provider_timeouts'] - timeouts_before} délais dépassés, "
+          f"sans CrossRef {without_crossref}/{len(lookups)}, sans Semantic Scholar {without_semantic}/{len(lookups)}, "
+          f"CrossRef p50 {percentile(crossref_latencies, 0.5) * 1000:.0f} ms "
+          f"p95 {percentile(crossref_latencies, 0.95) * 1000:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--delay", type=float, default=0.2)
+    parser.add_argument("--chunks", type=int, default=20)
+    parser.add_argument("--reports", type=int, default=2)
+    parser.add_argument("--lookups", type=int, default=25)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Mesure le temps de démarrage de l'application (équivalent de run.py) dans un
+processus neuf, ainsi que la mémoire résidente après create_app().
+
+    python benchmarks/bench_startup.py [--target 3.0]
+
+Le code de sortie est non nul si la cible est dépassée : les modèles de
+détection ne doivent plus être chargés au démarrage (voir `flask plagiat warmup`).
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, resource, sys, time
+start = time.perf_counter()
+from app import create_app
+app = create_app()
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "seconds": elapsed,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "torch_imported": "torch" in sys.modules,
+}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--target", type=float, default=3.0, help="secondes")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    runs = []
+    for _ in range(args.runs):
+        out = subprocess.run(
+            [sys.executable, "-c", CHILD],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip().splitlines()[-1]
+        runs.append(json.loads(out))
+
+    best = min(r["seconds"] for r in runs)
+    print(f"create_app() : meilleur {best:.2f}s sur {args.runs} essais (cible {args.target:.1f}s)")
+    print(f"RSS max : {max(r['max_rss_mb'] for r in runs):.0f} Mo")
+    print(f"torch importé au démarrage : {any(r['torch_imported'] for r in runs)}")
+
+    sys.exit(0 if best <= args.target else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Micro-benchmark : similarité lexicale d'un chunk contre N candidats.
+
+Avant : un TfidfVectorizer(1-3 grammes, 5000 features) ré-ajusté par paire.
+Après : IncrementalTfidf (corpus, vocabulaire haché) + produits creux.
+
+    python benchmarks/bench_tfidf.py [--chunks 25] [--candidates 10]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from app.api.plagiat.lexical_model import IncrementalTfidf
+
+WORDS = (
+    "analyse donnees systeme application gestion projet methode resultat "
+    "modele reseau apprentissage algorithme performance utilisateur base "
+    "architecture service plateforme securite evaluation conception stage "
+    "learning network model data system design evaluation deep method"
+).split()
+
+
+def random_text(n_words: int) -> str:
+    return " ".join(random.choices(WORDS, k=n_words))
+
+
+def per_pair(chunks, candidates):
+    vectorizer = TfidfVectorizer(ngram_range=(1, 3), max_features=5000, stop_words="english")
+    for chunk, group in zip(chunks, candidates):
+        for text in group:
+            tfidf = vectorizer.fit_transform([chunk, text])
+            (tfidf[0] @ tfidf[1].T).toarray()[0][0]
+
+
+def corpus_level(model, chunks, candidates):
+    for chunk, group in zip(chunks, candidates):
+        matrix = model.transform([chunk] + group)
+        (matrix[1:] @ matrix[0].T).toarray().ravel()
+
+
+def corpus_batched(model, chunks, candidates):
+    # Chemin utilisé par calculate_similarity_many : une transformation pour
+    # tous les textes, puis le produit ligne à ligne de toutes les paires.
+    texts = chunks + [t for group in candidates for t in group]
+    matrix = model.transform(texts)
+    q_idx = [qi for qi, group in enumerate(candidates) for _ in group]
+    c_idx = list(range(len(chunks), len(texts)))
+    matrix[q_idx].multiply(matrix[c_idx]).sum(axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=25)
+    parser.add_argument("--candidates", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    random.seed(0)
+    chunks = [random_text(120) for _ in range(args.chunks)]
+    candidates = [[random_text(150) for _ in range(args.candidates)] for _ in chunks]
+    pairs = args.chunks * args.candidates
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model = IncrementalTfidf(os.path.join(tmp, "tfidf.sqlite3"))
+        start = time.perf_counter()
+        model.partial_fit([random_text(120) for _ in range(2000)])
+        fit_time = time.perf_counter() - start
+
+        timings = {}
+        for name, fn in (("per_pair_fit", lambda: per_pair(chunks, candidates)),
+                         ("corpus_sparse", lambda: corpus_level(model, chunks, candidates)),
+                         ("corpus_batched", lambda: corpus_batched(model, chunks, candidates))):
+            best = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                fn()
+                best = min(best, time.perf_counter() - start)
+            timings[name] = best
+
+    print(f"{pairs} paires ({args.chunks} chunks x {args.candidates} candidats)")
+    print(f"  ajustement incrémental du corpus (2000 chunks) : {fit_time * 1000:.1f} ms")
+    for name, total in timings.items():
+        print(f"  {name:<14} {total * 1000:8.1f} ms au total, {total / pairs * 1e6:8.1f} µs / paire")
+    for name in ("corpus_sparse", "corpus_batched"):
+        print(f"  accélération {name} : x{timings['per_pair_fit'] / timings[name]:.1f}")
+
+
+if __name__ == "__main__":
+    main()
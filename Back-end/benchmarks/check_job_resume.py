@@ -0,0 +1,249 @@
+"""
+Vérifie l'annulation, la reprise et la récupération des jobs d'analyse.
+
+Sur une base SQLite et la file locale (un worker) :
+- annulation pendant l'analyse de N rapports : les rapports terminés sont
+  conservés, les autres passent à cancelled, aucune analyse ne reste
+  "processing" et le flux d'événements se ferme sur l'état cancelled ;
+- reprise : seuls les rapports non terminés sont analysés ;
+- bail renouvelé par un thread pendant une étape longue sans événement
+  (rien n'est récupéré), annulation vue depuis un autre processus
+  (cancelled_at relu au renouvellement) ;
+- récupération des lignes au bail expiré : analyses "processing" rétablies
+  ou supprimées, éléments "running" remis en file et terminés ; balayage
+  mesuré sur --stale éléments et analyses périmés.
+
+    python benchmarks/check_job_resume.py [--reports 8] [--stale 2000]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+os.environ["PLAGIAT_SOURCE_PROVIDERS"] = ""
+os.environ["PLAGIAT_CACHE_DIR"] = tempfile.mkdtemp(prefix="check_resume_")
+os.environ["PLAGIAT_JOB_BACKEND"] = "local"
+os.environ["PLAGIAT_JOB_WORKERS"] = "1"
+# Modèles absents du cache : pas de tentative de téléchargement
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import BigInteger, insert
+from sqlalchemy.ext.compiler import compiles
+
+from app.config import Config
+from app.models import db, User, Rapport, PlagiatAnalysis, PlagiatJob, PlagiatJobItem
+from app.api.plagiat import jobs
+from app.api.plagiat.plagiat_analysis import plagiat_analysis_bp
+from app.api.plagiat.text_extraction import ROOT_DIR
+
+
+@compiles(BigInteger, "sqlite")
+def _sqlite_big_integer(type_, compiler, **kw):
+    return "INTEGER"
+
+
+def parse_events(chunks):
+    events = []
+    for chunk in chunks:
+        text = chunk.decode("utf-8") if isinstance(chunk, bytes) else chunk
+        for block in text.split("\n\n"):
+            fields = dict(line.partition(": ")[::2] for line in block.split("\n") if line and not line.startswith(":"))
+            if "event" in fields:
+                events.append({"event": fields["event"], "data": json.loads(fields["data"])})
+    return events
+
+
+def wait_job(client, job_id, timeout=300):
+    started = time.time()
+    while time.time() - started < timeout:
+        status = client.get(f"/api/plagiat/jobs/{job_id}").get_json()
+        if status["status"] in ("completed", "cancelled"):
+            return status
+        time.sleep(0.2)
+    raise AssertionError(f"job {job_id} toujours en cours : {status}")
+
+
+def item_statuses(job_id):
+    return {item.rapport_id: item.status for item in PlagiatJobItem.query.filter_by(job_id=job_id)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reports", type=int, default=8)
+    parser.add_argument("--stale", type=int, default=2000)
+    args = parser.parse_args()
+
+    upload_dir = os.path.join(ROOT_DIR, "uploads", "tmp_check_resume")
+    os.makedirs(upload_dir, exist_ok=True)
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tempfile.mkdtemp()}/resume.db"
+    db.init_app(app)
+    app.register_blueprint(plagiat_analysis_bp)
+    try:
+        with app.app_context():
+            db.create_all()
+            db.session.add(User(id=1, name="Nom", prenom="Prenom", email="e@example.org",
+                                password_hash="x", role="student"))
+            for i in range(1, args.reports + 1):
+                with open(os.path.join(upload_dir, f"r{i}.txt"), "w", encoding="utf-8") as f:
+                    f.write("\n".join(
+                        f"Paragraphe {p} du rapport {i} : conception et réalisation d'une plateforme "
+                        f"de gestion des soutenances, module {p * i}, tests et déploiement." for p in range(150)))
+                db.session.add(Rapport(id=i, auteur_id=1, filename=f"r{i}.txt",
+                                       storage_path=f"uploads/tmp_check_resume/r{i}.txt"))
+            db.session.commit()
+
+        client = app.test_client()
+        ids = list(range(1, args.reports + 1))
+
+        # 1. Annulation après le deuxième rapport terminé
+        job_id = client.post("/api/plagiat/analyze_selected", json={"rapport_ids": ids}).get_json()["job_id"]
+        stream = client.get(f"/api/plagiat/jobs/{job_id}/events", buffered=False)
+        finished, chunks, cancelling = 0, [], None
+        for chunk in stream.response:
+            chunks.append(chunk)
+            finished += sum(e["event"] == "report_finished" for e in parse_events([chunk]))
+            if finished >= 2 and cancelling is None:
+                cancelling = client.post(f"/api/plagiat/jobs/{job_id}/cancel").get_json()
+                assert cancelling["status"] in ("cancelling", "cancelled"), cancelling
+        last = parse_events(chunks)[-1]
+        assert last["event"] == "job_finished" and last["data"]["job"]["status"] == "cancelled", last
+
+        status = wait_job(client, job_id)
+        with app.app_context():
+            statuses = item_statuses(job_id)
+            done = [r for r, s in statuses.items() if s == "completed"]
+            cancelled = [r for r, s in statuses.items() if s == "cancelled"]
+            assert len(done) >= 2 and cancelled and len(done) + len(cancelled) == args.reports, statuses
+            assert not PlagiatAnalysis.query.filter_by(status="processing").count()
+            # Rapport interrompu en cours d'analyse : pas d'analyse à moitié écrite
+            assert not PlagiatAnalysis.query.filter(PlagiatAnalysis.rapport_id.in_(cancelled)).count()
+            analyzed_at = {a.rapport_id: a.analyzed_at for a in PlagiatAnalysis.query}
+        assert status["cancelled"] == len(cancelled) and status["cancelled_at"], status
+        assert client.post(f"/api/plagiat/jobs/{job_id}/cancel").status_code == 200
+        print(f"✅ Annulation : {len(done)} rapports terminés conservés, {len(cancelled)} annulés, "
+              f"aucune analyse laissée en cours")
+
+        # 2. Reprise : seuls les rapports annulés repartent
+        started = time.perf_counter()
+        resumed = client.post(f"/api/plagiat/jobs/{job_id}/resume").get_json()
+        assert resumed["requeued"] == len(cancelled), resumed
+        status = wait_job(client, job_id)
+        assert status["status"] == "completed" and status["completed"] == args.reports, status
+        with app.app_context():
+            assert all(a.analyzed_at == analyzed_at[a.rapport_id]
+                       for a in PlagiatAnalysis.query if a.rapport_id in done)
+            assert PlagiatAnalysis.query.filter_by(status="completed").count() == args.reports
+        assert client.post(f"/api/plagiat/jobs/{job_id}/cancel").status_code == 409
+        print(f"✅ Reprise : {resumed['requeued']} rapports réanalysés en {time.perf_counter() - started:.1f} s, "
+              f"les {len(done)} déjà terminés non refaits")
+
+        # 3. Analyse longue sans événement : le bail reste renouvelé par le
+        #    thread, puis annulation demandée par un autre processus
+        with app.app_context():
+            job = PlagiatJob(kind="analyze_selected", backend="local", total=1)
+            db.session.add(job)
+            db.session.flush()
+            now = datetime.utcnow()
+            item = PlagiatJobItem(job_id=job.id, rapport_id=1, status="running", heartbeat_at=now)
+            db.session.add(item)
+            PlagiatAnalysis.query.filter_by(rapport_id=1).update(
+                {"status": "processing", "heartbeat_at": now}, synchronize_session=False)
+            db.session.commit()
+            saved = Config.PLAGIAT_JOB_LEASE_SECONDS, Config.PLAGIAT_JOB_HEARTBEAT_SECONDS
+            Config.PLAGIAT_JOB_LEASE_SECONDS, Config.PLAGIAT_JOB_HEARTBEAT_SECONDS = 2, 0.5
+            try:
+                with jobs.ItemLease(job.id, item.id, 1) as lease:
+                    time.sleep(3 * Config.PLAGIAT_JOB_LEASE_SECONDS)
+                    reclaimed = jobs.reclaim_stale()
+                    assert reclaimed == {"analyses": 0, "items": 0}, reclaimed
+                    lease.check()
+
+                    db.session.get(PlagiatJob, job.id).cancelled_at = datetime.utcnow()
+                    db.session.commit()
+                    time.sleep(2 * Config.PLAGIAT_JOB_HEARTBEAT_SECONDS)
+                    try:
+                        lease.check()
+                        raise AssertionError("annulation non vue par le bail")
+                    except jobs.JobCancelled:
+                        pass
+                assert not lease._thread.is_alive()
+            finally:
+                Config.PLAGIAT_JOB_LEASE_SECONDS, Config.PLAGIAT_JOB_HEARTBEAT_SECONDS = saved
+            PlagiatAnalysis.query.filter_by(rapport_id=1).update({"status": "completed"}, synchronize_session=False)
+            db.session.delete(db.session.get(PlagiatJob, job.id))
+            db.session.commit()
+        print("✅ Bail renouvelé sans événement de progression ; annulation hors processus vue par le bail")
+
+        # 4. Processus arrêté en pleine analyse : bail expiré
+        stale = datetime.utcnow() - timedelta(seconds=Config.PLAGIAT_JOB_LEASE_SECONDS + 60)
+        with app.app_context():
+            PlagiatAnalysis.query.filter(PlagiatAnalysis.rapport_id.in_([1, 2])).update(
+                {"status": "processing", "heartbeat_at": stale}, synchronize_session=False)
+            PlagiatAnalysis.query.filter_by(rapport_id=3).update(
+                {"status": "processing", "heartbeat_at": datetime.utcnow()}, synchronize_session=False)
+            # Jamais analysé : la ligne est supprimée puis l'élément remis en file
+            PlagiatAnalysis.query.filter_by(rapport_id=args.reports).delete()
+            db.session.add(PlagiatAnalysis(rapport_id=args.reports, status="processing", heartbeat_at=stale))
+            job = PlagiatJob(kind="analyze_selected", backend="local", total=2)
+            db.session.add(job)
+            db.session.flush()
+            db.session.add_all([
+                PlagiatJobItem(job_id=job.id, rapport_id=args.reports, status="running", heartbeat_at=stale),
+                PlagiatJobItem(job_id=job.id, rapport_id=1, status="completed"),
+            ])
+            db.session.commit()
+            stale_job = job.id
+
+        reclaimed = client.post("/api/plagiat/jobs/reclaim").get_json()
+        assert reclaimed == {"analyses": 3, "items": 1}, reclaimed
+        status = wait_job(client, stale_job)
+        with app.app_context():
+            analyses = {a.rapport_id: a.status for a in PlagiatAnalysis.query}
+            assert analyses[1] == analyses[2] == "completed", analyses
+            assert analyses[3] == "processing", analyses  # bail encore valide
+            assert analyses[args.reports] == "completed", analyses
+            assert item_statuses(stale_job) == {args.reports: "completed", 1: "completed"}
+            PlagiatAnalysis.query.filter_by(rapport_id=3).update({"status": "completed"})
+            db.session.commit()
+        print("✅ Récupération : analyses périmées rétablies ou supprimées, élément remis en file et terminé")
+
+        # 5. Balayage de --stale lignes périmées (job annulé : rien n'est relancé)
+        with app.app_context():
+            db.session.execute(insert(Rapport), [
+                {"id": rid, "auteur_id": 1, "filename": f"s{rid}.txt", "storage_path": "x"}
+                for rid in range(1000, 1000 + args.stale)])
+            db.session.execute(insert(PlagiatAnalysis), [
+                {"rapport_id": rid, "status": "processing", "heartbeat_at": stale,
+                 "analyzed_at": stale if rid % 2 else None}
+                for rid in range(1000, 1000 + args.stale)])
+            job = PlagiatJob(kind="analyze_all", backend="local", total=args.stale, cancelled_at=stale)
+            db.session.add(job)
+            db.session.flush()
+            db.session.execute(insert(PlagiatJobItem), [
+                {"job_id": job.id, "rapport_id": rid, "status": "running", "heartbeat_at": stale}
+                for rid in range(1000, 1000 + args.stale)])
+            db.session.commit()
+            sweep_job = job.id
+
+        started = time.perf_counter()
+        reclaimed = client.post("/api/plagiat/jobs/reclaim").get_json()
+        elapsed = time.perf_counter() - started
+        assert reclaimed == {"analyses": args.stale, "items": args.stale}, reclaimed
+        status = client.get(f"/api/plagiat/jobs/{sweep_job}").get_json()
+        assert status["status"] == "cancelled" and status["cancelled"] == args.stale, status
+        with app.app_context():
+            assert not PlagiatAnalysis.query.filter_by(status="processing").count()
+        print(f"✅ Balayage : {args.stale} analyses et {args.stale} éléments périmés en {elapsed:.2f} s")
+    finally:
+        shutil.rmtree(upload_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Vérifie que /api/plagiat/analyses et /pending_analyses envoient un nombre
+constant de requêtes SQL, quel que soit le nombre de rapports.
+
+Remplit une base SQLite avec 20 puis 2000 rapports (deux tiers analysés,
+avec correspondances et filières variées), compte les requêtes d'un appel
+à chaque endpoint et échoue si le compte dépend du volume. Parcourt aussi
+toutes les pages via next_cursor pour vérifier que chaque ligne sort une
+fois et une seule, filtres compris.
+
+    python benchmarks/check_listing_queries.py
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+os.environ["PLAGIAT_SOURCE_PROVIDERS"] = ""
+os.environ["PLAGIAT_CACHE_DIR"] = tempfile.mkdtemp(prefix="check_listing_")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import BigInteger, event
+from sqlalchemy.ext.compiler import compiles
+
+from app.models import db, User, Student, Rapport, PlagiatAnalysis, PlagiatMatch
+from app.api.plagiat.plagiat_analysis import plagiat_analysis_bp
+
+FILIERES = ["GI", "GE", "GM"]
+RISKS = ["none", "low", "medium", "high"]
+
+
+@compiles(BigInteger, "sqlite")
+def _sqlite_big_integer(type_, compiler, **kw):
+    return "INTEGER"
+
+
+def make_app(path: str) -> Flask:
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{path}"
+    db.init_app(app)
+    app.register_blueprint(plagiat_analysis_bp)
+    return app
+
+
+def populate(count: int) -> None:
+    random.seed(count)
+    base = datetime(2026, 1, 1)
+    for i in range(count):
+        user = User(name=f"Nom{i}", prenom=f"Prenom{i}", email=f"e{i}@example.org",
+                    password_hash="x", role="student")
+        db.session.add(user)
+        db.session.flush()
+        if i % 5:
+            db.session.add(Student(user_id=user.id, cin=f"C{i}", cne=f"N{i}", filiere=FILIERES[i % 3]))
+        rapport = Rapport(auteur_id=user.id, filename=f"r{i}.pdf", storage_path=f"uploads/r{i}.pdf")
+        db.session.add(rapport)
+        db.session.flush()
+        if i % 3:
+            analysis = PlagiatAnalysis(
+                rapport_id=rapport.id, status="completed" if i % 7 else "error",
+                risk_level=random.choice(RISKS), similarity_score=random.uniform(0, 90),
+                # Dates en partie identiques et nulles : le curseur doit départager
+                analyzed_at=None if i % 11 == 0 else base + timedelta(hours=i // 4)
+            )
+            db.session.add(analysis)
+            db.session.flush()
+            for k in range(random.randint(0, 4)):
+                db.session.add(PlagiatMatch(analysis_id=analysis.id, similarity=10.0, chunk_index=k))
+    db.session.commit()
+
+
+def count_statements(client, url: str):
+    counter = {"n": 0}
+
+    def before(*args, **kwargs):
+        counter["n"] += 1
+
+    event.listen(db.engine, "before_cursor_execute", before)
+    try:
+        start = time.perf_counter()
+        response = client.get(url)
+        elapsed = time.perf_counter() - start
+    finally:
+        event.remove(db.engine, "before_cursor_execute", before)
+    assert response.status_code == 200, response.get_json()
+    return counter["n"], elapsed, response.get_json()
+
+
+def walk(client, url: str, key: str, limit: int = 37):
+    seen, cursor = [], None
+    while True:
+        page = client.get(f"{url}{'&' if '?' in url else '?'}limit={limit}" + (f"&after={cursor}" if cursor else "")).get_json()
+        seen.extend(row.get("id", row.get("rapport_id")) for row in page[key])
+        cursor = page["next_cursor"]
+        if not cursor:
+            return seen
+
+
+def check(count: int):
+    directory = tempfile.mkdtemp(prefix="check_listing_db_")
+    app = make_app(os.path.join(directory, "listing.db"))
+    with app.app_context():
+        db.create_all()
+        populate(count)
+        client = app.test_client()
+
+        counts = {}
+        for url in ("/api/plagiat/analyses?limit=500", "/api/plagiat/analyses?risk=high,medium&filiere=GI",
+                    "/api/plagiat/pending_analyses?limit=500"):
+            statements, elapsed, _ = count_statements(client, url)
+            counts[url] = statements
+            print(f"  {count:5d} rapports  {url:<55} {statements} requêtes, {elapsed * 1000:6.1f} ms")
+
+        # Pagination complète : chaque ligne une fois, dans l'ordre attendu
+        ids = walk(client, "/api/plagiat/analyses", "analyses")
+        expected = [a.id for a in PlagiatAnalysis.query.order_by(
+            PlagiatAnalysis.analyzed_at.desc(), PlagiatAnalysis.id.desc()).all()]
+        assert ids == expected, "pagination des analyses incohérente"
+
+        filtered = walk(client, "/api/plagiat/analyses?risk=high&status=completed&filiere=GE", "analyses")
+        expected = [a.id for a in PlagiatAnalysis.query.join(Rapport).join(Student, Student.user_id == Rapport.auteur_id)
+                    .filter(PlagiatAnalysis.risk_level == "high", PlagiatAnalysis.status == "completed",
+                            Student.filiere == "GE")
+                    .order_by(PlagiatAnalysis.analyzed_at.desc(), PlagiatAnalysis.id.desc()).all()]
+        assert filtered == expected, "filtres incohérents"
+
+        pending = walk(client, "/api/plagiat/pending_analyses", "pending_analyses")
+        expected = [r.id for r in Rapport.query.outerjoin(PlagiatAnalysis)
+                    .filter(PlagiatAnalysis.id.is_(None)).order_by(Rapport.id).all()]
+        assert pending == expected, "pagination des rapports en attente incohérente"
+
+        assert client.get("/api/plagiat/analyses?after=%%%").status_code == 400
+        db.session.remove()
+    return counts
+
+
+def main():
+    small = check(20)
+    large = check(2000)
+    for url, statements in small.items():
+        assert large[url] == statements, f"{url} : {statements} requêtes à 20 rapports, {large[url]} à 2000"
+    print("✅ Nombre de requêtes constant, pagination et filtres cohérents")
+
+
+if __name__ == "__main__":
+    main()
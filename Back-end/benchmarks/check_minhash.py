@@ -0,0 +1,80 @@
+"""
+Vérifie les signatures MinHash de l'index interne (CorpusIndex).
+
+- les produits a * x + b restent sous 2^64 (pas de débordement uint64) ;
+- sur des paires d'ensembles de shingles synthétiques (valeurs crc32, de
+  taille et de Jaccard variés), le Jaccard estimé par la signature suit le
+  Jaccard exact : biais et écart moyen dans l'erreur d'échantillonnage
+  attendue pour --num-perm permutations ;
+- un index créé avec les anciennes permutations est recalculé à
+  l'ouverture et retrouve ses quasi-doublons.
+
+    python benchmarks/check_minhash.py [--pairs 500] [--num-perm 64]
+"""
+import os
+import sys
+import sqlite3
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from app.api.plagiat.corpus_index import CorpusIndex, _MERSENNE_PRIME
+
+
+def shingle_pair(rng, jaccard: float, size: int):
+    # |A| = |B| = size, |A ∩ B| = common : J = common / (2 * size - common)
+    common = int(round(2 * size * jaccard / (1 + jaccard)))
+    values = rng.choice(2 ** 32, size=2 * size - common, replace=False).tolist()
+    return set(values[:size]), set(values[:common]) | set(values[size:])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pairs", type=int, default=500)
+    parser.add_argument("--num-perm", type=int, default=64)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="check_minhash_")
+    index = CorpusIndex(os.path.join(tmp, "corpus_index.sqlite3"), num_perm=args.num_perm)
+
+    largest = int(index._perm_a.max()) * (int(_MERSENNE_PRIME) - 1) + int(index._perm_b.max())
+    assert largest < 2 ** 64, largest
+    print(f"✅ a * x + b < 2^64 (maximum 2^{np.log2(largest):.2f})")
+
+    rng = np.random.default_rng(0)
+    exact, estimated = [], []
+    for _ in range(args.pairs):
+        a, b = shingle_pair(rng, rng.uniform(0.05, 0.95), int(rng.integers(20, 400)))
+        exact.append(len(a & b) / len(a | b))
+        estimated.append(float(np.mean(index._minhash(a) == index._minhash(b))))
+    exact, estimated = np.array(exact), np.array(estimated)
+    errors = estimated - exact
+    # Écart-type attendu d'une estimation : sqrt(J (1 - J) / num_perm)
+    expected = np.sqrt(exact * (1 - exact) / args.num_perm)
+    bias = errors.mean()
+    assert abs(bias) < 3 * expected.mean() / np.sqrt(args.pairs), bias
+    assert np.abs(errors).mean() < 1.25 * np.sqrt(2 / np.pi) * expected.mean(), np.abs(errors).mean()
+    assert np.corrcoef(exact, estimated)[0, 1] > 0.95
+    print(f"✅ {args.pairs} paires : biais {bias:+.4f}, écart moyen {np.abs(errors).mean():.4f} "
+          f"(attendu {np.sqrt(2 / np.pi) * expected.mean():.4f}), corrélation "
+          f"{np.corrcoef(exact, estimated)[0, 1]:.3f}")
+
+    # Index écrit avec d'anciennes signatures : recalculé à l'ouverture
+    path = os.path.join(tmp, "migrated.sqlite3")
+    text = " ".join(f"mot{i}" for i in range(80))
+    CorpusIndex(path).add_rapport(1, [text])
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE minhash_buckets SET bucket = bucket + 1")
+    conn.execute("PRAGMA user_version = 1")
+    conn.commit()
+    conn.close()
+    hits = CorpusIndex(path).query(2, [text + " fin"])
+    assert hits[0] and hits[0][0]["rapport_id"] == 1, hits
+    print("✅ Index existant recalculé avec les nouvelles permutations")
+
+
+if __name__ == "__main__":
+    main()
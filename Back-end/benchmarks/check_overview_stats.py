@@ -0,0 +1,202 @@
+"""
+Vérifie le suivi incrémental de plagiat_overview_stats et mesure /overview.
+
+Sur une base SQLite, fait passer des analyses par tous les chemins
+d'écriture (création, passage en "processing", persist_analysis sur un
+objet expiré, changement de jour, suppression) en contrôlant après chaque
+étape que la table correspond au recalcul complet. Compare ensuite les deux
+endpoints /overview à l'ancien calcul (agrégats sur plagiat_analyses) et
+mesure requêtes et durée avec 5000 analyses.
+
+    python benchmarks/check_overview_stats.py [--analyses 5000]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import date, datetime, timedelta
+
+os.environ["PLAGIAT_SOURCE_PROVIDERS"] = ""
+os.environ["PLAGIAT_CACHE_DIR"] = tempfile.mkdtemp(prefix="check_overview_")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import BigInteger, event, func
+from sqlalchemy.ext.compiler import compiles
+
+from app.models import db, User, Rapport, PlagiatAnalysis
+from app.api.plagiat.plagiat_overview import plagiat_overview_bp
+from app.api.plagiat.plagiat_analysis import plagiat_analysis_bp, get_overview
+from app.api.plagiat.persistence import persist_analysis
+from app.api.plagiat.overview_stats import check_overview_stats, rebuild_overview_stats
+
+RISKS = ["none", "low", "medium", "high"]
+
+
+@compiles(BigInteger, "sqlite")
+def _sqlite_big_integer(type_, compiler, **kw):
+    return "INTEGER"
+
+
+def assert_consistent(step: str) -> None:
+    differences = check_overview_stats()
+    assert not differences, f"{step} : {differences}"
+    print(f"  ✅ {step}")
+
+
+def legacy_overview():
+    # Ancien calcul de plagiat_overview.py (hors analyses récentes)
+    completed = PlagiatAnalysis.query.filter(PlagiatAnalysis.status == "completed")
+    total_analyses = completed.count()
+    total_rapports = Rapport.query.count()
+    avg = db.session.query(func.avg(PlagiatAnalysis.originality_score)).filter(
+        PlagiatAnalysis.status == "completed").scalar() or 0
+    return {
+        "total_rapports": total_rapports,
+        "rapports_analyses": total_analyses,
+        "rapports_non_analyses": total_rapports - total_analyses,
+        "originalite_moyenne": round(avg, 2),
+        "risques_detectes": completed.filter(PlagiatAnalysis.risk_level.in_(["medium", "high"])).count(),
+        "analyses_aujourdhui": completed.filter(
+            func.date(PlagiatAnalysis.analyzed_at) == datetime.utcnow().date().isoformat()).count(),
+    }
+
+
+def measure(client, url: str):
+    counter = {"n": 0}
+
+    def before(*args, **kwargs):
+        counter["n"] += 1
+
+    event.listen(db.engine, "before_cursor_execute", before)
+    start = time.perf_counter()
+    response = client.get(url)
+    elapsed = time.perf_counter() - start
+    event.remove(db.engine, "before_cursor_execute", before)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json(), counter["n"], elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--analyses", type=int, default=5000)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tempfile.mkdtemp()}/overview.db"
+    db.init_app(app)
+    app.register_blueprint(plagiat_overview_bp)
+    app.register_blueprint(plagiat_analysis_bp)
+
+    with app.app_context():
+        db.create_all()
+        user = User(name="Nom", prenom="Prenom", email="e@example.org", password_hash="x", role="student")
+        db.session.add(user)
+        db.session.flush()
+        rapports = [Rapport(auteur_id=user.id, filename=f"r{i}.pdf", storage_path="x") for i in range(6)]
+        db.session.add_all(rapports)
+        db.session.commit()
+
+        print("Suivi incrémental")
+        analysis = PlagiatAnalysis(rapport_id=rapports[0].id)
+        db.session.add(analysis)
+        db.session.commit()
+        assert_consistent("création avec valeurs par défaut")
+
+        analysis.status = "processing"
+        db.session.commit()
+        assert_consistent("passage en processing (objet expiré)")
+
+        persist_analysis(analysis, {"sources": [], "similarity": 72.0, "originality": 28.0,
+                                    "risk": "high", "chunk_hashes": []})
+        assert_consistent("persist_analysis")
+
+        analysis.analyzed_at = datetime.utcnow() - timedelta(days=3)
+        analysis.originality_score = 55.5
+        db.session.flush()
+        analysis.risk_level = "medium"
+        db.session.commit()
+        assert_consistent("changement de jour et deux flush dans une transaction")
+
+        other = PlagiatAnalysis(rapport_id=rapports[1].id, status="completed", risk_level="low",
+                                originality_score=90, analyzed_at=datetime.utcnow())
+        db.session.add(other)
+        db.session.commit()
+        error = PlagiatAnalysis(rapport_id=rapports[2].id)
+        db.session.add(error)
+        db.session.flush()
+        persist_analysis(error, {"sources": [], "error": "boom"})
+        assert_consistent("analyse en erreur")
+
+        db.session.delete(other)
+        db.session.commit()
+        assert_consistent("suppression")
+
+        rolled_back = PlagiatAnalysis(rapport_id=rapports[3].id, status="completed")
+        db.session.add(rolled_back)
+        db.session.flush()
+        db.session.rollback()
+        assert_consistent("rollback")
+
+        # Écriture hors ORM : détectée par la vérification, corrigée par la reconstruction
+        PlagiatAnalysis.query.filter_by(id=analysis.id).update({"risk_level": "low"})
+        db.session.commit()
+        assert check_overview_stats(), "écriture hors ORM non détectée"
+        rebuild_overview_stats()
+        assert_consistent("reconstruction après écriture hors ORM")
+
+        print(f"\n/overview avec {args.analyses} analyses")
+        random.seed(0)
+        today = datetime.utcnow()
+        batch = []
+        for i in range(args.analyses):
+            rapport = Rapport(auteur_id=user.id, filename=f"b{i}.pdf", storage_path="x")
+            db.session.add(rapport)
+            batch.append(rapport)
+        db.session.flush()
+        for i, rapport in enumerate(batch):
+            db.session.add(PlagiatAnalysis(
+                rapport_id=rapport.id, status="completed" if i % 9 else "error",
+                risk_level=random.choice(RISKS), originality_score=round(random.uniform(10, 100), 2),
+                analyzed_at=today - timedelta(hours=random.randint(0, 24 * 30))
+            ))
+        db.session.commit()
+        assert_consistent(f"{args.analyses} analyses ajoutées")
+
+        client = app.test_client()
+        data, statements, elapsed = measure(client, "/api/plagiat/overview")
+        expected = legacy_overview()
+        for key, value in expected.items():
+            assert abs(data["stats"][key] - value) < 0.01, (key, data["stats"][key], value)
+        print(f"  plagiat_overview.py : {statements} requêtes, {elapsed * 1000:.1f} ms, "
+              "statistiques identiques à l'ancien calcul")
+
+        counter = {"n": 0}
+
+        def before(*a, **k):
+            counter["n"] += 1
+
+        event.listen(db.engine, "before_cursor_execute", before)
+        with app.test_request_context():
+            start = time.perf_counter()
+            stats = get_overview().get_json()["stats"]
+            elapsed = time.perf_counter() - start
+        event.remove(db.engine, "before_cursor_execute", before)
+        all_analyses = PlagiatAnalysis.query.all()
+        assert stats["rapports_analyses"] == len(all_analyses)
+        assert stats["risque_eleve"] == sum(a.risk_level == "high" for a in all_analyses)
+        assert stats["originalite_moyenne"] == round(sum(a.originality_score or 0 for a in all_analyses) / len(all_analyses), 1)
+        assert stats["analyses_aujourdhui"] == sum(
+            a.analyzed_at is not None and a.analyzed_at.date() == date.today() for a in all_analyses)
+        print(f"  plagiat_analysis.py : {counter['n']} requêtes, {elapsed * 1000:.1f} ms, "
+              "statistiques identiques à l'ancien calcul")
+
+        start = time.perf_counter()
+        legacy_overview()
+        print(f"  ancien calcul des compteurs : 6 requêtes, {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Vérifie /api/plagiat/jobs/<id>/events (Server-Sent Events) de bout en bout.
+
+Sur une base SQLite et la file locale, met N rapports texte en analyse
+(/analyze_selected), lit le flux pendant l'analyse et contrôle :
+- état initial, puis pour chaque rapport les étapes dans l'ordre
+  (report_started, extracted, chunk_queried, sources_queried, embedded,
+  ai_scored, matches_saved, report_finished) et job_finished en dernier ;
+- identifiants croissants, reprise avec Last-Event-ID après coupure ;
+- repli sur l'état relu en base pour un job exécuté hors du processus
+  (backend Celery simulé).
+Mesure enfin le coût d'une publication avec plusieurs abonnés.
+
+    python benchmarks/check_progress_events.py [--reports 6]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+from datetime import datetime
+
+os.environ["PLAGIAT_SOURCE_PROVIDERS"] = ""
+os.environ["PLAGIAT_CACHE_DIR"] = tempfile.mkdtemp(prefix="check_progress_")
+os.environ["PLAGIAT_JOB_BACKEND"] = "local"
+# Modèles absents du cache : pas de tentative de téléchargement
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import BigInteger
+from sqlalchemy.ext.compiler import compiles
+
+from app.config import Config
+from app.models import db, User, Rapport, PlagiatJob, PlagiatJobItem
+from app.api.plagiat.plagiat_analysis import plagiat_analysis_bp
+from app.api.plagiat.progress import ProgressBroker
+from app.api.plagiat.text_extraction import ROOT_DIR
+
+STEPS = ["report_started", "extracted", "chunk_queried", "sources_queried", "embedded",
+         "ai_scored", "matches_saved", "report_finished"]
+
+
+@compiles(BigInteger, "sqlite")
+def _sqlite_big_integer(type_, compiler, **kw):
+    return "INTEGER"
+
+
+def read_events(response, on_event=None):
+    # Découpe le flux SSE en événements (id, event, data)
+    events, current = [], {}
+    buffer = ""
+    for chunk in response.response:
+        buffer += chunk.decode("utf-8") if isinstance(chunk, bytes) else chunk
+        while "\n\n" in buffer:
+            block, buffer = buffer.split("\n\n", 1)
+            current = {}
+            for line in block.split("\n"):
+                if line.startswith(":") or not line:
+                    continue
+                field, _, value = line.partition(": ")
+                current[field] = value
+            if "event" in current:
+                current["data"] = json.loads(current["data"])
+                events.append(current)
+                if on_event:
+                    on_event(current)
+    return events
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reports", type=int, default=6)
+    args = parser.parse_args()
+
+    upload_dir = os.path.join(ROOT_DIR, "uploads", "tmp_check_progress")
+    os.makedirs(upload_dir, exist_ok=True)
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tempfile.mkdtemp()}/progress.db"
+    db.init_app(app)
+    app.register_blueprint(plagiat_analysis_bp)
+    try:
+        with app.app_context():
+            db.create_all()
+            db.session.add(User(id=1, name="Nom", prenom="Prenom", email="e@example.org",
+                                password_hash="x", role="student"))
+            for i in range(1, args.reports + 1):
+                with open(os.path.join(upload_dir, f"r{i}.txt"), "w", encoding="utf-8") as f:
+                    f.write("\n".join(
+                        f"Paragraphe {p} du rapport {i} : conception et réalisation d'une plateforme "
+                        f"de gestion des soutenances, module {p * i}, tests et déploiement." for p in range(120)))
+                db.session.add(Rapport(id=i, auteur_id=1, filename=f"r{i}.txt",
+                                       storage_path=f"uploads/tmp_check_progress/r{i}.txt"))
+            db.session.commit()
+
+        client = app.test_client()
+        started = time.perf_counter()
+        job = client.post("/api/plagiat/analyze_selected",
+                          json={"rapport_ids": list(range(1, args.reports + 1))}).get_json()
+        first = {}
+
+        def on_event(event):
+            first.setdefault(event["event"], time.perf_counter() - started)
+
+        events = read_events(client.get(f"/api/plagiat/jobs/{job['job_id']}/events", buffered=False), on_event)
+        elapsed = time.perf_counter() - started
+
+        assert events[0]["event"] == "status", events[0]
+        assert events[-1]["event"] == "job_finished", events[-1]
+        assert events[-1]["data"]["job"]["completed"] == args.reports, events[-1]
+        ids = [int(e["id"]) for e in events if "id" in e]
+        assert ids == sorted(ids) and len(set(ids)) == len(ids)
+        for rapport_id in range(1, args.reports + 1):
+            steps = [e["event"] for e in events if e["data"].get("rapport_id") == rapport_id]
+            order = [s for s in STEPS if s in steps]
+            assert order == STEPS, (rapport_id, steps)
+            assert [s for s in steps if s != "chunk_queried"] == [s for s in STEPS if s != "chunk_queried"], steps
+        counts = {}
+        for e in events:
+            counts[e["event"]] = counts.get(e["event"], 0) + 1
+        print(f"✅ {len(events)} événements pour {args.reports} rapports en {elapsed:.2f} s : {counts}")
+        print(f"   premier événement d'étape après {first['report_started'] * 1000:.0f} ms, "
+              f"premier rapport terminé après {first['report_finished'] * 1000:.0f} ms")
+
+        # Reprise après coupure : seulement les événements suivants
+        cut = ids[len(ids) // 2]
+        replay = read_events(client.get(f"/api/plagiat/jobs/{job['job_id']}/events",
+                                        headers={"Last-Event-ID": str(cut)}, buffered=False))
+        replayed = [int(e["id"]) for e in replay if "id" in e]
+        assert replayed == [i for i in ids if i > cut], (replayed[:5], cut)
+        print(f"✅ Reprise avec Last-Event-ID={cut} : {len(replayed)} événements rejoués, aucun doublon")
+
+        # Job exécuté ailleurs : rien n'est publié, l'état est relu en base pendant les silences
+        Config.PLAGIAT_PROGRESS_POLL_SECONDS = 0.2
+        with app.app_context():
+            remote = PlagiatJob(kind="analyze_selected", backend="celery", total=1)
+            db.session.add(remote)
+            db.session.flush()
+            db.session.add(PlagiatJobItem(job_id=remote.id, rapport_id=1))
+            db.session.commit()
+            remote_id = remote.id
+
+        def finish_remote():
+            time.sleep(0.5)
+            with app.app_context():
+                PlagiatJobItem.query.filter_by(job_id=remote_id).update({"status": "completed"})
+                PlagiatJob.query.filter_by(id=remote_id).update({"finished_at": datetime.utcnow()})
+                db.session.commit()
+
+        threading.Thread(target=finish_remote).start()
+        remote_events = read_events(client.get(f"/api/plagiat/jobs/{remote_id}/events", buffered=False))
+        assert [e["data"]["status"] for e in remote_events] == ["queued", "completed"], remote_events
+        print("✅ Job hors processus : état initial puis état final relu en base, flux fermé")
+
+        broker = ProgressBroker()
+        subscriptions = [broker.subscribe(1, maxsize=200000) for _ in range(10)]
+        count = 50000
+        start = time.perf_counter()
+        for n in range(count):
+            broker.publish(1, "chunk_queried", rapport_id=1, chunk_index=n, candidates=3)
+        per_event = (time.perf_counter() - start) / count * 1e6
+        assert all(s.queue.qsize() == count for s in subscriptions)
+        print(f"Publication : {per_event:.1f} µs par événement avec {len(subscriptions)} abonnés")
+    finally:
+        shutil.rmtree(upload_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
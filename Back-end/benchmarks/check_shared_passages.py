@@ -0,0 +1,114 @@
+"""
+Vérifie qu'un passage recopié dans plusieurs rapports n'est pas pris pour du
+gabarit partagé.
+
+Les rapports 1 à 3 contiennent la même définition (lignes courtes, page 5)
+et le même en-tête de département en haut de chaque page : leurs empreintes
+atteignent PLAGIAT_BOILERPLATE_MIN_REPORTS. Le rapport 4 reprend la
+définition au milieu d'une page du corps du texte :
+- l'en-tête reste écarté (bord de page) ;
+- la définition reste dans les chunks du rapport 4, est indexée et
+  retrouvée dans les rapports 1 à 3 par l'index interne (MinHash).
+
+    python benchmarks/check_shared_passages.py
+"""
+import os
+import sys
+import random
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import Config
+from app.api.plagiat.chunking import BoilerplateIndex, WindowChunker
+from app.api.plagiat.corpus_index import CorpusIndex
+
+HEADER = "Département Informatique et Mathématiques Appliquées"
+DEFINITION = [
+    "Une architecture microservices découpe une application en services autonomes",
+    "déployés séparément, chacun responsable d'une capacité métier précise et",
+    "communiquant avec les autres par des interfaces légères comme REST ou",
+    "des files de messages asynchrones. Chaque service possède sa propre base",
+    "de données, ce qui évite le couplage par le schéma et permet de",
+    "choisir la technologie la mieux adaptée à chaque besoin. Cette approche",
+    "facilite la montée en charge ciblée, les déploiements fréquents et",
+    "l'isolation des pannes, au prix d'une complexité opérationnelle accrue :",
+    "supervision distribuée, gestion des versions d'API, cohérence à terme",
+    "des données et orchestration des conteneurs deviennent indispensables.",
+    "Pour limiter ces coûts, une passerelle d'API centralise l'authentification,",
+    "la limitation du débit et le routage des requêtes vers les services,",
+    "tandis qu'un registre de services permet à chaque instance de s'annoncer",
+    "et d'être découverte dynamiquement. Les traces distribuées relient les",
+    "appels successifs d'une même requête utilisateur et aident à localiser",
+    "les lenteurs. Enfin, des tests de contrat vérifient que chaque service",
+    "respecte les interfaces attendues par ses consommateurs avant tout",
+    "déploiement, ce qui réduit les régressions lors des mises à jour",
+    "indépendantes et conserve la compatibilité entre les versions publiées",
+    "par des équipes différentes travaillant chacune à leur propre rythme.",
+]
+VOCABULARY = (
+    "système données application gestion utilisateur serveur modèle service formation qualité "
+    "processus évaluation interface sécurité déploiement performance requête conception analyse "
+    "besoin module fonctionnalité validation document méthode résultat développement solution "
+    "le la les un une des de du et pour dans avec sur par qui que est"
+).split()
+
+
+def report_pages(seed: int, definition_page: int, pages: int = 25):
+    rng = random.Random(seed)
+    result = []
+    for number in range(1, pages + 1):
+        lines = [HEADER]
+        for _ in range(12):
+            lines.append(" ".join(rng.choice(VOCABULARY) for _ in range(12)))
+        if number == definition_page:
+            lines[4:4] = DEFINITION
+        result.append((number, lines))
+    return result
+
+
+def chunk(pages, common):
+    chunker = WindowChunker(common=common)
+    for number, lines in pages:
+        for line in lines:
+            chunker.add_paragraph(line, number)
+    chunks, _ = chunker.finish()
+    return chunker, chunks
+
+
+def main():
+    tmp = tempfile.mkdtemp(prefix="check_shared_")
+    boilerplate = BoilerplateIndex(os.path.join(tmp, "boilerplate.sqlite3"),
+                                   min_reports=Config.PLAGIAT_BOILERPLATE_MIN_REPORTS)
+    corpus = CorpusIndex(os.path.join(tmp, "corpus_index.sqlite3"))
+
+    reports = {}
+    for rapport_id in (1, 2, 3):
+        chunker, chunks = reports[rapport_id] = chunk(report_pages(rapport_id, definition_page=5), boilerplate.common())
+        boilerplate.record(f"rapport{rapport_id}", chunker.template_lines)
+        corpus.add_rapport(rapport_id, chunks)
+
+    common = boilerplate.common()
+    assert len(common) >= len(DEFINITION), "définition non comptée comme ligne partagée"
+    chunker, chunks = chunk(report_pages(4, definition_page=15), common)
+    assert not any(HEADER in c for c in chunks), "en-tête partagé non écarté"
+    assert all(any(line in c for c in chunks) for line in DEFINITION), "définition recopiée retirée des chunks"
+    print(f"✅ En-tête partagé écarté, définition recopiée conservée ({len(chunks)} chunks)")
+
+    corpus.add_rapport(4, chunks)
+    assert corpus.stats()["rapports"] == 4
+    hits = [hit for chunk_hits in corpus.query(4, chunks, min_jaccard=Config.PLAGIAT_INTERNAL_MIN_JACCARD)
+            for hit in chunk_hits]
+    assert {hit["rapport_id"] for hit in hits} == {1, 2, 3}, hits
+    assert all(any(line in hit["text"] for line in DEFINITION) for hit in hits), hits
+    # Dans l'autre sens : le rapport 4 est bien indexé
+    found = [hit["rapport_id"] for rapport_id, (_, other) in reports.items()
+             for chunk_hits in corpus.query(rapport_id, other, min_jaccard=Config.PLAGIAT_INTERNAL_MIN_JACCARD)
+             for hit in chunk_hits if hit["rapport_id"] == 4]
+    assert found, "rapport 4 absent de l'index interne"
+    print(f"✅ Définition indexée et retrouvée dans les rapports 1 à 3 "
+          f"(Jaccard {max(h['jaccard'] for h in hits):.2f}), rapport 4 trouvé depuis les précédents")
+
+
+if __name__ == "__main__":
+    main()
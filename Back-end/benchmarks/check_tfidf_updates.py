@@ -0,0 +1,104 @@
+"""
+Vérifie les mises à jour concurrentes du modèle TF-IDF (IncrementalTfidf).
+
+- --processes processus indexent chacun --reports rapports en même temps
+  dans le même fichier : les fréquences documentaires obtenues sont celles
+  d'une indexation séquentielle (aucun ajout perdu) ;
+- un rapport ré-indexé avec un autre texte : ses anciens termes sont
+  retirés, les nouveaux ajoutés (même état qu'une indexation directe du
+  nouveau texte) ; ré-indexé à l'identique, rien ne change.
+
+    python benchmarks/check_tfidf_updates.py [--processes 4] [--reports 20]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from app.api.plagiat.lexical_model import IncrementalTfidf
+
+WORDS = (
+    "analyse donnees systeme application gestion projet methode resultat "
+    "modele reseau apprentissage algorithme performance utilisateur base "
+    "architecture service plateforme securite evaluation conception stage"
+).split()
+
+
+def report_chunks(rapport_id: int, version: int = 0):
+    rng = random.Random(rapport_id * 1000 + version)
+    return [" ".join(rng.choices(WORDS, k=80)) + f" rapport{rapport_id} v{version}" for _ in range(30)]
+
+
+def index_reports(path: str, rapport_ids):
+    model = IncrementalTfidf(path)
+    for rapport_id in rapport_ids:
+        model.partial_fit(report_chunks(rapport_id), rapport_id=rapport_id)
+
+
+def state(path: str):
+    model = IncrementalTfidf(path)
+    return model.df, model.idf, model.n_docs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--reports", type=int, default=20)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="check_tfidf_")
+    ids = list(range(1, args.processes * args.reports + 1))
+
+    reference = os.path.join(tmp, "sequential.sqlite3")
+    index_reports(reference, ids)
+
+    shared = os.path.join(tmp, "shared.sqlite3")
+    IncrementalTfidf(shared)
+    context = multiprocessing.get_context("spawn")
+    start = time.perf_counter()
+    workers = [context.Process(target=index_reports, args=(shared, ids[i::args.processes]))
+               for i in range(args.processes)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+    elapsed = time.perf_counter() - start
+
+    df, idf, n_docs = state(shared)
+    ref_df, ref_idf, ref_n_docs = state(reference)
+    assert n_docs == ref_n_docs == len(ids) * 30, (n_docs, ref_n_docs)
+    assert np.array_equal(df, ref_df)
+    print(f"✅ {args.processes} processus x {args.reports} rapports en {elapsed:.1f} s : "
+          f"fréquences identiques à l'indexation séquentielle ({n_docs} chunks)")
+
+    # Ré-indexation avec un autre texte
+    model = IncrementalTfidf(shared)
+    model.partial_fit(report_chunks(1, version=1), rapport_id=1)
+    expected = IncrementalTfidf(os.path.join(tmp, "expected.sqlite3"))
+    for rapport_id in ids:
+        expected.partial_fit(report_chunks(rapport_id, version=1 if rapport_id == 1 else 0), rapport_id=rapport_id)
+    assert np.array_equal(model.df, expected.df) and model.n_docs == expected.n_docs
+    assert np.allclose(model.idf, expected.idf)
+    # Bigramme propre à l'ancien texte
+    marker = np.setdiff1d(model.vectorizer.transform(["rapport1 v0"]).indices,
+                          model.vectorizer.transform(["rapport1", "v0"]).indices)
+    assert not model.df[marker].any(), "anciens termes du rapport encore comptés"
+    print("✅ Rapport ré-indexé avec un autre texte : anciens termes retirés, nouveaux ajoutés")
+
+    before = model.df.copy()
+    model.partial_fit(report_chunks(1, version=1), rapport_id=1)
+    model.partial_fit([], rapport_id=999999)
+    assert np.array_equal(model.df, before) and model.n_docs == expected.n_docs
+    print("✅ Ré-indexation à l'identique : aucun changement")
+
+
+if __name__ == "__main__":
+    main()
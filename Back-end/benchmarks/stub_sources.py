@@ -0,0 +1,85 @@
+"""
+Faux serveur Semantic Scholar / CrossRef pour tester le détecteur hors ligne.
+
+    python benchmarks/stub_sources.py --port 8765 --delay 0.3 --error-rate 0.2
+
+puis, avant de démarrer l'application :
+
+    export PLAGIAT_SEMANTIC_SCHOLAR_URL=http://127.0.0.1:8765/semantic_scholar
+    export PLAGIAT_CROSSREF_URL=http://127.0.0.1:8765/crossref
+
+--delay ajoute une latence fixe par requête, --error-rate renvoie une
+proportion de réponses 429 (avec Retry-After) pour exercer les ré-essais.
+"""
+import random
+import asyncio
+import argparse
+
+from aiohttp import web
+
+
+def build_app(delay: float = 0.0, error_rate: float = 0.0, seed: int = 0) -> web.Application:
+    rng = random.Random(seed)
+    counters = {"requests": 0, "rate_limited": 0}
+
+    async def maybe_fail(request):
+        counters["requests"] += 1
+        if delay:
+            await asyncio.sleep(delay)
+        if error_rate and rng.random() < error_rate:
+            counters["rate_limited"] += 1
+            raise web.HTTPTooManyRequests(headers={"Retry-After": "0"})
+
+    def fake_abstract(query: str, i: int) -> str:
+        words = query.split()
+        rng.shuffle(words)
+        return f"Paper {i} " + " ".join(words)
+
+    async def semantic_scholar(request):
+        await maybe_fail(request)
+        query = request.query.get("query", "")
+        limit = int(request.query.get("limit", 5))
+        return web.json_response({"data": [
+            {
+                "title": f"Semantic paper {i}",
+                "url": f"https://stub.local/s2/{abs(hash(query)) % 10000}/{i}",
+                "abstract": fake_abstract(query, i),
+            }
+            for i in range(limit)
+        ]})
+
+    async def crossref(request):
+        await maybe_fail(request)
+        query = request.query.get("query", "")
+        rows = int(request.query.get("rows", 5))
+        return web.json_response({"message": {"items": [
+            {
+                "title": [fake_abstract(query, i)[:120]],
+                "URL": f"https://stub.local/crossref/{abs(hash(query)) % 10000}/{i}",
+            }
+            for i in range(rows)
+        ]}})
+
+    async def stats(request):
+        return web.json_response(counters)
+
+    app = web.Application()
+    app.router.add_get("/semantic_scholar", semantic_scholar)
+    app.router.add_get("/crossref", crossref)
+    app.router.add_get("/stats", stats)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    web.run_app(build_app(args.delay, args.error_rate), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
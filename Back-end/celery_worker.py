@@ -0,0 +1,8 @@
+from app import create_app
+from app.tasks import celery, init_celery
+
+app = create_app()
+init_celery(app)
+
+if celery is None:
+    raise SystemExit("❌ Celery n'est pas installé (pip install celery redis)")
@@ -0,0 +1,49 @@
+from app import create_app, db
+from sqlalchemy import text
+
+# Colonnes ajoutées aux tables de plagiat existantes (les nouvelles tables
+# sont créées par db.create_all() au démarrage de run.py).
+COLUMNS = [
+    ("plagiat_analyses", "ai_sections", "TEXT NULL"),
+    ("plagiat_analyses", "file_hash", "VARCHAR(64) NULL"),
+    ("plagiat_analyses", "chunk_hashes", "TEXT NULL"),
+    ("plagiat_matches", "chunk_hash", "VARCHAR(40) NULL"),
+    ("plagiat_matches", "spans", "TEXT NULL"),
+    ("plagiat_analyses", "heartbeat_at", "DATETIME NULL"),
+    ("plagiat_jobs", "cancelled_at", "DATETIME NULL"),
+    ("plagiat_job_items", "heartbeat_at", "DATETIME NULL"),
+]
+
+# Index ajoutés aux tables existantes
+INDEXES = [
+    ("plagiat_analyses", "ix_plagiat_analyses_analyzed_at", "analyzed_at"),
+]
+
+app = create_app()
+
+with app.app_context():
+    print("Mise à jour du schéma plagiat...")
+    db.create_all()
+    with db.engine.connect() as conn:
+        for table, column, definition in COLUMNS:
+            exists = conn.execute(text(f"SHOW COLUMNS FROM {table} LIKE '{column}'")).fetchone()
+            if exists:
+                print(f"{table}.{column} existe déjà.")
+                continue
+            try:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {definition}"))
+                print(f"{table}.{column} ajoutée.")
+            except Exception as e:
+                print(f"Erreur pour {table}.{column} : {e}")
+        for table, index, columns in INDEXES:
+            exists = conn.execute(text(f"SHOW INDEX FROM {table} WHERE Key_name = '{index}'")).fetchone()
+            if exists:
+                print(f"Index {index} existe déjà.")
+                continue
+            try:
+                conn.execute(text(f"CREATE INDEX {index} ON {table} ({columns})"))
+                print(f"Index {index} créé.")
+            except Exception as e:
+                print(f"Erreur pour l'index {index} : {e}")
+        conn.commit()
+    print("Schéma plagiat à jour.")
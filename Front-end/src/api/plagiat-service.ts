@@ -11,8 +11,62 @@ interface PlagiatAnalysisResult {
     matchesDistribution?: Record<string, number>;
 }
 
+export interface PlagiatJobStatus {
+    job_id: number;
+    kind: string;
+    backend: string;
+    status: 'queued' | 'running' | 'completed' | 'cancelling' | 'cancelled';
+    total: number;
+    queued: number;
+    running: number;
+    completed: number;
+    skipped: number;
+    failed: number;
+    cancelled: number;
+    progress: number;
+    created_at: string | null;
+    finished_at: string | null;
+    cancelled_at: string | null;
+}
+
+// Événements de /jobs/<id>/events (voir Back-end/app/api/plagiat/progress.py)
+export type PlagiatJobEventType =
+    | 'report_started'
+    | 'extracted'
+    | 'chunk_queried'
+    | 'sources_queried'
+    | 'embedded'
+    | 'ai_scored'
+    | 'matches_saved'
+    | 'report_finished'
+    | 'job_finished';
+
+export interface PlagiatJobEvent {
+    id: number;
+    event: PlagiatJobEventType;
+    at: number; // horodatage serveur, en secondes
+    job_id: number;
+    item_id?: number;
+    rapport_id?: number;
+    [key: string]: any;
+}
+
+export interface PlagiatJobEventHandlers {
+    onStatus?: (status: PlagiatJobStatus) => void;
+    onEvent?: (event: PlagiatJobEvent) => void;
+    onFinished?: (status: PlagiatJobStatus) => void;
+    onError?: (error: Event) => void;
+}
+
 const API_URL = 'http://localhost:5000/api/plagiat';
 
+const isFinal = (status: PlagiatJobStatus) => status.status === 'completed' || status.status === 'cancelled';
+
+const JOB_EVENT_TYPES: PlagiatJobEventType[] = [
+    'report_started', 'extracted', 'chunk_queried', 'sources_queried', 'embedded',
+    'ai_scored', 'matches_saved', 'report_finished', 'job_finished'
+];
+
 export const plagiatService = {
     analyzeReport: async (rapportId: number | string): Promise<{ analysis: PlagiatAnalysisResult }> => {
         const response = await axios.post(`${API_URL}/analyze/${rapportId}`, {}, {
@@ -35,5 +89,100 @@ export const plagiatService = {
             console.error("Error fetching plagiarism analysis:", error);
             return null;
         }
+    },
+
+    // Les analyses multiples sont mises en file : suivi par identifiant de job
+    getJob: async (jobId: number | string): Promise<PlagiatJobStatus> => {
+        const response = await axios.get(`${API_URL}/jobs/${jobId}`, {
+            headers: {
+                Authorization: `Bearer ${localStorage.getItem('token')}`
+            }
+        });
+        return response.data;
+    },
+
+    // Rapports en file abandonnés, rapports en cours arrêtés à leur prochaine étape
+    cancelJob: async (jobId: number | string): Promise<PlagiatJobStatus> => {
+        const response = await axios.post(`${API_URL}/jobs/${jobId}/cancel`, {}, {
+            headers: {
+                Authorization: `Bearer ${localStorage.getItem('token')}`
+            }
+        });
+        return response.data;
+    },
+
+    // Reprise après le dernier rapport terminé
+    resumeJob: async (jobId: number | string, retryErrors = false): Promise<PlagiatJobStatus & { requeued: number }> => {
+        const response = await axios.post(`${API_URL}/jobs/${jobId}/resume`, {}, {
+            params: retryErrors ? { retry_errors: 1 } : {},
+            headers: {
+                Authorization: `Bearer ${localStorage.getItem('token')}`
+            }
+        });
+        return response.data;
+    },
+
+    analyzeSelected: async (rapportIds: number[]): Promise<PlagiatJobStatus & { status_url: string }> => {
+        const response = await axios.post(`${API_URL}/analyze_selected`, { rapport_ids: rapportIds }, {
+            headers: {
+                Authorization: `Bearer ${localStorage.getItem('token')}`
+            }
+        });
+        return response.data;
+    },
+
+    // Avancement en direct d'un job. Le navigateur se reconnecte seul (avec
+    // Last-Event-ID) ; le flux est fermé à la fin du job. Renvoie une fonction
+    // de désabonnement.
+    subscribeToJob: (jobId: number | string, handlers: PlagiatJobEventHandlers): (() => void) => {
+        const source = new EventSource(`${API_URL}/jobs/${jobId}/events`);
+        let finished = false;
+
+        const finish = (status: PlagiatJobStatus) => {
+            finished = true;
+            source.close();
+            handlers.onFinished?.(status);
+        };
+
+        source.addEventListener('status', (message) => {
+            const status: PlagiatJobStatus = JSON.parse((message as MessageEvent).data);
+            handlers.onStatus?.(status);
+            if (isFinal(status)) {
+                finish(status);
+            }
+        });
+
+        JOB_EVENT_TYPES.forEach((type) => {
+            source.addEventListener(type, (message) => {
+                const event: PlagiatJobEvent = JSON.parse((message as MessageEvent).data);
+                handlers.onEvent?.(event);
+                if (type === 'job_finished') {
+                    finish(event.job);
+                }
+            });
+        });
+
+        // Client trop lent : état relu puis nouvelle connexion
+        source.addEventListener('lagged', async () => {
+            source.close();
+            if (finished) return;
+            const status = await plagiatService.getJob(jobId);
+            handlers.onStatus?.(status);
+            if (isFinal(status)) {
+                finish(status);
+            } else {
+                unsubscribe = plagiatService.subscribeToJob(jobId, handlers);
+            }
+        });
+
+        source.onerror = (error) => {
+            if (!finished) handlers.onError?.(error);
+        };
+
+        let unsubscribe = () => {
+            finished = true;
+            source.close();
+        };
+        return () => unsubscribe();
     }
 };
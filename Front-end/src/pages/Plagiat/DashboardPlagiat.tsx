@@ -1,4 +1,4 @@
-import { useState, useEffect } from "react"
+import { useState, useEffect, useRef } from "react"
 import { useNavigate } from "react-router-dom"
 import axios from "axios"
 import {
@@ -41,6 +41,7 @@ import {
   Snackbar,
 } from "@mui/material"
 import { PlagiatNav } from 'src/components/PlagiatNav'
+import { plagiatService, type PlagiatJobStatus } from 'src/api/plagiat-service'
 
 // Interface pour la structure des données reçues du backend
 interface AnalysisData {
@@ -96,82 +97,127 @@ export function DashboardPlagiat() {
   // Auto-analyze state
   const [isAnalyzing, setIsAnalyzing] = useState(false)
   const [showSuccess, setShowSuccess] = useState(false)
+  const [successMessage, setSuccessMessage] = useState("")
   const [analyzeError, setAnalyzeError] = useState<string | null>(null)
+  const [jobProgress, setJobProgress] = useState<PlagiatJobStatus | null>(null)
+  const unsubscribeRef = useRef<(() => void) | null>(null)
 
   // Fetch data from backend
+  const loadAnalyses = async () => {
+    try {
+      // CORRECTION 1: Appel de l'endpoint /dashboard qui retourne le tableau complet
+      const response = await axios.get<AnalysisData[]>(
+        "http://localhost:5000/api/plagiat/dashboard"
+      )
+
+      // CORRECTION 2: Mappage direct de la réponse (response.data est le tableau)
+      const mapped: MappedAnalysis[] = response.data.map((a: AnalysisData) => ({
+        id: a.id,  // Can be null
+        rapportId: a.rapportId,  // Always present
+        // Utilisation des clés studentPrenom et studentName pour former le nom complet
+        studentName: `${a.studentPrenom} ${a.studentName}`,
+        // Utilisation des clés exactes du JSON
+        studentMatricule: a.studentMatricule,
+        specialty: a.specialty,
+        level: a.level,
+        similarityScore: a.similarityScore || 0,
+        originalityScore: a.originalityScore || 0,
+        riskLevel: a.riskLevel?.toLowerCase() || 'none',
+        // Le backend fournit déjà analyzedAt au format ISO
+        analyzedAt: a.analyzedAt,
+        rapportName: a.rapportName,
+        juryAssigned: a.juryAssigned || [],
+        status: a.status || 'pending',
+      }))
+      setAnalyses(mapped)
+    } catch (error) {
+      console.error("Erreur lors de la récupération des analyses :", error)
+    }
+  }
+
   useEffect(() => {
-    const fetchAnalyses = async () => {
+    loadAnalyses()
+    // Flux d'avancement fermé si l'on quitte la page pendant l'analyse
+    return () => unsubscribeRef.current?.()
+  }, [])
+
+  // Fin du job : résultats rechargés une fois toutes les analyses terminées
+  const handleJobFinished = (status: PlagiatJobStatus) => {
+    unsubscribeRef.current = null
+    setJobProgress(status)
+    setIsAnalyzing(false)
+    loadAnalyses()
+    if (status.status === 'cancelled') {
+      setAnalyzeError(`Analyse annulée : ${status.completed} rapport(s) analysé(s) sur ${status.total}`)
+    } else if (status.failed > 0) {
+      setAnalyzeError(`${status.failed} rapport(s) en erreur sur ${status.total}`)
+    } else {
+      setSuccessMessage(`Analyse terminée : ${status.completed + status.skipped} rapport(s) analysé(s)`)
+      setShowSuccess(true)
+    }
+  }
+
+  // Connexion au flux perdue : suivi par interrogation de l'état du job
+  const pollJob = (jobId: number) => {
+    const timer = setInterval(async () => {
       try {
-        // CORRECTION 1: Appel de l'endpoint /dashboard qui retourne le tableau complet
-        const response = await axios.get<AnalysisData[]>(
-          "http://localhost:5000/api/plagiat/dashboard"
-        )
-
-        // CORRECTION 2: Mappage direct de la réponse (response.data est le tableau)
-        const mapped: MappedAnalysis[] = response.data.map((a: AnalysisData) => ({
-          id: a.id,  // Can be null
-          rapportId: a.rapportId,  // Always present
-          // Utilisation des clés studentPrenom et studentName pour former le nom complet
-          studentName: `${a.studentPrenom} ${a.studentName}`,
-          // Utilisation des clés exactes du JSON
-          studentMatricule: a.studentMatricule,
-          specialty: a.specialty,
-          level: a.level,
-          similarityScore: a.similarityScore || 0,
-          originalityScore: a.originalityScore || 0,
-          riskLevel: a.riskLevel?.toLowerCase() || 'none',
-          // Le backend fournit déjà analyzedAt au format ISO
-          analyzedAt: a.analyzedAt,
-          rapportName: a.rapportName,
-          juryAssigned: a.juryAssigned || [],
-          status: a.status || 'pending',
-        }))
-        setAnalyses(mapped)
+        const status = await plagiatService.getJob(jobId)
+        setJobProgress(status)
+        if (status.status === 'completed' || status.status === 'cancelled') {
+          clearInterval(timer)
+          handleJobFinished(status)
+        }
       } catch (error) {
-        console.error("Erreur lors de la récupération des analyses :", error)
+        console.error("Erreur lors du suivi de l'analyse :", error)
       }
-    }
-    fetchAnalyses()
-  }, [])
+    }, 3000)
+    unsubscribeRef.current = () => clearInterval(timer)
+  }
 
   // Function to trigger automatic analysis of all pending reports
   const handleAutoAnalyze = async () => {
     setIsAnalyzing(true)
     setAnalyzeError(null)
+    setJobProgress(null)
 
     try {
+      // 202 : analyses mises en file, suivies par identifiant de job
       const response = await axios.post(
         "http://localhost:5000/api/plagiat/analyze_all_pending"
       )
 
+      if (!response.data.job_id) {
+        setSuccessMessage(response.data.message || "Tous les rapports ont déjà été analysés")
+        setShowSuccess(true)
+        setIsAnalyzing(false)
+        return
+      }
+
+      const jobId: number = response.data.job_id
+      setJobProgress(response.data)
+      setSuccessMessage(response.data.message || "Analyse lancée")
       setShowSuccess(true)
 
-      // Refresh the analyses after a delay to allow backend processing
-      setTimeout(async () => {
-        const refreshResponse = await axios.get<AnalysisData[]>(
-          "http://localhost:5000/api/plagiat/dashboard"
-        )
-        const mapped: MappedAnalysis[] = refreshResponse.data.map((a: AnalysisData) => ({
-          id: a.id,
-          rapportId: a.rapportId,
-          studentName: `${a.studentPrenom} ${a.studentName}`,
-          studentMatricule: a.studentMatricule,
-          specialty: a.specialty,
-          level: a.level,
-          similarityScore: a.similarityScore || 0,
-          originalityScore: a.originalityScore || 0,
-          riskLevel: a.riskLevel?.toLowerCase() || 'none',
-          analyzedAt: a.analyzedAt,
-          rapportName: a.rapportName,
-          juryAssigned: a.juryAssigned || [],
-          status: a.status || 'pending',
-        }))
-        setAnalyses(mapped)
-      }, 3000)
+      unsubscribeRef.current = plagiatService.subscribeToJob(jobId, {
+        onStatus: setJobProgress,
+        onEvent: (event) => {
+          // Avancement affiché sur le bouton ; tableau rechargé à la fin du job
+          if (event.event === 'report_finished') {
+            setJobProgress((previous) => previous && {
+              ...previous,
+              progress: 100 * (previous.total - event.remaining) / previous.total,
+            })
+          }
+        },
+        onFinished: handleJobFinished,
+        onError: () => {
+          unsubscribeRef.current?.()
+          pollJob(jobId)
+        },
+      })
     } catch (error: any) {
       console.error("Erreur lors de l'analyse automatique:", error)
-      setAnalyzeError(error.response?.data?.message || "Erreur lors de l'analyse")
-    } finally {
+      setAnalyzeError(error.response?.data?.error || error.response?.data?.message || "Erreur lors de l'analyse")
       setIsAnalyzing(false)
     }
   }
@@ -289,7 +335,9 @@ export function DashboardPlagiat() {
               disabled={isAnalyzing || analyses.filter(a => a.status === 'pending').length === 0}
               sx={{ minWidth: 200 }}
             >
-              {isAnalyzing ? "Analyse en cours..." : "Analyser tout"}
+              {isAnalyzing
+                ? `Analyse en cours... ${jobProgress ? `${Math.round(jobProgress.progress)}%` : ""}`
+                : "Analyser tout"}
             </Button>
           </Box>
         </Box>
@@ -302,7 +350,7 @@ export function DashboardPlagiat() {
           anchorOrigin={{ vertical: 'top', horizontal: 'right' }}
         >
           <Alert onClose={() => setShowSuccess(false)} severity="success" sx={{ width: '100%' }}>
-            Analyse lancée avec succès! Les résultats seront mis à jour dans quelques instants.
+            {successMessage}
           </Alert>
         </Snackbar>
 